@@ -14,6 +14,22 @@ class Settings(BaseSettings):
     MONGODB_USERNAME: str
     MONGODB_PASSWORD: str
     MONGODB_EXPOSE_PORT: int
+    # "motor" for the native asyncio driver, "mongoengine" is the fallback running the blocking driver in the threadpool
+    DATABASE_DRIVER: str = "motor"
+    # connection pool, applied per client so per worker process
+    MONGODB_MAX_POOL_SIZE: int = 100
+    MONGODB_MIN_POOL_SIZE: int = 0
+    MONGODB_MAX_IDLE_TIME_MS: Optional[int] = None
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = None
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 30000
+    MONGODB_CONNECT_TIMEOUT_MS: int = 20000
+    MONGODB_SOCKET_TIMEOUT_MS: Optional[int] = None
+    # comma separated list, e.g. "zstd,snappy,zlib"
+    MONGODB_COMPRESSORS: Optional[str] = None
+    # let mongoengine create the model indexes on first use instead of `python -m app.infra.database.indexes`
+    MONGODB_AUTO_CREATE_INDEX: bool = False
+    # commands slower than this are logged to app.database.slow_query
+    MONGODB_SLOW_QUERY_MS: float = 100
 
     API_STR: str
     PROJECT_NAME: str = "Demo Blog FastAPI"
@@ -22,12 +38,43 @@ class Settings(BaseSettings):
     CLOUDINARY_NAME: str
     CLOUDINARY_API_KEY: str
     CLOUDINARY_API_SECRET: str
+    # "cloudinary" or "local" (files copied to UPLOAD_LOCAL_DIR, offline), default local in testing
+    UPLOAD_BACKEND: Optional[str] = None
+    UPLOAD_LOCAL_DIR: Optional[str] = None
+    # uploads run after the response on these threads per API worker, files wait in UPLOAD_SPOOL_DIR
+    UPLOAD_WORKERS: int = 2
+    # uploads waiting for a worker, the next ones answer 503
+    UPLOAD_QUEUE_SIZE: int = 100
+    UPLOAD_SPOOL_DIR: Optional[str] = None
+    UPLOAD_MAX_ATTEMPTS: int = 3
+    # first retry delay, doubled on every attempt
+    UPLOAD_RETRY_SECONDS: float = 1
 
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE: int = 1
     SECRET_KEY: str = "secret"
+    # resolved user of a token, a role change takes at most USER_CACHE_TTL seconds to apply, 0 disables the cache
+    USER_CACHE_TTL: float = 30
+    USER_CACHE_SIZE: int = 10000
+    # bcrypt processes per API worker, 0 hashes in the request threadpool
+    PASSWORD_HASH_WORKERS: int = 2
+    # jobs waiting for a bcrypt process before answering 503
+    PASSWORD_HASH_QUEUE_SIZE: int = 32
 
     ENVIRONMENT: str
 
+    # share of the requests answered with a Server-Timing header, default every request outside production and
+    # 1% in production
+    SERVER_TIMING_SAMPLE_RATE: Optional[float] = None
+    # shared directory of the per worker metrics snapshots when running several workers, empty it before starting
+    METRICS_DIR: Optional[str] = None
+    METRICS_FLUSH_SECONDS: float = 5
+
+    POST_COUNT_CAP: int = 10000
+    # inserts retried with a new slug suffix when the slug is taken
+    SLUG_MAX_ATTEMPTS: int = 5
+    # posts written per insert_many by the bulk import
+    POST_IMPORT_CHUNK_SIZE: int = 1000
+
 
 settings = Settings()
@@ -1,11 +1,11 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
-from pydantic import ConfigDict
+from pydantic import BaseModel, ConfigDict
 
 from app.domain.shared.entity import BaseEntity, IDModelMixin, PayloadWithFile, Pagination
-from app.domain.shared.enum import ExtendedEnum
-from app.domain.user.entity import User
+from app.domain.shared.field import PydanticObjectId
+from app.domain.shared.enum import ExtendedEnum, UploadStatus
 from app.domain.user.field import PydanticUserModelType
 
 
@@ -16,6 +16,7 @@ class PostBase(BaseEntity):
 
 class PostBaseThumbnail(PostBase):
     thumbnail: Optional[str] = None
+    thumbnail_status: Optional[UploadStatus] = None
 
 
 class PostInDB(IDModelMixin, PostBaseThumbnail):
@@ -23,7 +24,7 @@ class PostInDB(IDModelMixin, PostBaseThumbnail):
     slug: str
     author: PydanticUserModelType
     created_at: datetime
-    updated_at: List[datetime]
+    last_updated_at: Optional[datetime] = None
 
 
 class PostInCreate(PostBaseThumbnail):
@@ -34,11 +35,18 @@ class PostInCreatePayload(PostBase, PayloadWithFile):
     pass
 
 
+class PostAuthor(BaseModel):
+    id: str
+    fullname: str
+    avatar: Optional[str] = None
+
+
 class Post(PostBaseThumbnail):
     id: str
-    author: User
+    # None once the author of a post without snapshot was deleted
+    author: Optional[PostAuthor] = None
     created_at: datetime
-    updated_at: List[datetime]
+    last_updated_at: Optional[datetime] = None
     slug: str
 
 
@@ -46,13 +54,56 @@ class PostInUpdate(BaseEntity):
     title: Optional[str] = None
     description: Optional[str] = None
     thumbnail: Optional[str] = None
-    updated_at: Optional[List[datetime]] = None
+    thumbnail_status: Optional[UploadStatus] = None
+    last_updated_at: Optional[datetime] = None
+
+
+class PostInImport(PostBaseThumbnail):
+    author: Optional[PydanticObjectId] = None
+    slug: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+
+class ImportPostResponse(BaseModel):
+    inserted: int = 0
+    failed: int = 0
+    errors: List[ImportRowError] = []
 
 
 class ManyPostResponse(BaseEntity):
     pagination: Optional[Pagination] = None
     data: Optional[List[Post]] = None
 
+
+class FieldChange(BaseModel):
+    old: Optional[Any] = None
+    new: Optional[Any] = None
+
+
+class PostRevision(BaseModel):
+    id: str
+    post: PydanticObjectId
+    editor: Optional[PydanticObjectId] = None
+    created_at: datetime
+    changes: Dict[str, FieldChange] = {}
+
+
+class ManyPostRevisionResponse(BaseEntity):
+    pagination: Optional[Pagination] = None
+    data: Optional[List[PostRevision]] = None
+
+
 class SearchByPost(str, ExtendedEnum):
     TITLE = "title"
+    TITLE_PREFIX = "title_prefix"
+    TEXT = "text"
     AUTHOR = "author"
+
+
+# fields GET /post can be sorted on, each one has a (field, _id) index serving the keyset pagination
+POST_SORT_FIELDS = ("id", "created_at", "last_updated_at", "title")
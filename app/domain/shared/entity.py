@@ -38,6 +38,8 @@ class Pagination(BaseModel):
     total: Optional[int] = 0
     page_index: Optional[int] = 1
     total_pages: Optional[int] = None
+    total_capped: Optional[bool] = None
+    next_cursor: Optional[str] = None
 
 
 class DateTimeModelMixin(BaseModel):
@@ -14,3 +14,15 @@ class UserRole(str, ExtendedEnum):
 class Sort(str, ExtendedEnum):
     ASCE = "asce"
     DESC = "desc"
+
+
+class CountMode(str, ExtendedEnum):
+    EXACT = "exact"
+    CAPPED = "capped"
+    NONE = "none"
+
+
+class UploadStatus(str, ExtendedEnum):
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
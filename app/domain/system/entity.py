@@ -0,0 +1,85 @@
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+
+class PoolStats(BaseModel):
+    open: int
+    checked_out: int
+    wait_queue: int
+    checkouts: int
+    checkout_failures: int
+    checkout_ms_avg: float
+    checkout_ms_max: float
+    pool_cleared: int
+
+
+class DatabasePoolStats(BaseModel):
+    mongoengine: PoolStats
+    motor: PoolStats
+
+
+class OperationStats(BaseModel):
+    commands: int
+    failures: int
+    duration_ms_avg: float
+    duration_ms_max: float
+    documents: int
+
+
+class EndpointStats(BaseModel):
+    requests: int
+    queries_avg: float
+    queries_max: int
+    duration_ms_avg: float
+    duration_ms_max: float
+
+
+class SlowQuery(BaseModel):
+    operation: str
+    command: str
+    collection: Optional[str] = None
+    duration_ms: float
+    documents: int
+    request_id: Optional[str] = None
+
+
+class DatabaseCommandStats(BaseModel):
+    operations: Dict[str, OperationStats]
+    endpoints: Dict[str, EndpointStats]
+    slow: List[SlowQuery]
+
+
+class CacheStats(BaseModel):
+    size: int
+    maxsize: int
+    ttl: float
+    hits: int
+    misses: int
+    evictions: int
+    hit_rate: float
+
+
+class PasswordHasherStats(BaseModel):
+    workers: int
+    queue_size: int
+    pending: int
+    completed: int
+    rejected: int
+    failed: int
+    latency_ms_avg: float
+    latency_ms_max: float
+
+
+class UploadQueueStats(BaseModel):
+    workers: int
+    queue_size: int
+    pending: int
+    completed: int
+    failed: int
+    retries: int
+    rejected: int
+
+
+class CachesStats(BaseModel):
+    user: CacheStats
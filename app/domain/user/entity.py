@@ -3,7 +3,7 @@ from typing import Optional, List
 from pydantic import EmailStr, ConfigDict, field_validator, BaseModel
 
 from app.domain.shared.entity import BaseEntity, IDModelMixin, Pagination, PayloadWithFile
-from app.domain.shared.enum import UserRole
+from app.domain.shared.enum import UserRole, UploadStatus
 
 
 def transform_email(email: str) -> str:
@@ -19,6 +19,7 @@ class UserBase(BaseEntity):
 
 class UseBaseWithAvatar(UserBase):
     avatar: Optional[str] = None
+    avatar_status: Optional[UploadStatus] = None
 
 
 class UserInDB(IDModelMixin, UseBaseWithAvatar):
@@ -55,6 +56,7 @@ class UserInUpdatePayload(UpdatePayload, PayloadWithFile):
 
 class UserInUpdate(UpdatePayload):
     avatar: Optional[str] = None
+    avatar_status: Optional[UploadStatus] = None
 
 
 class User(UseBaseWithAvatar):
@@ -1,11 +1,48 @@
-from mongoengine import connect as mongo_engine_connect, disconnect_all
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from mongoengine import connect as mongo_engine_connect, disconnect_all, get_connection
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 
 from app.config import settings
+from app.infra.database.monitoring import mongoengine_pool_stats, motor_pool_stats, command_stats
+
+_motor_client: Optional[AsyncIOMotorClient] = None
+
+
+def _pool_kwargs() -> Dict[str, Any]:
+    kwargs = dict(
+        maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+        minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+        maxIdleTimeMS=settings.MONGODB_MAX_IDLE_TIME_MS,
+        waitQueueTimeoutMS=settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+        serverSelectionTimeoutMS=settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=settings.MONGODB_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=settings.MONGODB_SOCKET_TIMEOUT_MS,
+    )
+    if settings.MONGODB_COMPRESSORS:
+        kwargs["compressors"] = settings.MONGODB_COMPRESSORS
+    return kwargs
+
+
+def _client_kwargs() -> Dict[str, Any]:
+    if settings.ENVIRONMENT == "testing":
+        return dict(host=settings.MONGODB_HOST, port=settings.MONGODB_PORT, **_pool_kwargs())
+    return dict(
+        host=settings.MONGODB_HOST,
+        port=settings.MONGODB_PORT,
+        username=settings.MONGODB_USERNAME,
+        password=settings.MONGODB_PASSWORD,
+        authSource=settings.MONGODB_DATABASE,
+        **_pool_kwargs(),
+    )
 
 
 def connect() -> None:
     if settings.ENVIRONMENT == "testing":
-        return mongo_engine_connect(settings.MONGODB_DATABASE, host=settings.MONGODB_HOST, port=settings.MONGODB_PORT)
+        return mongo_engine_connect(settings.MONGODB_DATABASE, host=settings.MONGODB_HOST, port=settings.MONGODB_PORT,
+                                    event_listeners=[mongoengine_pool_stats, command_stats], **_pool_kwargs())
     else:
         return mongo_engine_connect(
             settings.MONGODB_DATABASE,
@@ -15,8 +52,46 @@ def connect() -> None:
             password=settings.MONGODB_PASSWORD,
             authentication_source=settings.MONGODB_DATABASE,
             alias="default",
+            event_listeners=[mongoengine_pool_stats, command_stats],
+            **_pool_kwargs(),
         )
 
 
+def get_motor_client() -> AsyncIOMotorClient:
+    global _motor_client
+    if _motor_client is None:
+        _motor_client = AsyncIOMotorClient(event_listeners=[motor_pool_stats, command_stats], **_client_kwargs())
+    return _motor_client
+
+
+def get_motor_database() -> AsyncIOMotorDatabase:
+    return get_motor_client()[settings.MONGODB_DATABASE]
+
+
+async def warm_up() -> None:
+    """open ``MONGODB_MIN_POOL_SIZE`` connections before serving the first request
+
+    pymongo only fills the minimum pool from its background monitor, so without this the first requests
+    after a deploy pay the connection handshakes. Concurrent pings force one connection per ping.
+    """
+
+    size = settings.MONGODB_MIN_POOL_SIZE
+    if size <= 0:
+        return
+
+    if settings.DATABASE_DRIVER == "motor":
+        admin = get_motor_client().admin
+        await asyncio.gather(*(admin.command("ping") for _ in range(size)))
+    else:
+        admin = get_connection().admin
+        with ThreadPoolExecutor(max_workers=size) as executor:
+            await asyncio.gather(*(asyncio.get_running_loop().run_in_executor(executor, admin.command, "ping")
+                                   for _ in range(size)))
+
+
 def disconnect() -> None:
+    global _motor_client
     disconnect_all()
+    if _motor_client is not None:
+        _motor_client.close()
+        _motor_client = None
@@ -0,0 +1,285 @@
+"""Declare, apply and verify the MongoDB indexes.
+
+The API does not create indexes (``auto_create_index`` is off at runtime, see ``MONGODB_AUTO_CREATE_INDEX``),
+run this once per deploy. It creates the declared indexes (a no-op for the ones that exist), then explains every
+query shape of the repositories and fails when one of them is planned as a collection scan, or when a page read
+through a cursor is not an index range scan bounded by the page size.
+
+Usage::
+
+    python -m app.infra.database.indexes [--verify-only]
+"""
+import argparse
+import re
+import sys
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple, Type
+
+from bson import ObjectId
+from mongoengine import Document
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.collection import Collection
+
+from app.domain.post.entity import POST_SORT_FIELDS
+from app.domain.shared.enum import CountMode
+from app.infra import database
+from app.infra.database.models.post import PostModel
+from app.infra.database.models.post_revision import PostRevisionModel
+from app.infra.database.models.user import UserModel
+from app.infra.post.post_repository import build_list_pipeline, build_list_with_total_pipeline, build_count_pipeline, \
+    build_find_query
+from app.infra.user.user_repository import build_find_pipeline
+
+# the options of the indexes mongoengine already created from ``meta`` are repeated so they are not recreated
+INDEXES: Dict[Type[Document], List[IndexModel]] = {
+    PostModel: [
+        IndexModel([("slug", ASCENDING)], unique=True, sparse=False),
+        # a (field, _id) index for every field of POST_SORT_FIELDS, serving the keyset pagination
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("last_updated_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("title", ASCENDING), ("_id", ASCENDING)]),
+        IndexModel([("title_lower", ASCENDING)]),
+        IndexModel([("author", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("author_snapshot.fullname", ASCENDING)]),
+        IndexModel([("title", TEXT), ("description", TEXT)], default_language="english",
+                   weights={"title": 10, "description": 1}),
+    ],
+    UserModel: [
+        IndexModel([("email", ASCENDING)], unique=True, sparse=False),
+        IndexModel([("role", ASCENDING)]),
+    ],
+    PostRevisionModel: [
+        IndexModel([("post", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+}
+
+
+def disable_auto_create_index() -> None:
+    """stop mongoengine from creating the ``meta`` indexes on the first use of a collection"""
+
+    for model in INDEXES:
+        model._meta["auto_create_index"] = False
+
+
+def apply() -> Dict[str, List[str]]:
+    """Create the declared indexes, existing ones with the same keys and options are left untouched
+
+    :return: index names by collection
+    """
+    result = {}
+    for model, indexes in INDEXES.items():
+        collection = model._get_collection()
+        result[model._get_collection_name()] = [
+            collection.create_index(list(index.document["key"].items()),
+                                    **{name: value for name, value in index.document.items() if name != "key"})
+            for index in indexes
+        ]
+    return result
+
+
+def undeclared() -> Dict[str, List[str]]:
+    """indexes that exist but are not declared, candidates for a manual drop once nothing relies on them"""
+
+    result = {}
+    for model, indexes in INDEXES.items():
+        declared = {index.document["name"] for index in indexes} | {"_id_"}
+        extra = sorted(set(model._get_collection().index_information()) - declared)
+        if extra:
+            result[model._get_collection_name()] = extra
+    return result
+
+
+class QueryShape(NamedTuple):
+    name: str
+    model: Type[Document]
+    explain: Callable[[Collection], Dict[str, Any]]
+    # page size of the keyset pages, their plans must not sort in memory nor examine more than this
+    limit: Optional[int] = None
+
+
+def _find(conditions: Dict[str, Any], sort: Any = None, limit: int = 20) -> Callable[[Collection], Dict[str, Any]]:
+    def explain(collection: Collection) -> Dict[str, Any]:
+        cursor = collection.find(conditions)
+        if sort:
+            cursor = cursor.sort(sort)
+        return cursor.limit(limit).explain()
+    return explain
+
+
+def _aggregate(pipeline: List[Dict[str, Any]],
+               verbosity: str = "queryPlanner") -> Callable[[Collection], Dict[str, Any]]:
+    """``executionStats`` runs the pipeline, only the pages bounded by their limit are explained with it"""
+
+    def explain(collection: Collection) -> Dict[str, Any]:
+        return collection.database.command("explain", {"aggregate": collection.name, "pipeline": pipeline,
+                                                       "cursor": {}}, verbosity=verbosity)
+    return explain
+
+
+def query_shapes() -> Iterator[QueryShape]:
+    """one representative of every query the repositories send, values do not matter for the plan"""
+
+    id, now = ObjectId(), datetime.utcnow()
+    # the $match stages of ListPostUseCase
+    searches = {
+        "title": {"$match": {"title": {"$regex": "post", "$options": "i"}}},
+        "title_prefix": {"$match": {"title_lower": {"$regex": "^" + re.escape("post")}}},
+        "author": {"$match": {"author_snapshot.fullname": {"$regex": "john", "$options": "i"}}},
+    }
+
+    for field in POST_SORT_FIELDS:
+        key = "_id" if field == "id" else field
+        yield QueryShape(f"post list sort_by={field}", PostModel,
+                         _aggregate(build_list_with_total_pipeline(sort={key: -1})))
+        yield QueryShape(f"post list sort_by={field} cursor", PostModel,
+                         _aggregate(build_list_pipeline(sort={key: -1}, cursor=(key, now, id)),
+                                    verbosity="executionStats"), limit=20)
+    for search_by, match in searches.items():
+        yield QueryShape(f"post list search_by={search_by}", PostModel,
+                         _aggregate(build_list_with_total_pipeline(match_pipeline=match)))
+        yield QueryShape(f"post list search_by={search_by} count", PostModel,
+                         _aggregate(build_count_pipeline(match_pipeline=match, count_mode=CountMode.CAPPED)))
+    text_search = {"$match": {"$text": {"$search": "post"}}}
+    yield QueryShape("post list search_by=text", PostModel,
+                     _aggregate(build_list_with_total_pipeline(match_pipeline=text_search,
+                                                               sort={"score": {"$meta": "textScore"}})))
+
+    conditions, sort, _ = build_find_query(skip=0, conditions={"author": id})
+    yield QueryShape("post me", PostModel, _find(conditions, sort))
+    conditions, sort, _ = build_find_query(skip=0, conditions={"author": id}, cursor=("created_at", now, id))
+    yield QueryShape("post me cursor", PostModel, _find(conditions, sort), limit=20)
+    yield QueryShape("post me count", PostModel, _aggregate([{"$match": {"author": id}}, {"$count": "n"}]))
+    yield QueryShape("post by id", PostModel, _find({"_id": id}, limit=1))
+    yield QueryShape("post by slug", PostModel, _find({"slug": "post"}, limit=1))
+    yield QueryShape("post author snapshot", PostModel, _find({"author": id}, limit=0))
+    yield QueryShape("post export", PostModel, _find({"_id": {"$gte": id}}, [("_id", 1)], limit=0))
+    yield QueryShape("post revisions", PostRevisionModel,
+                     _find({"post": id}, [("created_at", -1), ("_id", -1)]))
+    yield QueryShape("post revisions count", PostRevisionModel,
+                     _aggregate([{"$match": {"post": id}}, {"$count": "n"}]))
+
+    yield QueryShape("user by email", UserModel, _find({"email": "user@example.com"}, limit=1))
+    yield QueryShape("user by ids", UserModel, _find({"_id": {"$in": [id]}}, limit=0))
+    yield QueryShape("user list", UserModel, _aggregate(build_find_pipeline(page_size=20, page_index=1)))
+    yield QueryShape("user export", UserModel, _find({"_id": {"$gte": id}}, [("_id", 1)], limit=0))
+
+
+def plan_stages(explain: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """stages of the winning plans of an ``explain`` output, rejected plans are skipped"""
+
+    found = []
+
+    def stages(plan: Any) -> None:
+        if isinstance(plan, dict):
+            if "stage" in plan:
+                found.append(plan)
+            for value in plan.values():
+                stages(value)
+        elif isinstance(plan, list):
+            for value in plan:
+                stages(value)
+
+    def winning_plans(value: Any) -> None:
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if key == "winningPlan":
+                    stages(item)
+                elif key != "rejectedPlans":
+                    winning_plans(item)
+        elif isinstance(value, list):
+            for item in value:
+                winning_plans(item)
+
+    winning_plans(explain)
+    return found
+
+
+def collscans(explain: Dict[str, Any]) -> List[str]:
+    """namespaces of the collection scans in the winning plans of an ``explain`` output"""
+
+    return [stage.get("namespace") or stage.get("ns") or "COLLSCAN"
+            for stage in plan_stages(explain) if stage["stage"] == "COLLSCAN"]
+
+
+def execution_stats(explain: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """``executionStats`` sections of an ``explain`` output, top level for finds and pushed down pipelines, in the
+    ``$cursor`` stage of the other pipelines"""
+
+    found = []
+
+    def collect(value: Any) -> None:
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if key == "executionStats" and isinstance(item, dict):
+                    found.append(item)
+                else:
+                    collect(item)
+        elif isinstance(value, list):
+            for item in value:
+                collect(item)
+
+    collect(explain)
+    return found
+
+
+def unbounded(explain: Dict[str, Any], limit: int) -> List[str]:
+    """Why a keyset page plan is not a bounded index range scan
+
+    A blocking ``SORT``, or a ``$sort``/``$facet`` aggregation stage, reads the whole match before the first row is
+    returned. More than ``limit`` keys or documents examined in the execution stats, of finds and of aggregates
+    explained with ``executionStats``, means the range does not start at the cursor.
+    """
+    problems = [f"blocking {stage['stage']}" for stage in plan_stages(explain) if stage["stage"] == "SORT"]
+    problems += [f"{name} stage" for stage in explain.get("stages", []) for name in ("$sort", "$facet")
+                 if name in stage]
+
+    for stats in execution_stats(explain):
+        # the keyset condition is an $or of two ranges, the boundary row can be read twice
+        for key in ("totalKeysExamined", "totalDocsExamined"):
+            if stats.get(key, 0) > limit * 2 + 1:
+                problems.append(f"{key}={stats[key]} for a page of {limit}")
+    return problems
+
+
+def verify() -> List[Tuple[str, str]]:
+    """Explain every query shape
+
+    :return: (shape name, problem) of the shapes planned as a collection scan and of the cursor pages that are not
+        a bounded index range scan
+    """
+    failed = []
+    for shape in query_shapes():
+        explain = shape.explain(shape.model._get_collection())
+        if collscans(explain):
+            failed.append((shape.name, "COLLSCAN"))
+        if shape.limit is not None:
+            failed += [(shape.name, problem) for problem in unbounded(explain, shape.limit)]
+    return failed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--verify-only", action="store_true", help="do not create indexes, only explain")
+    args = parser.parse_args()
+
+    disable_auto_create_index()
+    database.connect()
+    try:
+        if not args.verify_only:
+            for collection, names in apply().items():
+                print(f"{collection}: {', '.join(names)}")
+        for collection, names in undeclared().items():
+            print(f"{collection}: undeclared {', '.join(names)}")
+
+        failed = verify()
+        for name, problem in failed:
+            print(f"{problem}: {name}")
+        if failed:
+            sys.exit(1)
+        print("No collection scan, every cursor page is an index range scan")
+    finally:
+        database.disconnect()
+
+
+if __name__ == "__main__":
+    main()
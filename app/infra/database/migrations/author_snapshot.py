@@ -0,0 +1,45 @@
+"""Backfill ``Posts.author_snapshot`` from the Users collection.
+
+Usage::
+
+    python -m app.infra.database.migrations.author_snapshot [--all]
+"""
+import argparse
+
+from app.infra import database
+from app.infra.database.models.post import AuthorSnapshot, PostModel
+from app.infra.database.models.user import UserModel
+from app.infra.post.post_repository import PostRepository
+
+
+def backfill(refresh_all: bool = False) -> int:
+    """Write the author snapshot of every post that has none (or of every post with ``refresh_all``)
+
+    :return: number of posts updated
+    """
+    conditions = {} if refresh_all else {"author_snapshot": {"$exists": False}}
+    author_ids = PostModel._get_collection().distinct("author", conditions)
+
+    post_repository = PostRepository()
+    updated = 0
+    for user in UserModel.objects(id__in=author_ids).only("id", "fullname", "avatar"):
+        snapshot = AuthorSnapshot.from_user(user).to_mongo().to_dict()
+        updated += post_repository.update_author_snapshot(author_id=user.id, snapshot=snapshot)
+    return updated
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--all", action="store_true", help="refresh snapshots that already exist too")
+    args = parser.parse_args()
+
+    database.connect()
+    try:
+        updated = backfill(refresh_all=args.all)
+        print(f"Updated author snapshot of {updated} posts")
+    finally:
+        database.disconnect()
+
+
+if __name__ == "__main__":
+    main()
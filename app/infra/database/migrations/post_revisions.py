@@ -0,0 +1,65 @@
+"""Compact ``Posts.updated_at`` arrays into ``last_updated_at`` and the PostRevisions collection.
+
+Every timestamp after the first one (written on creation) becomes a revision without changes, the array is
+then dropped from the post.
+
+Usage::
+
+    python -m app.infra.database.migrations.post_revisions [--batch-size 500]
+"""
+import argparse
+
+from pymongo import UpdateOne
+
+from app.infra import database
+from app.infra.database.models.post import PostModel
+from app.infra.database.models.post_revision import PostRevisionModel
+
+
+def compact(batch_size: int = 500) -> int:
+    """Move the ``updated_at`` history of every post still carrying it
+
+    :return: number of posts compacted
+    """
+    collection = PostModel._get_collection()
+    revisions = PostRevisionModel._get_collection()
+    compacted = 0
+    updates, history = [], []
+
+    def flush() -> int:
+        if history:
+            revisions.insert_many(history, ordered=False)
+        return collection.bulk_write(updates, ordered=False).modified_count
+
+    for doc in collection.find({"updated_at": {"$exists": True}}, {"updated_at": 1}).batch_size(batch_size):
+        updated_at = doc.get("updated_at") or []
+        if not isinstance(updated_at, list):
+            updated_at = [updated_at]
+        history.extend({"post": doc["_id"], "created_at": edited_at, "changes": {}} for edited_at in updated_at[1:])
+        change = {"$unset": {"updated_at": ""}}
+        if updated_at:
+            change["$set"] = {"last_updated_at": updated_at[-1]}
+        updates.append(UpdateOne({"_id": doc["_id"]}, change))
+        if len(updates) >= batch_size:
+            compacted += flush()
+            updates, history = [], []
+    if updates:
+        compacted += flush()
+    return compacted
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    database.connect()
+    try:
+        compacted = compact(batch_size=args.batch_size)
+        print(f"Compacted updated_at of {compacted} posts")
+    finally:
+        database.disconnect()
+
+
+if __name__ == "__main__":
+    main()
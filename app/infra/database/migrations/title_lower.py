@@ -0,0 +1,48 @@
+"""Backfill ``Posts.title_lower`` used by the title prefix search.
+
+Usage::
+
+    python -m app.infra.database.migrations.title_lower [--batch-size 1000]
+"""
+import argparse
+
+from pymongo import UpdateOne
+
+from app.infra import database
+from app.infra.database.models.post import PostModel
+
+
+def backfill(batch_size: int = 1000) -> int:
+    """Set ``title_lower`` on every post missing it
+
+    :return: number of posts updated
+    """
+    collection = PostModel._get_collection()
+    updated = 0
+    requests = []
+
+    for doc in collection.find({"title_lower": {"$exists": False}}, {"title": 1}).batch_size(batch_size):
+        requests.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"title_lower": (doc.get("title") or "").lower()}}))
+        if len(requests) >= batch_size:
+            updated += collection.bulk_write(requests, ordered=False).modified_count
+            requests = []
+    if requests:
+        updated += collection.bulk_write(requests, ordered=False).modified_count
+    return updated
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    database.connect()
+    try:
+        updated = backfill(batch_size=args.batch_size)
+        print(f"Updated title_lower of {updated} posts")
+    finally:
+        database.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,63 @@
 from datetime import datetime
 from random import sample
+from typing import Union
 
-from mongoengine import Document, StringField, DateTimeField, ReferenceField, ListField
+from mongoengine import Document, EmbeddedDocument, StringField, DateTimeField, ReferenceField, \
+    EmbeddedDocumentField, ObjectIdField
 from slugify import slugify
 
+from app.infra.database.models.user import UserModel, UserView
+from app.infra.database.models.view import DocumentView
+
+
+def make_slug(title: str) -> str:
+    random_numbers = "".join(str(x) for x in sample(range(10), 5))
+    return slugify(title) + "-" + random_numbers
+
+
+class AuthorSnapshot(EmbeddedDocument):
+    """Copy of the author fields needed to render and search a post without reading Users"""
+
+    id = ObjectIdField(required=True)
+    fullname = StringField(required=True)
+    avatar = StringField(required=False)
+
+    @classmethod
+    def from_user(cls, user: Union[UserModel, UserView]) -> "AuthorSnapshot":
+        return cls(id=user.id, fullname=user.fullname, avatar=user.avatar)
+
 
 class PostModel(Document):
     title = StringField(required=True)
+    # lower cased title, anchored case sensitive prefix regexes on it are an index range scan
+    title_lower = StringField(required=False)
     slug = StringField(required=True, unique=True)
     description = StringField(required=True)
     thumbnail = StringField(required=False)
+    # UploadStatus of the last thumbnail sent, the previous thumbnail is kept until it is done
+    thumbnail_status = StringField(required=False)
     created_at = DateTimeField(required=True)
-    updated_at = ListField(DateTimeField(), required=False)
+    # the edit history lives in PostRevisions, the post only keeps its last update
+    last_updated_at = DateTimeField(required=False)
     author = ReferenceField("UserModel", required=True)
+    author_snapshot = EmbeddedDocumentField(AuthorSnapshot, required=False)
 
     def save(self, *args, **kwargs):
-        if not self.created_at:
-            self.created_at = datetime.utcnow()
-            random_numbers = "".join(str(x) for x in sample(range(10), 5))
-            self.slug = slugify(self.title) + "-" + random_numbers
-        if not self.updated_at:
-            self.updated_at = [datetime.utcnow()]
-        else:
-            self.updated_at.append(datetime.utcnow())
+        self.prepare()
         return super(PostModel, self).save(*args, **kwargs)
 
+    def prepare(self) -> None:
+        """Fill the derived fields, called before every write"""
+        author = self._data.get("author")
+        if not self.author_snapshot and isinstance(author, UserModel):
+            self.author_snapshot = AuthorSnapshot.from_user(author)
+        self.title_lower = self.title.lower() if self.title else None
+        now = datetime.utcnow()
+        if not self.created_at:
+            self.created_at = now
+            self.slug = make_slug(self.title)
+        self.last_updated_at = now
+
     @classmethod
     def from_mongo(cls, data: dict, id_str=False):
         if not data:
@@ -36,7 +69,24 @@ class PostModel(Document):
 
     meta = {
         "collection": "Posts",
-        "indexes": ["title", "slug", "author"],
+        "indexes": [
+            "title",
+            "title_lower",
+            "slug",
+            "author",
+            {
+                "fields": ["$title", "$description"],
+                "default_language": "english",
+                "weights": {"title": 10, "description": 1},
+            },
+        ],
         "allow_inheritance": True,
         "index_cls": False,
+        # posts written before the revisions migration still carry the ``updated_at`` array
+        "strict": False,
     }
+
+
+class PostView(DocumentView):
+    __slots__ = ("id", "title", "title_lower", "slug", "description", "thumbnail", "thumbnail_status", "created_at",
+                 "last_updated_at", "author", "author_snapshot")
@@ -0,0 +1,22 @@
+from mongoengine import Document, DateTimeField, ObjectIdField, DictField
+
+
+class PostRevisionModel(Document):
+    """One edit of a post, append only
+
+    ``changes`` maps every edited field to ``{"old": ..., "new": ...}``, it is empty for revisions migrated
+    from the former ``Posts.updated_at`` array.
+    """
+
+    post = ObjectIdField(required=True)
+    editor = ObjectIdField(required=False)
+    created_at = DateTimeField(required=True)
+    changes = DictField(required=False)
+
+    meta = {
+        "collection": "PostRevisions",
+        "indexes": [
+            ("post", "-created_at", "-_id"),
+        ],
+        "index_cls": False,
+    }
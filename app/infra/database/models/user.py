@@ -2,6 +2,8 @@ from datetime import datetime
 
 from mongoengine import Document, StringField, EmailField, DateTimeField
 
+from app.infra.database.models.view import DocumentView
+
 
 class UserModel(Document):
     email = EmailField(required=True, unique=True)
@@ -9,6 +11,13 @@ class UserModel(Document):
     password = StringField(required=True)
     role = StringField(required=True)
     avatar = StringField(required=False)
+    # UploadStatus of the last avatar sent
+    avatar_status = StringField(required=False)
+
+    @classmethod
+    def from_view(cls, view: "UserView") -> "UserModel":
+        """Document of a read view, for the writes referencing the user"""
+        return cls(**{name: getattr(view, name) for name in view.__slots__})
 
     @classmethod
     def from_mongo(cls, data: dict, id_str=False):
@@ -25,3 +34,7 @@ class UserModel(Document):
         "allow_inheritance": True,
         "index_cls": False,
     }
+
+
+class UserView(DocumentView):
+    __slots__ = ("id", "email", "fullname", "password", "role", "avatar", "avatar_status")
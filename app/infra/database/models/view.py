@@ -0,0 +1,35 @@
+from typing import Any, Dict, Optional
+
+
+class DocumentView:
+    """Read only, ``__slots__`` backed row of a collection
+
+    A fraction of the size and construction time of a mongoengine ``Document``: no change tracking, field
+    descriptors or validation. Use it on read paths, the ``Document`` classes are for writes. Subclasses list
+    the fields in ``__slots__``, ``id`` holds ``_id``.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, **fields: Any):
+        for name in self.__slots__:
+            object.__setattr__(self, name, fields.get(name))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is read only")
+
+    @classmethod
+    def from_mongo(cls, doc: Optional[Dict[str, Any]]):
+        if not doc:
+            return None
+        view = cls.__new__(cls)
+        for name in cls.__slots__:
+            object.__setattr__(view, name, doc.get("_id") if name == "id" else doc.get(name))
+        return view
+
+    def __eq__(self, other: Any) -> bool:
+        return type(other) is type(self) and all(getattr(self, name) == getattr(other, name)
+                                                  for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(id={self.id!r})"
@@ -0,0 +1,336 @@
+import functools
+import inspect
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional, Type
+
+from pymongo import monitoring
+
+from app.config import settings
+from app.shared.metrics import REGISTRY
+from app.shared.timing import phase
+
+logger = logging.getLogger("app.database.slow_query")
+
+command_duration = REGISTRY.histogram("mongodb_command_duration_seconds", "MongoDB command latency",
+                                      ["operation", "command"])
+
+# set for the duration of a repository method, read by the command listener on the thread running the command.
+# Starlette's threadpool and Motor's executor both run the driver in a copy of the caller context.
+repository_operation: ContextVar[Optional[str]] = ContextVar("repository_operation", default=None)
+# database commands of the request being served, set by the DatabaseStatsMiddleware
+request_stats: ContextVar[Optional["RequestStats"]] = ContextVar("request_stats", default=None)
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Connection pool counters fed by pymongo's CMAP events.
+
+    Check out started/finished events of one operation fire on the same thread, the start time is
+    kept in a thread local to measure how long the operation waited for a connection.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.open = 0
+            self.checked_out = 0
+            self.wait_queue = 0
+            self.checkouts = 0
+            self.checkout_failures = 0
+            self.checkout_ms_total = 0.0
+            self.checkout_ms_max = 0.0
+            self.pool_cleared = 0
+
+    def _finish_wait(self) -> float:
+        started = getattr(self._local, "started", None)
+        self._local.started = None
+        return (time.perf_counter() - started) * 1000 if started is not None else 0.0
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        pass
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        pass
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        with self._lock:
+            self.pool_cleared += 1
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        pass
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        with self._lock:
+            self.open += 1
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        with self._lock:
+            self.open -= 1
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        self._local.started = time.perf_counter()
+        with self._lock:
+            self.wait_queue += 1
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        self._finish_wait()
+        with self._lock:
+            self.wait_queue -= 1
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        waited = self._finish_wait()
+        with self._lock:
+            self.wait_queue -= 1
+            self.checked_out += 1
+            self.checkouts += 1
+            self.checkout_ms_total += waited
+            self.checkout_ms_max = max(self.checkout_ms_max, waited)
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        with self._lock:
+            self.checked_out -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "open": self.open,
+                "checked_out": self.checked_out,
+                "wait_queue": self.wait_queue,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "checkout_ms_avg": round(self.checkout_ms_total / self.checkouts, 3) if self.checkouts else 0.0,
+                "checkout_ms_max": round(self.checkout_ms_max, 3),
+                "pool_cleared": self.pool_cleared,
+            }
+
+
+# one listener per client so both drivers can be sized independently
+mongoengine_pool_stats = PoolStatsListener()
+motor_pool_stats = PoolStatsListener()
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    return {
+        "mongoengine": mongoengine_pool_stats.snapshot(),
+        "motor": motor_pool_stats.snapshot(),
+    }
+
+
+def _tracked(operation: str, func: Callable) -> Callable:
+    """run ``func`` with ``repository_operation`` set, the outermost repository call is timed as the ``db`` phase"""
+
+    @contextmanager
+    def tracking() -> Iterator[None]:
+        outermost = repository_operation.get() is None
+        token = repository_operation.set(operation)
+        try:
+            if outermost:
+                with phase("db"):
+                    yield
+            else:
+                yield
+        finally:
+            repository_operation.reset(token)
+
+    if inspect.isasyncgenfunction(func):
+        @functools.wraps(func)
+        async def async_gen_wrapper(*args, **kwargs):
+            iterator = func(*args, **kwargs)
+            try:
+                while True:
+                    with tracking():
+                        try:
+                            item = await iterator.__anext__()
+                        except StopAsyncIteration:
+                            return
+                    yield item
+            finally:
+                await iterator.aclose()
+        return async_gen_wrapper
+
+    if inspect.isgeneratorfunction(func):
+        @functools.wraps(func)
+        def gen_wrapper(*args, **kwargs):
+            iterator = func(*args, **kwargs)
+            try:
+                while True:
+                    # iterate_in_threadpool runs every step in another copy of the context
+                    with tracking():
+                        try:
+                            item = next(iterator)
+                        except StopIteration:
+                            return
+                    yield item
+            finally:
+                iterator.close()
+        return gen_wrapper
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            with tracking():
+                return await func(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with tracking():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def track_operations(cls: Type) -> Type:
+    """class decorator attributing the database commands of every public method to ``Class.method``"""
+
+    for name, attribute in list(vars(cls).items()):
+        if not name.startswith("_") and inspect.isfunction(attribute):
+            setattr(cls, name, _tracked(f"{cls.__name__}.{name}", attribute))
+    return cls
+
+
+class RequestStats:
+    """Database commands issued while serving one request, available as ``request.state.database``"""
+
+    __slots__ = ("request_id", "queries", "duration_ms", "documents", "_lock")
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.queries = 0
+        self.duration_ms = 0.0
+        self.documents = 0
+        # commands of one request can run on several threadpool threads at once
+        self._lock = threading.Lock()
+
+    def add(self, duration_ms: float, documents: int) -> None:
+        with self._lock:
+            self.queries += 1
+            self.duration_ms += duration_ms
+            self.documents += documents
+
+
+def _documents(reply: Any) -> int:
+    """documents returned (reads) or affected (writes) by a command"""
+
+    if not isinstance(reply, dict):
+        return 0
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+    n = reply.get("n", 0)
+    return n if isinstance(n, int) else 0
+
+
+class CommandStatsListener(monitoring.CommandListener):
+    """Per repository method and per endpoint command counters, commands slower than ``slow_ms`` are logged.
+
+    Started and succeeded/failed events of one command fire on the same thread, the collection of the
+    running command is kept in a thread local.
+    """
+
+    def __init__(self, slow_ms: float = 100, slow_size: int = 100):
+        self.slow_ms = slow_ms
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._slow_size = slow_size
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.operations: Dict[str, Dict[str, Any]] = {}
+            self.endpoints: Dict[str, Dict[str, Any]] = {}
+            self.slow = deque(maxlen=self._slow_size)
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        collection = event.command.get(event.command_name)
+        self._local.collection = collection if isinstance(collection, str) else None
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._record(event, _documents(event.reply), failed=False)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._record(event, 0, failed=True)
+
+    def _record(self, event: Any, documents: int, failed: bool) -> None:
+        duration_ms = event.duration_micros / 1000
+        operation = repository_operation.get() or "other"
+        command_duration.observe(duration_ms / 1000, operation, event.command_name)
+        stats = request_stats.get()
+        if stats is not None:
+            stats.add(duration_ms, documents)
+
+        with self._lock:
+            counters = self.operations.get(operation)
+            if counters is None:
+                counters = self.operations[operation] = {"commands": 0, "failures": 0, "duration_ms_total": 0.0,
+                                                         "duration_ms_max": 0.0, "documents": 0}
+            counters["commands"] += 1
+            counters["failures"] += failed
+            counters["duration_ms_total"] += duration_ms
+            counters["duration_ms_max"] = max(counters["duration_ms_max"], duration_ms)
+            counters["documents"] += documents
+
+        if duration_ms >= self.slow_ms:
+            entry = {
+                "operation": operation,
+                "command": event.command_name,
+                "collection": getattr(self._local, "collection", None),
+                "duration_ms": round(duration_ms, 3),
+                "documents": documents,
+                "request_id": stats.request_id if stats is not None else None,
+            }
+            with self._lock:
+                self.slow.append(entry)
+            logger.warning("slow query %(operation)s %(command)s %(collection)s %(duration_ms).1fms "
+                           "documents=%(documents)s request_id=%(request_id)s", entry)
+
+    def record_request(self, endpoint: str, stats: RequestStats) -> None:
+        with self._lock:
+            counters = self.endpoints.get(endpoint)
+            if counters is None:
+                counters = self.endpoints[endpoint] = {"requests": 0, "queries_total": 0, "queries_max": 0,
+                                                       "duration_ms_total": 0.0, "duration_ms_max": 0.0}
+            counters["requests"] += 1
+            counters["queries_total"] += stats.queries
+            counters["queries_max"] = max(counters["queries_max"], stats.queries)
+            counters["duration_ms_total"] += stats.duration_ms
+            counters["duration_ms_max"] = max(counters["duration_ms_max"], stats.duration_ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "operations": {
+                    name: {
+                        "commands": counters["commands"],
+                        "failures": counters["failures"],
+                        "duration_ms_avg": round(counters["duration_ms_total"] / counters["commands"], 3),
+                        "duration_ms_max": round(counters["duration_ms_max"], 3),
+                        "documents": counters["documents"],
+                    } for name, counters in self.operations.items()
+                },
+                "endpoints": {
+                    name: {
+                        "requests": counters["requests"],
+                        "queries_avg": round(counters["queries_total"] / counters["requests"], 3),
+                        "queries_max": counters["queries_max"],
+                        "duration_ms_avg": round(counters["duration_ms_total"] / counters["requests"], 3),
+                        "duration_ms_max": round(counters["duration_ms_max"], 3),
+                    } for name, counters in self.endpoints.items()
+                },
+                "slow": list(self.slow),
+            }
+
+
+# shared by both clients, the operation tells the repositories apart
+command_stats = CommandStatsListener(slow_ms=settings.MONGODB_SLOW_QUERY_MS)
@@ -0,0 +1,327 @@
+from abc import ABC, abstractmethod
+from typing import List, Dict, Union, Optional, Any, Tuple, AsyncIterator
+
+from bson import ObjectId
+from mongoengine import NotUniqueError
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo.errors import DuplicateKeyError, BulkWriteError
+from starlette.concurrency import run_in_threadpool, iterate_in_threadpool
+
+from app.config import settings
+from app.domain.post.entity import PostInCreate, PostInUpdate
+from app.domain.shared.enum import CountMode
+from app.infra.database import get_motor_database
+from app.infra.database.models.post import PostModel, PostView, make_slug
+from app.infra.database.models.post_revision import PostRevisionModel
+from app.infra.database.monitoring import track_operations
+from app.infra.post.post_repository import PostRepository, build_list_pipeline, build_list_with_total_pipeline, \
+    build_count_pipeline, build_find_query, build_update, build_author_snapshot_update, write_errors, \
+    duplicate_key_pattern
+
+
+class AsyncPostRepository(ABC):
+    """Post repository interface used by the use cases"""
+
+    @abstractmethod
+    async def create(self, obj_in: PostInCreate) -> PostModel:
+        ...
+
+    @abstractmethod
+    async def get_by_id(self, post_id: Union[str, ObjectId]) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def get_by_slug(self, slug: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def list(self,
+                   page_index: int = 1,
+                   page_size: int = 20,
+                   match_pipeline: Optional[Dict[str, Any]] = None,
+                   sort: Optional[Dict[str, int]] = None,
+                   cursor: Optional[Tuple[str, Any, ObjectId]] = None,
+                   ) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def list_with_total(self,
+                              page_index: int = 1,
+                              page_size: int = 20,
+                              match_pipeline: Optional[Dict[str, Any]] = None,
+                              sort: Optional[Dict[str, int]] = None,
+                              cursor: Optional[Tuple[str, Any, ObjectId]] = None,
+                              count_mode: CountMode = CountMode.EXACT,
+                              count_cap: int = 10000,
+                              ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        ...
+
+    @abstractmethod
+    async def insert_many(self, docs: List[Dict[str, Any]]) -> Tuple[int, Dict[int, str]]:
+        ...
+
+    @abstractmethod
+    async def count(self, conditions: Dict[str, Union[str, bool, ObjectId]] = {}) -> int:
+        ...
+
+    @abstractmethod
+    async def find(self,
+                   skip: int,
+                   limit: int,
+                   conditions: Dict[str, Union[str, bool, ObjectId]] = {},
+                   sort: Optional[Dict[str, int]] = None,
+                   cursor: Optional[Tuple[str, Any, ObjectId]] = None,
+                   ) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def find_one(self, conditions: Dict[str, Union[str, bool, ObjectId]] = {}) -> Optional[PostView]:
+        ...
+
+    @abstractmethod
+    async def update(self, id: ObjectId, data: Union[PostInUpdate, Dict[str, Any]]) -> bool:
+        ...
+
+    @abstractmethod
+    def export(self,
+               conditions: Optional[Dict[str, Any]] = None,
+               projection: Optional[Dict[str, int]] = None,
+               batch_size: int = 1000,
+               ) -> AsyncIterator[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def delete(self, id: ObjectId) -> bool:
+        ...
+
+    @abstractmethod
+    async def add_revision(self, revision: Dict[str, Any]) -> ObjectId:
+        ...
+
+    @abstractmethod
+    async def list_revisions(self, post_id: ObjectId, page_index: int = 1, page_size: int = 20,
+                             ) -> Tuple[List[Dict[str, Any]], int]:
+        ...
+
+    @abstractmethod
+    async def update_author_snapshot(self, author_id: ObjectId, snapshot: Dict[str, Any]) -> int:
+        ...
+
+
+class ThreadedPostRepository(AsyncPostRepository):
+    """Runs the mongoengine repository in the threadpool"""
+
+    def __init__(self, repository: Optional[PostRepository] = None):
+        self.repository = repository or PostRepository()
+
+    async def create(self, obj_in: PostInCreate) -> PostModel:
+        return await run_in_threadpool(self.repository.create, obj_in=obj_in)
+
+    async def get_by_id(self, post_id: Union[str, ObjectId]) -> Optional[Dict[str, Any]]:
+        return await run_in_threadpool(self.repository.get_by_id, post_id=post_id)
+
+    async def get_by_slug(self, slug: str) -> Optional[Dict[str, Any]]:
+        return await run_in_threadpool(self.repository.get_by_slug, slug=slug)
+
+    async def list(self, **kwargs) -> List[Dict[str, Any]]:
+        return await run_in_threadpool(self.repository.list, **kwargs)
+
+    async def list_with_total(self, **kwargs) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        return await run_in_threadpool(self.repository.list_with_total, **kwargs)
+
+    async def insert_many(self, docs: List[Dict[str, Any]]) -> Tuple[int, Dict[int, str]]:
+        return await run_in_threadpool(self.repository.insert_many, docs=docs)
+
+    async def count(self, conditions: Dict[str, Union[str, bool, ObjectId]] = {}) -> int:
+        return await run_in_threadpool(self.repository.count, conditions=conditions)
+
+    async def find(self, **kwargs) -> List[Dict[str, Any]]:
+        return await run_in_threadpool(self.repository.find, **kwargs)
+
+    async def find_one(self, conditions: Dict[str, Union[str, bool, ObjectId]] = {}) -> Optional[PostView]:
+        return await run_in_threadpool(self.repository.find_one, conditions=conditions)
+
+    async def update(self, id: ObjectId, data: Union[PostInUpdate, Dict[str, Any]]) -> bool:
+        return await run_in_threadpool(self.repository.update, id=id, data=data)
+
+    def export(self,
+               conditions: Optional[Dict[str, Any]] = None,
+               projection: Optional[Dict[str, int]] = None,
+               batch_size: int = 1000,
+               ) -> AsyncIterator[Dict[str, Any]]:
+        return iterate_in_threadpool(self.repository.export(conditions=conditions, projection=projection,
+                                                            batch_size=batch_size))
+
+    async def delete(self, id: ObjectId) -> bool:
+        return await run_in_threadpool(self.repository.delete, id=id)
+
+    async def add_revision(self, revision: Dict[str, Any]) -> ObjectId:
+        return await run_in_threadpool(self.repository.add_revision, revision=revision)
+
+    async def list_revisions(self, post_id: ObjectId, page_index: int = 1, page_size: int = 20,
+                             ) -> Tuple[List[Dict[str, Any]], int]:
+        return await run_in_threadpool(self.repository.list_revisions, post_id=post_id, page_index=page_index,
+                                       page_size=page_size)
+
+    async def update_author_snapshot(self, author_id: ObjectId, snapshot: Dict[str, Any]) -> int:
+        return await run_in_threadpool(self.repository.update_author_snapshot, author_id=author_id,
+                                       snapshot=snapshot)
+
+
+@track_operations
+class MotorPostRepository(AsyncPostRepository):
+    """Native asyncio implementation on top of Motor"""
+
+    @property
+    def collection(self) -> AsyncIOMotorCollection:
+        return get_motor_database()[PostModel._get_collection_name()]
+
+    @property
+    def revisions(self) -> AsyncIOMotorCollection:
+        return get_motor_database()[PostRevisionModel._get_collection_name()]
+
+    async def create(self, obj_in: PostInCreate) -> PostModel:
+        new_post = PostModel(**obj_in.model_dump())
+        new_post.prepare()
+        new_post.validate()
+        for _ in range(settings.SLUG_MAX_ATTEMPTS):
+            try:
+                result = await self.collection.insert_one(new_post.to_mongo())
+                new_post.id = result.inserted_id
+                return new_post
+            except DuplicateKeyError as exc:
+                if not await self.slug_taken(exc, new_post.slug):
+                    raise NotUniqueError(str(exc)) from exc
+                new_post.slug = make_slug(new_post.title)
+        raise NotUniqueError("Could not allocate a unique slug")
+
+    async def slug_taken(self, exc: DuplicateKeyError, slug: str) -> bool:
+        key_pattern = duplicate_key_pattern(exc)
+        if key_pattern is not None:
+            return "slug" in key_pattern
+        return await self.collection.count_documents({"slug": slug}, limit=1) > 0
+
+    async def get_by_slug(self, slug: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"slug": slug})
+
+    async def get_by_id(self, post_id: Union[str, ObjectId]) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"_id": ObjectId(post_id)})
+
+    async def list(self,
+                   page_index: int = 1,
+                   page_size: int = 20,
+                   match_pipeline: Optional[Dict[str, Any]] = None,
+                   sort: Optional[Dict[str, int]] = None,
+                   cursor: Optional[Tuple[str, Any, ObjectId]] = None,
+                   ) -> List[Dict[str, Any]]:
+        pipeline = build_list_pipeline(page_index=page_index, page_size=page_size, match_pipeline=match_pipeline,
+                                       sort=sort, cursor=cursor)
+        return await self.collection.aggregate(pipeline).to_list(length=None)
+
+    async def list_with_total(self,
+                              page_index: int = 1,
+                              page_size: int = 20,
+                              match_pipeline: Optional[Dict[str, Any]] = None,
+                              sort: Optional[Dict[str, int]] = None,
+                              cursor: Optional[Tuple[str, Any, ObjectId]] = None,
+                              count_mode: CountMode = CountMode.EXACT,
+                              count_cap: int = 10000,
+                              ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        if count_mode is CountMode.NONE or cursor is not None:
+            docs = await self.list(page_index=page_index, page_size=page_size, match_pipeline=match_pipeline,
+                                   sort=sort, cursor=cursor)
+            if count_mode is CountMode.NONE:
+                return docs, None
+            counted = await self.collection.aggregate(build_count_pipeline(
+                match_pipeline=match_pipeline, count_mode=count_mode, count_cap=count_cap)).to_list(length=None)
+            return docs, counted[0]["document_count"] if counted else 0
+
+        pipeline = build_list_with_total_pipeline(page_index=page_index, page_size=page_size,
+                                                  match_pipeline=match_pipeline, sort=sort,
+                                                  count_mode=count_mode, count_cap=count_cap)
+        result = (await self.collection.aggregate(pipeline).to_list(length=None))[0]
+        total = result["total"][0]["document_count"] if result["total"] else 0
+        return result["data"], total
+
+    async def insert_many(self, docs: List[Dict[str, Any]]) -> Tuple[int, Dict[int, str]]:
+        if not docs:
+            return 0, {}
+        try:
+            return len((await self.collection.insert_many(docs, ordered=False)).inserted_ids), {}
+        except BulkWriteError as exc:
+            return exc.details.get("nInserted", 0), write_errors(exc)
+
+    async def count(self, conditions: Dict[str, Union[str, bool, ObjectId]] = {}) -> int:
+        try:
+            return await self.collection.count_documents(conditions)
+        except Exception:
+            return 0
+
+    async def find(self,
+                   skip: int,
+                   limit: int,
+                   conditions: Dict[str, Union[str, bool, ObjectId]] = {},
+                   sort: Optional[Dict[str, int]] = None,
+                   cursor: Optional[Tuple[str, Any, ObjectId]] = None,
+                   ) -> List[Dict[str, Any]]:
+        conditions, sort, skip = build_find_query(skip=skip, conditions=conditions, sort=sort, cursor=cursor)
+        try:
+            return await self.collection.find(conditions).sort(sort).skip(skip).limit(limit).to_list(length=limit)
+        except Exception:
+            return []
+
+    async def find_one(self, conditions: Dict[str, Union[str, bool, ObjectId]] = {}) -> Optional[PostView]:
+        try:
+            return PostView.from_mongo(await self.collection.find_one(conditions))
+        except Exception:
+            return None
+
+    async def update(self, id: ObjectId, data: Union[PostInUpdate, Dict[str, Any]]) -> bool:
+        try:
+            await self.collection.update_one({"_id": ObjectId(id)}, {"$set": build_update(data)}, upsert=False)
+            return True
+        except Exception:
+            return False
+
+    async def export(self,
+                     conditions: Optional[Dict[str, Any]] = None,
+                     projection: Optional[Dict[str, int]] = None,
+                     batch_size: int = 1000,
+                     ) -> AsyncIterator[Dict[str, Any]]:
+        cursor = self.collection.find(conditions or {}, projection).sort("_id", 1).batch_size(batch_size)
+        try:
+            async for doc in cursor:
+                yield doc
+        finally:
+            await cursor.close()
+
+    async def delete(self, id: ObjectId) -> bool:
+        try:
+            await self.collection.delete_one({"_id": ObjectId(id)})
+            await self.revisions.delete_many({"post": ObjectId(id)})
+            return True
+        except Exception:
+            return False
+
+    async def add_revision(self, revision: Dict[str, Any]) -> ObjectId:
+        return (await self.revisions.insert_one(revision)).inserted_id
+
+    async def list_revisions(self, post_id: ObjectId, page_index: int = 1, page_size: int = 20,
+                             ) -> Tuple[List[Dict[str, Any]], int]:
+        conditions = {"post": ObjectId(post_id)}
+        docs = await (self.revisions.find(conditions)
+                      .sort([("created_at", -1), ("_id", -1)])
+                      .skip(page_size * (page_index - 1))
+                      .limit(page_size)
+                      .to_list(length=page_size))
+        return docs, await self.revisions.count_documents(conditions)
+
+    async def update_author_snapshot(self, author_id: ObjectId, snapshot: Dict[str, Any]) -> int:
+        result = await self.collection.update_many({"author": author_id}, build_author_snapshot_update(snapshot))
+        return result.modified_count
+
+
+def get_post_repository() -> AsyncPostRepository:
+    if settings.DATABASE_DRIVER == "motor":
+        return MotorPostRepository()
+    return ThreadedPostRepository()
@@ -0,0 +1,45 @@
+"""Raw post documents to response entities in one validation pass"""
+
+from typing import Any, Dict, List, Optional
+
+from pydantic import TypeAdapter
+
+from app.domain.post.entity import Post, PostRevision
+from app.infra.user.mapper import user_fields
+from app.shared.timing import timed
+
+_posts = TypeAdapter(List[Post])
+_revisions = TypeAdapter(List[PostRevision])
+
+
+def author_fields(doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """the embedded ``author_snapshot``, or the raw user ``AuthorLoader`` resolved for a post without one"""
+
+    snapshot = doc.get("author_snapshot")
+    if snapshot:
+        return dict(snapshot, id=str(snapshot["id"]))
+    author = doc.get("author")
+    if isinstance(author, dict):
+        return user_fields(author)
+    return None
+
+
+def post_fields(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """shape a raw post document for ``Post``"""
+
+    return dict(doc, id=str(doc["_id"]), author=author_fields(doc))
+
+
+@timed("map")
+def to_post(doc: Dict[str, Any]) -> Post:
+    return Post.model_validate(post_fields(doc))
+
+
+@timed("map")
+def to_posts(docs: List[Dict[str, Any]]) -> List[Post]:
+    return _posts.validate_python([post_fields(doc) for doc in docs])
+
+
+@timed("map")
+def to_revisions(docs: List[Dict[str, Any]]) -> List[PostRevision]:
+    return _revisions.validate_python([dict(doc, id=str(doc["_id"])) for doc in docs])
@@ -1,50 +1,175 @@
-from typing import List, Dict, Union, Optional, Any
+from datetime import datetime
+from typing import List, Dict, Union, Optional, Any, Tuple, Iterator
 
 from bson import ObjectId
-from mongoengine import QuerySet, DoesNotExist
+from mongoengine import NotUniqueError
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
+from app.config import settings
 from app.domain.post.entity import PostInCreate, PostInUpdate
-from app.infra.database.models.post import PostModel
+from app.domain.shared.enum import CountMode, UploadStatus
+from app.infra.database.models.post import AuthorSnapshot, PostModel, PostView, make_slug
+from app.infra.database.models.post_revision import PostRevisionModel
+from app.infra.database.monitoring import track_operations
+from app.shared.cursor import keyset_condition, keyset_sort
 
 
+def build_list_pipeline(page_index: int = 1,
+                        page_size: int = 20,
+                        match_pipeline: Optional[Dict[str, Any]] = None,
+                        sort: Optional[Dict[str, int]] = None,
+                        cursor: Optional[Tuple[str, Any, ObjectId]] = None,
+                        ) -> List[Dict[str, Any]]:
+    sort = keyset_sort(sort if sort else {"created_at": -1})
+    pipeline = []
+
+    if match_pipeline is not None:
+        pipeline.append(match_pipeline)
+
+    after = keyset_condition(sort, cursor)
+    if after is not None:
+        pipeline.append({"$match": after})
+
+    pipeline.append({"$sort": sort})
+    if after is None:
+        pipeline.append({"$skip": page_size * (page_index - 1)})
+    pipeline.append({"$limit": page_size})
+    return pipeline
+
+
+def build_list_with_total_pipeline(page_index: int = 1,
+                                   page_size: int = 20,
+                                   match_pipeline: Optional[Dict[str, Any]] = None,
+                                   sort: Optional[Dict[str, int]] = None,
+                                   count_mode: CountMode = CountMode.EXACT,
+                                   count_cap: int = 10000,
+                                   ) -> List[Dict[str, Any]]:
+    """offset page and total in one ``$facet``, cursor pages use ``build_list_pipeline`` and ``build_count_pipeline``
+    instead, a keyset ``$match`` after the sort would feed the whole result set to ``$facet``"""
+
+    sort = keyset_sort(sort if sort else {"created_at": -1})
+    skip = page_size * (page_index - 1)
+    pipeline = []
+
+    if match_pipeline is not None:
+        pipeline.append(match_pipeline)
+    pipeline.append({"$sort": sort})
+
+    total_pipeline = [{"$count": "document_count"}]
+    if count_mode is CountMode.CAPPED:
+        # nothing past the cap or the requested page is needed, stop feeding $facet there
+        pipeline.append({"$limit": max(count_cap + 1, skip + page_size)})
+        total_pipeline.insert(0, {"$limit": count_cap + 1})
+
+    pipeline.append({"$facet": {"data": [{"$skip": skip}, {"$limit": page_size}], "total": total_pipeline}})
+    return pipeline
+
+
+def build_count_pipeline(match_pipeline: Optional[Dict[str, Any]] = None,
+                         count_mode: CountMode = CountMode.EXACT,
+                         count_cap: int = 10000,
+                         ) -> List[Dict[str, Any]]:
+    """total of the un-keyed match, stopped after ``count_cap + 1`` documents with ``CountMode.CAPPED``"""
+
+    pipeline = [match_pipeline] if match_pipeline is not None else []
+    if count_mode is CountMode.CAPPED:
+        pipeline.append({"$limit": count_cap + 1})
+    pipeline.append({"$count": "document_count"})
+    return pipeline
+
+
+def build_find_query(skip: int,
+                     conditions: Dict[str, Any],
+                     sort: Optional[Dict[str, int]] = None,
+                     cursor: Optional[Tuple[str, Any, ObjectId]] = None,
+                     ) -> Tuple[Dict[str, Any], List[Tuple[str, int]], int]:
+    sort = keyset_sort(sort if sort else {"created_at": -1})
+    after = keyset_condition(sort, cursor)
+    if after is not None:
+        conditions = {"$and": [conditions, after]}
+        skip = 0
+    return conditions, list(sort.items()), skip
+
+
+def build_update(data: Union[PostInUpdate, Dict[str, Any]]) -> Dict[str, Any]:
+    data = data.model_dump(exclude_none=True) if isinstance(data, PostInUpdate) else dict(data)
+    if data.get("title"):
+        data["title_lower"] = data["title"].lower()
+    return data
+
+
+def build_author_snapshot_update(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """``$set`` of every snapshot field, a field missing from ``snapshot`` is cleared, posts without one get it"""
+
+    return {"$set": {f"author_snapshot.{field}": snapshot.get(field) for field in AuthorSnapshot._fields}}
+
+
+def duplicate_key_pattern(exc: Optional[BaseException]) -> Optional[Dict[str, Any]]:
+    """keys of the unique index a ``DuplicateKeyError`` violated, ``None`` when the server does not report them"""
+
+    if isinstance(exc, DuplicateKeyError):
+        return (exc.details or {}).get("keyPattern")
+    return None
+
+
+def write_errors(exc: BulkWriteError) -> Dict[int, str]:
+    """error message of every failed document of an unordered bulk insert, by index in the batch"""
+
+    errors = {}
+    for error in exc.details.get("writeErrors", []):
+        if error.get("code") == 11000:
+            key = ", ".join("{}={}".format(k, v) for k, v in (error.get("keyValue") or {}).items())
+            errors[error["index"]] = "Duplicate key {}".format(key).strip()
+        else:
+            errors[error["index"]] = error.get("errmsg", "Write error")
+    return errors
+
+
+@track_operations
 class PostRepository:
     def __init__(self):
         pass
 
     def create(self, obj_in: PostInCreate) -> PostModel:
+        """Insert a post, drawing a new slug suffix while the slug is taken.
+
+        Violations of another unique index are raised as they are.
+        """
         new_post = PostModel(**obj_in.model_dump())
-        new_post.save()
-        return new_post
+        for _ in range(settings.SLUG_MAX_ATTEMPTS):
+            try:
+                new_post.save(force_insert=True)
+                return new_post
+            except NotUniqueError as exc:
+                if not self.slug_taken(exc.__context__, new_post.slug):
+                    raise
+                new_post.slug = make_slug(new_post.title)
+        raise NotUniqueError("Could not allocate a unique slug")
 
-    def get_by_id(self, post_id: Union[str, ObjectId]) -> Optional[PostModel]:
-        qs: QuerySet = PostModel.objects(id=post_id)
+    def slug_taken(self, exc: Optional[BaseException], slug: str) -> bool:
+        """whether a duplicate key error comes from the ``slug`` index, looked up when the server does not say"""
 
-        try:
-            post: PostModel = qs.get()
-            return post
-        except DoesNotExist:
-            return None
+        key_pattern = duplicate_key_pattern(exc)
+        if key_pattern is not None:
+            return "slug" in key_pattern
+        return PostModel._get_collection().count_documents({"slug": slug}, limit=1) > 0
+
+    def get_by_slug(self, slug: str) -> Optional[Dict[str, Any]]:
+        return PostModel.objects(slug=slug).as_pymongo().first()
+
+    def get_by_id(self, post_id: Union[str, ObjectId]) -> Optional[Dict[str, Any]]:
+        return PostModel.objects(id=post_id).as_pymongo().first()
 
     def list(self,
              page_index: int = 1,
              page_size: int = 20,
              match_pipeline: Optional[Dict[str, Any]] = None,
              sort: Optional[Dict[str, int]] = None,
-             ) -> List[PostModel]:
-        pipeline = [
-            {"$sort": sort if sort else {"created_at": -1}},
-            {"$skip": page_size * (page_index - 1)},
-            {"$limit": page_size}
-        ]
-
-        if match_pipeline is not None:
-            pipeline.append(match_pipeline)
-
-        try:
-            docs = PostModel.objects().aggregate(pipeline)
-            return [PostModel.from_mongo(doc) for doc in docs] if docs else []
-        except Exception:
-            return []
+             cursor: Optional[Tuple[str, Any, ObjectId]] = None,
+             ) -> List[Dict[str, Any]]:
+        pipeline = build_list_pipeline(page_index=page_index, page_size=page_size, match_pipeline=match_pipeline,
+                                       sort=sort, cursor=cursor)
+        return list(PostModel.objects().aggregate(pipeline))
 
     def count_list(self,
                    match_pipeline: Optional[Dict[str, Any]] = None,
@@ -61,37 +186,140 @@ class PostRepository:
         except Exception:
             return 0
 
+    def list_with_total(self,
+                        page_index: int = 1,
+                        page_size: int = 20,
+                        match_pipeline: Optional[Dict[str, Any]] = None,
+                        sort: Optional[Dict[str, int]] = None,
+                        cursor: Optional[Tuple[str, Any, ObjectId]] = None,
+                        count_mode: CountMode = CountMode.EXACT,
+                        count_cap: int = 10000,
+                        ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Fetch a page of raw post documents and the matching total in a single aggregation.
+
+        With ``CountMode.CAPPED`` counting stops after ``count_cap + 1`` documents, so a total above
+        ``count_cap`` means "more than ``count_cap``". ``CountMode.NONE`` skips counting altogether. A cursor page is
+        read from its index range and counted by a second aggregation.
+        """
+        if count_mode is CountMode.NONE or cursor is not None:
+            docs = self.list(page_index=page_index, page_size=page_size, match_pipeline=match_pipeline, sort=sort,
+                             cursor=cursor)
+            if count_mode is CountMode.NONE:
+                return docs, None
+            counted = list(PostModel.objects().aggregate(build_count_pipeline(match_pipeline=match_pipeline,
+                                                                              count_mode=count_mode,
+                                                                              count_cap=count_cap)))
+            return docs, counted[0]["document_count"] if counted else 0
+
+        pipeline = build_list_with_total_pipeline(page_index=page_index, page_size=page_size,
+                                                  match_pipeline=match_pipeline, sort=sort,
+                                                  count_mode=count_mode, count_cap=count_cap)
+        result = list(PostModel.objects().aggregate(pipeline))[0]
+        total = result["total"][0]["document_count"] if result["total"] else 0
+        return result["data"], total
+
     def count(self, conditions: Dict[str, Union[str, bool, ObjectId]] = {}) -> int:
         try:
             return PostModel._get_collection().count_documents(conditions)
         except Exception:
             return 0
 
-    def find(self, skip: int, limit: int, conditions: Dict[str, Union[str, bool, ObjectId]] = {}) -> List[PostModel]:
+    def insert_many(self, docs: List[Dict[str, Any]]) -> Tuple[int, Dict[int, str]]:
+        """Insert raw posts with one unordered ``insert_many``, a failing document does not stop the others.
+
+        :return: (number of posts inserted, error message by index in ``docs``)
+        """
+        if not docs:
+            return 0, {}
         try:
-            docs = PostModel._get_collection().find(conditions).skip(skip).limit(limit)
-            return [PostModel.from_mongo(doc) for doc in docs] if docs else []
+            return len(PostModel._get_collection().insert_many(docs, ordered=False).inserted_ids), {}
+        except BulkWriteError as exc:
+            return exc.details.get("nInserted", 0), write_errors(exc)
+
+    def find(self,
+             skip: int,
+             limit: int,
+             conditions: Dict[str, Union[str, bool, ObjectId]] = {},
+             sort: Optional[Dict[str, int]] = None,
+             cursor: Optional[Tuple[str, Any, ObjectId]] = None,
+             ) -> List[Dict[str, Any]]:
+        conditions, sort, skip = build_find_query(skip=skip, conditions=conditions, sort=sort, cursor=cursor)
+
+        try:
+            return list(PostModel._get_collection()
+                        .find(conditions)
+                        .sort(sort)
+                        .skip(skip)
+                        .limit(limit))
         except Exception:
             return []
 
-    def find_one(self, conditions: Dict[str, Union[str, bool, ObjectId]] = {}) -> PostModel:
+    def find_one(self, conditions: Dict[str, Union[str, bool, ObjectId]] = {}) -> Optional[PostView]:
         try:
-            doc = PostModel._get_collection().find_one(conditions)
-            return PostModel.from_mongo(doc) if doc else None
+            return PostView.from_mongo(PostModel._get_collection().find_one(conditions))
         except Exception:
             return None
 
+    def export(self,
+               conditions: Optional[Dict[str, Any]] = None,
+               projection: Optional[Dict[str, int]] = None,
+               batch_size: int = 1000,
+               ) -> Iterator[Dict[str, Any]]:
+        """Stream raw posts in ``_id`` order from a server side cursor, ``batch_size`` documents per round trip.
+        """
+        cursor = PostModel._get_collection().find(conditions or {}, projection).sort("_id", 1).batch_size(batch_size)
+        try:
+            yield from cursor
+        finally:
+            cursor.close()
+
     def update(self, id: ObjectId, data: Union[PostInUpdate, Dict[str, Any]]) -> bool:
         try:
-            data = data.model_dump(exclude_none=True) if isinstance(data, PostInUpdate) else data
-            PostModel.objects(id=id).update_one(**data, upsert=False)
+            PostModel.objects(id=id).update_one(**build_update(data), upsert=False)
             return True
         except Exception:
             return False
 
+    def set_thumbnail(self, id: Union[str, ObjectId], url: Optional[str]) -> bool:
+        """Store the result of a background upload, ``None`` when it failed and the previous thumbnail stays.
+
+        ``last_updated_at`` moves so the ETag of the post changes.
+
+        :return: False when the post was deleted meanwhile
+        """
+        fields: Dict[str, Any] = {"thumbnail_status": UploadStatus.DONE if url else UploadStatus.FAILED,
+                                  "last_updated_at": datetime.utcnow()}
+        if url:
+            fields["thumbnail"] = url
+        return PostModel._get_collection().update_one({"_id": ObjectId(id)}, {"$set": fields}).matched_count > 0
+
     def delete(self, id: ObjectId) -> bool:
         try:
             PostModel.objects(id=id).delete()
+            PostRevisionModel._get_collection().delete_many({"post": ObjectId(id)})
             return True
         except Exception:
             return False
+
+    def add_revision(self, revision: Dict[str, Any]) -> ObjectId:
+        return PostRevisionModel._get_collection().insert_one(revision).inserted_id
+
+    def list_revisions(self, post_id: ObjectId, page_index: int = 1, page_size: int = 20,
+                       ) -> Tuple[List[Dict[str, Any]], int]:
+        """Fetch a page of raw revisions of a post, newest first, and their total"""
+
+        collection = PostRevisionModel._get_collection()
+        conditions = {"post": ObjectId(post_id)}
+        docs = list(collection.find(conditions)
+                    .sort([("created_at", -1), ("_id", -1)])
+                    .skip(page_size * (page_index - 1))
+                    .limit(page_size))
+        return docs, collection.count_documents(conditions)
+
+    def update_author_snapshot(self, author_id: ObjectId, snapshot: Dict[str, Any]) -> int:
+        """Copy the author snapshot into every post of the author with one write on the ``author`` index.
+
+        :return: number of posts updated
+        """
+        result = PostModel._get_collection().update_many({"author": author_id}, build_author_snapshot_update(snapshot))
+        return result.modified_count
@@ -0,0 +1,118 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.infra.security import password
+
+busy_exception = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Too many authentication requests, retry later",
+    headers={"Retry-After": "1"},
+)
+
+
+class PasswordHasherPool:
+    """Runs bcrypt in a dedicated process pool
+
+    bcrypt holds the GIL for hundreds of milliseconds, in the request threadpool a login burst slows every other
+    request of the worker. At most ``workers + queue_size`` jobs are accepted, the next ones fail fast with a 503.
+    ``workers=0`` runs the jobs in the request threadpool.
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.latency_ms_total = 0.0
+        self.latency_ms_max = 0.0
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # spawn, forking a process running the event loop and the driver threads is unsafe
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._new_executor()
+            return self._executor
+
+    def _replace(self, broken: ProcessPoolExecutor) -> None:
+        """shut a broken pool down and start a new one, once for all the jobs it failed"""
+
+        with self._lock:
+            if self._executor is not broken:
+                return
+            self._executor = self._new_executor()
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, fn: Callable, *args: Any) -> Any:
+        with self._lock:
+            if self.pending >= max(self.workers, 1) + self.queue_size:
+                self.rejected += 1
+                raise busy_exception
+            self.pending += 1
+
+        started = time.perf_counter()
+        executor: Optional[ProcessPoolExecutor] = None
+        try:
+            if self.workers <= 0:
+                return await run_in_threadpool(fn, *args)
+            executor = self.executor
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            # a worker died, the pool refuses every later job, replace it for the next ones
+            with self._lock:
+                self.failed += 1
+            if executor is not None:
+                self._replace(executor)
+            raise
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+                self.latency_ms_total += elapsed
+                self.latency_ms_max = max(self.latency_ms_max, elapsed)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.run(password.verify_password, plain_password, hashed_password)
+
+    async def hash(self, plain_password: str) -> str:
+        return await self.run(password.get_password_hash, plain_password)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "pending": self.pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "failed": self.failed,
+                "latency_ms_avg": round(self.latency_ms_total / self.completed, 3) if self.completed else 0.0,
+                "latency_ms_max": round(self.latency_ms_max, 3),
+            }
+
+
+password_hasher = PasswordHasherPool(workers=settings.PASSWORD_HASH_WORKERS,
+                                     queue_size=settings.PASSWORD_HASH_QUEUE_SIZE)
@@ -1,18 +1,19 @@
 from datetime import timedelta, datetime
-from typing import Optional
+from typing import Optional, Union
 
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 
 from app.config import settings
 from app.domain.auth.entity import TokenData
 from app.domain.user.entity import UserInDB
-from app.infra.database.models.user import UserModel
-from app.infra.user.user_repository import UserRepository
+from app.infra.database.models.user import UserModel, UserView
+from app.infra.security.password import verify_password, get_password_hash  # noqa: F401
+from app.infra.user.async_user_repository import AsyncUserRepository, get_user_repository
+from app.shared.cache import TTLCache
+from app.shared.timing import phase
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_STR}/auth/login")
 
 credentials_exception = HTTPException(
@@ -21,16 +22,15 @@ credentials_exception = HTTPException(
     headers={"WWW-Authenticate": "Bearer"},
 )
 
+# users resolved from a token, keyed by email, read only views shared by concurrent requests
+user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL)
+
 forbidden_exception = HTTPException(
     status_code=status.HTTP_403_FORBIDDEN,
     detail="Do not have permission",
 )
 
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-
 def verify_token(token: str) -> Optional[TokenData]:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
@@ -43,24 +43,33 @@ def verify_token(token: str) -> Optional[TokenData]:
         raise credentials_exception
 
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
-
-def get_current_user(
+async def get_current_user(
         token: str = Depends(oauth2_scheme),
-        user_repository: UserRepository = Depends(UserRepository),
-) -> UserModel:
-    token_data = verify_token(token=token)
-    user: UserModel = user_repository.get_by_email(email=token_data.email)
+        user_repository: AsyncUserRepository = Depends(get_user_repository),
+) -> UserView:
+    with phase("auth"):
+        token_data = verify_token(token=token)
+    user: Optional[UserView] = user_cache.get(token_data.email)
+    if user is not None:
+        return user
+
+    generation = user_cache.generation
+    user = await user_repository.get_by_email(email=token_data.email)
     if user is None:
         raise credentials_exception
+    user_cache.set(token_data.email, user, generation=generation)
     return user
 
 
-def get_current_admin(
-        user: UserModel = Depends(get_current_user),
-) -> UserModel:
+def invalidate_user(*users: Union[UserModel, UserView]) -> None:
+    """drop users from the ``get_current_user`` cache after they changed"""
+
+    user_cache.invalidate(*[user.email for user in users if user is not None])
+
+
+async def get_current_admin(
+        user: UserView = Depends(get_current_user),
+) -> UserView:
     current_user = UserInDB.model_validate(user)
     if not current_user.is_admin():
         raise forbidden_exception
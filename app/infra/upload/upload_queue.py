@@ -0,0 +1,203 @@
+import logging
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, BinaryIO, Callable, Dict, List, NamedTuple, Optional
+
+from fastapi import HTTPException, UploadFile, status
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.infra.upload.uploader import Uploader, get_uploader
+
+logger = logging.getLogger("app.upload")
+
+busy_exception = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Too many uploads, retry later",
+    headers={"Retry-After": "5"},
+)
+
+
+class SpooledUpload(NamedTuple):
+    path: str
+    public_id: str
+
+
+class UploadQueue:
+    """Uploads the request files on background threads
+
+    Endpoints copy the file to ``spool_dir`` and answer with the document in the ``pending`` state, a worker thread
+    uploads it, retrying with a delay doubled from ``retry_seconds``, and calls the job callback with the URL, or
+    ``None`` once ``max_attempts`` failed. Jobs live in memory, documents of the jobs lost by a restart stay pending.
+    ``upload`` runs the same attempts in the calling thread, for files with no document to update. A file counts as
+    pending from ``spool`` until it is uploaded or discarded, at most ``workers + queue_size`` are, the next uploads
+    answer 503 with ``Retry-After``.
+    """
+
+    def __init__(self, uploader: Uploader, workers: int, queue_size: int, max_attempts: int = 3,
+                 retry_seconds: float = 1, spool_dir: Optional[str] = None):
+        self.uploader = uploader
+        self.workers = max(workers, 1)
+        self.queue_size = queue_size
+        self.max_attempts = max(max_attempts, 1)
+        self.retry_seconds = retry_seconds
+        self.spool_dir = Path(spool_dir or os.path.join(tempfile.gettempdir(), "demo-blog-spool"))
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self.rejected = 0
+
+    async def spool(self, file: UploadFile) -> SpooledUpload:
+        """copy the request file out of the request, it is closed once the response is sent
+
+        Fails fast with a 503 once ``workers + queue_size`` files are pending. The caller submits, uploads or
+        discards the returned file.
+        """
+        with self._lock:
+            if self.pending >= self.workers + self.queue_size:
+                self.rejected += 1
+                raise busy_exception
+            self.pending += 1
+        try:
+            path = await run_in_threadpool(self._write, file.file, Path(file.filename or "").suffix)
+        except BaseException:
+            with self._lock:
+                self.pending -= 1
+            raise
+        return SpooledUpload(path=path, public_id=uuid.uuid4().hex)
+
+    def _write(self, source: BinaryIO, suffix: str) -> str:
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        fd, path = tempfile.mkstemp(suffix=suffix, dir=self.spool_dir)
+        with os.fdopen(fd, "wb") as target:
+            source.seek(0)
+            shutil.copyfileobj(source, target)
+        return path
+
+    def submit(self, upload: SpooledUpload, on_done: Callable[[Optional[str]], Any]) -> None:
+        """upload in the background, ``on_done`` runs on the worker thread"""
+
+        self._start()
+        self._queue.put((upload, on_done))
+
+    async def discard_on_failure(self, upload: Optional[SpooledUpload], response: Awaitable[Any]) -> Any:
+        """await the use case given ``upload``, the file is discarded unless it succeeded, it then scheduled the
+        upload"""
+
+        try:
+            result = await response
+        except BaseException:
+            if upload is not None:
+                self.discard(upload)
+            raise
+        if upload is not None and not result:
+            self.discard(upload)
+        return result
+
+    def discard(self, upload: SpooledUpload) -> None:
+        """drop a spooled file once uploaded or when it will not be, it stops counting as pending"""
+
+        try:
+            os.remove(upload.path)
+        except FileNotFoundError:
+            # already discarded
+            return
+        with self._lock:
+            self.pending -= 1
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"upload-worker-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                self._run(*job)
+            finally:
+                self._queue.task_done()
+
+    def upload(self, upload: SpooledUpload) -> Optional[str]:
+        """upload and drop a spooled file, blocking
+
+        :return: URL of the file, ``None`` once every attempt failed
+        """
+        url: Optional[str] = None
+        try:
+            for attempt in range(self.max_attempts):
+                if attempt:
+                    time.sleep(self.retry_seconds * 2 ** (attempt - 1))
+                    with self._lock:
+                        self.retries += 1
+                try:
+                    url = self.uploader.upload(upload.path, upload.public_id)
+                    break
+                except Exception:
+                    logger.warning("upload %s failed, attempt %d of %d", upload.public_id, attempt + 1,
+                                   self.max_attempts, exc_info=True)
+        finally:
+            self.discard(upload)
+            with self._lock:
+                if url is None:
+                    self.failed += 1
+                else:
+                    self.completed += 1
+        return url
+
+    def _run(self, upload: SpooledUpload, on_done: Callable[[Optional[str]], Any]) -> None:
+        try:
+            url = self.upload(upload)
+            on_done(url)
+        except Exception:
+            logger.exception("upload %s callback failed", upload.public_id)
+
+    def join(self) -> None:
+        """wait for the submitted jobs"""
+
+        self._queue.join()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "pending": self.pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retries": self.retries,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        """stop the workers once the waiting jobs are done, without blocking"""
+
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+
+
+upload_queue = UploadQueue(
+    get_uploader(),
+    workers=settings.UPLOAD_WORKERS,
+    queue_size=settings.UPLOAD_QUEUE_SIZE,
+    max_attempts=settings.UPLOAD_MAX_ATTEMPTS,
+    retry_seconds=settings.UPLOAD_RETRY_SECONDS,
+    spool_dir=settings.UPLOAD_SPOOL_DIR,
+)
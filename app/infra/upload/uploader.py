@@ -0,0 +1,53 @@
+import os
+import shutil
+from abc import ABC, abstractmethod
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import cloudinary.uploader
+
+from app.config import settings
+# configures the SDK
+from app.shared import cloudianry  # noqa: F401
+
+
+class Uploader(ABC):
+    """Stores the spooled files, ``upload`` blocks and runs on the upload worker threads"""
+
+    @abstractmethod
+    def upload(self, path: str, public_id: str) -> str:
+        """store the file at ``path`` under ``public_id``
+
+        :return: public URL of the file
+        """
+        ...
+
+
+class CloudinaryUploader(Uploader):
+    def upload(self, path: str, public_id: str) -> str:
+        return cloudinary.uploader.upload(path, public_id=public_id)["secure_url"]
+
+
+class LocalUploader(Uploader):
+    """Copies the files into a local directory, for offline development and tests"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory or os.path.join(tempfile.gettempdir(), "demo-blog-uploads"))
+
+    def upload(self, path: str, public_id: str) -> str:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(path, self.directory / public_id)
+        return (self.directory / public_id).resolve().as_uri()
+
+
+def upload_backend() -> str:
+    if settings.UPLOAD_BACKEND:
+        return settings.UPLOAD_BACKEND
+    return "local" if settings.ENVIRONMENT == "testing" else "cloudinary"
+
+
+def get_uploader() -> Uploader:
+    if upload_backend() == "local":
+        return LocalUploader(settings.UPLOAD_LOCAL_DIR)
+    return CloudinaryUploader()
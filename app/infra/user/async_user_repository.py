@@ -0,0 +1,207 @@
+from abc import ABC, abstractmethod
+from typing import Union, Optional, List, Dict, Any, AsyncIterator
+
+from bson import ObjectId
+from mongoengine import NotUniqueError
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo.errors import DuplicateKeyError
+from starlette.concurrency import run_in_threadpool, iterate_in_threadpool
+
+from app.config import settings
+from app.domain.user.entity import UserInCreate, UserInUpdate
+from app.infra.database import get_motor_database
+from app.infra.database.models.user import UserModel, UserView
+from app.infra.database.monitoring import track_operations
+from app.infra.user.user_repository import UserRepository, build_find_pipeline, build_update
+
+
+class AsyncUserRepository(ABC):
+    """User repository interface used by the use cases"""
+
+    @abstractmethod
+    async def create(self, user: UserInCreate) -> UserModel:
+        ...
+
+    @abstractmethod
+    async def get_by_id(self, user_id: Union[str, ObjectId]) -> Optional[UserView]:
+        ...
+
+    @abstractmethod
+    async def get_by_email(self, email: str) -> Optional[UserView]:
+        ...
+
+    @abstractmethod
+    async def find_by_ids(self, ids: List[Union[str, ObjectId]]) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def list(self, page_index: int = 1, page_size: int = 20) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def count(self, conditions: Dict[str, Union[str, bool, ObjectId]] = {}) -> int:
+        ...
+
+    @abstractmethod
+    def export(self,
+               conditions: Optional[Dict[str, Any]] = None,
+               projection: Optional[Dict[str, int]] = None,
+               batch_size: int = 1000,
+               ) -> AsyncIterator[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def delete(self, id: ObjectId) -> bool:
+        ...
+
+    @abstractmethod
+    async def update(self, id: ObjectId, data: Union[UserInUpdate, Dict[str, Any]]) -> bool:
+        ...
+
+    @abstractmethod
+    async def find(self,
+                   page_size: Optional[int] = None,
+                   page_index: Optional[int] = None,
+                   conditions: Dict[str, Any] = {},
+                   sort: Optional[Dict[str, int]] = None,
+                   ) -> List[UserView]:
+        ...
+
+
+class ThreadedUserRepository(AsyncUserRepository):
+    """Runs the mongoengine repository in the threadpool"""
+
+    def __init__(self, repository: Optional[UserRepository] = None):
+        self.repository = repository or UserRepository()
+
+    async def create(self, user: UserInCreate) -> UserModel:
+        return await run_in_threadpool(self.repository.create, user=user)
+
+    async def get_by_id(self, user_id: Union[str, ObjectId]) -> Optional[UserView]:
+        return await run_in_threadpool(self.repository.get_by_id, user_id=user_id)
+
+    async def get_by_email(self, email: str) -> Optional[UserView]:
+        return await run_in_threadpool(self.repository.get_by_email, email=email)
+
+    async def find_by_ids(self, ids: List[Union[str, ObjectId]]) -> List[Dict[str, Any]]:
+        return await run_in_threadpool(self.repository.find_by_ids, ids=ids)
+
+    async def list(self, page_index: int = 1, page_size: int = 20) -> List[Dict[str, Any]]:
+        return await run_in_threadpool(self.repository.list, page_index=page_index, page_size=page_size)
+
+    async def count(self, conditions: Dict[str, Union[str, bool, ObjectId]] = {}) -> int:
+        return await run_in_threadpool(self.repository.count, conditions=conditions)
+
+    def export(self,
+               conditions: Optional[Dict[str, Any]] = None,
+               projection: Optional[Dict[str, int]] = None,
+               batch_size: int = 1000,
+               ) -> AsyncIterator[Dict[str, Any]]:
+        return iterate_in_threadpool(self.repository.export(conditions=conditions, projection=projection,
+                                                            batch_size=batch_size))
+
+    async def delete(self, id: ObjectId) -> bool:
+        return await run_in_threadpool(self.repository.delete, id=id)
+
+    async def update(self, id: ObjectId, data: Union[UserInUpdate, Dict[str, Any]]) -> bool:
+        return await run_in_threadpool(self.repository.update, id=id, data=data)
+
+    async def find(self, **kwargs) -> List[UserView]:
+        return await run_in_threadpool(self.repository.find, **kwargs)
+
+
+@track_operations
+class MotorUserRepository(AsyncUserRepository):
+    """Native asyncio implementation on top of Motor"""
+
+    @property
+    def collection(self) -> AsyncIOMotorCollection:
+        return get_motor_database()[UserModel._get_collection_name()]
+
+    async def create(self, user: UserInCreate) -> UserModel:
+        new_user = UserModel(**user.model_dump())
+        new_user.validate()
+        try:
+            result = await self.collection.insert_one(new_user.to_mongo())
+        except DuplicateKeyError as exc:
+            raise NotUniqueError(str(exc))
+        new_user.id = result.inserted_id
+        return new_user
+
+    async def get_by_id(self, user_id: Union[str, ObjectId]) -> Optional[UserView]:
+        return UserView.from_mongo(await self.collection.find_one({"_id": ObjectId(user_id)}))
+
+    async def get_by_email(self, email: str) -> Optional[UserView]:
+        return UserView.from_mongo(await self.collection.find_one({"email": email}))
+
+    async def find_by_ids(self, ids: List[Union[str, ObjectId]]) -> List[Dict[str, Any]]:
+        if not ids:
+            return []
+        try:
+            return await self.collection.find({"_id": {"$in": [ObjectId(id) for id in ids]}}).to_list(length=None)
+        except Exception:
+            return []
+
+    async def list(self, page_index: int = 1, page_size: int = 20) -> List[Dict[str, Any]]:
+        try:
+            return await (self.collection
+                          .find()
+                          .sort("_id", -1)
+                          .skip((page_index - 1) * page_size)
+                          .limit(page_size)
+                          .to_list(length=page_size))
+        except Exception:
+            return []
+
+    async def count(self, conditions: Dict[str, Union[str, bool, ObjectId]] = {}) -> int:
+        try:
+            if not conditions:
+                return await self.collection.estimated_document_count()
+            return await self.collection.count_documents(conditions)
+        except Exception:
+            return 0
+
+    async def export(self,
+                     conditions: Optional[Dict[str, Any]] = None,
+                     projection: Optional[Dict[str, int]] = None,
+                     batch_size: int = 1000,
+                     ) -> AsyncIterator[Dict[str, Any]]:
+        cursor = self.collection.find(conditions or {}, projection).sort("_id", 1).batch_size(batch_size)
+        try:
+            async for doc in cursor:
+                yield doc
+        finally:
+            await cursor.close()
+
+    async def delete(self, id: ObjectId) -> bool:
+        try:
+            await self.collection.delete_one({"_id": ObjectId(id)})
+            return True
+        except Exception:
+            return False
+
+    async def update(self, id: ObjectId, data: Union[UserInUpdate, Dict[str, Any]]) -> bool:
+        try:
+            await self.collection.update_one({"_id": ObjectId(id)}, {"$set": build_update(data)}, upsert=False)
+            return True
+        except Exception:
+            return False
+
+    async def find(self,
+                   page_size: Optional[int] = None,
+                   page_index: Optional[int] = None,
+                   conditions: Dict[str, Any] = {},
+                   sort: Optional[Dict[str, int]] = None,
+                   ) -> List[UserView]:
+        pipeline = build_find_pipeline(page_size=page_size, page_index=page_index, conditions=conditions, sort=sort)
+        try:
+            docs = await self.collection.aggregate(pipeline).to_list(length=None)
+            return [UserView.from_mongo(doc) for doc in docs]
+        except Exception:
+            return []
+
+
+def get_user_repository() -> AsyncUserRepository:
+    if settings.DATABASE_DRIVER == "motor":
+        return MotorUserRepository()
+    return ThreadedUserRepository()
@@ -0,0 +1,60 @@
+from typing import Any, Dict, List, Optional
+
+from bson import DBRef, ObjectId
+from fastapi import Depends
+
+from app.infra.user.async_user_repository import AsyncUserRepository, get_user_repository
+
+
+class AuthorLoader:
+    """Request scoped loader resolving the authors of posts written before ``author_snapshot``, in batches.
+
+    Posts render their embedded snapshot, only posts without one read Users. FastAPI builds one instance per
+    request, so authors fetched for one page are reused by every use case that runs in the same request.
+    """
+
+    def __init__(self, user_repository: AsyncUserRepository = Depends(get_user_repository)):
+        self.user_repository = user_repository
+        self._authors: Dict[ObjectId, Dict[str, Any]] = {}
+
+    @staticmethod
+    def _author_id(post: Dict[str, Any]) -> Optional[ObjectId]:
+        author = post.get("author")
+        if isinstance(author, dict):
+            return author.get("_id")
+        if isinstance(author, DBRef):
+            return author.id
+        return author
+
+    async def load(self, posts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Replace the author reference of raw posts without ``author_snapshot`` with the raw author, fetching
+        every unknown author with a single query. The reference stays when the author was deleted.
+
+        :param posts: raw post documents
+        :return: the same posts with ``author`` populated
+        """
+        posts_without_snapshot = [post for post in posts if not post.get("author_snapshot")]
+        missing = set()
+        for post in posts_without_snapshot:
+            author = post.get("author")
+            if isinstance(author, dict):
+                self._authors.setdefault(author["_id"], author)
+                continue
+            author_id = self._author_id(post)
+            if author_id is not None and author_id not in self._authors:
+                missing.add(author_id)
+
+        if missing:
+            for user in await self.user_repository.find_by_ids(list(missing)):
+                self._authors[user["_id"]] = user
+
+        for post in posts_without_snapshot:
+            author = self._authors.get(self._author_id(post))
+            if author is not None:
+                post["author"] = author
+        return posts
+
+    async def load_one(self, post: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if post is not None:
+            await self.load([post])
+        return post
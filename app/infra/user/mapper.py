@@ -0,0 +1,24 @@
+from typing import Any, Dict, List
+
+from pydantic import TypeAdapter
+
+from app.domain.user.entity import User
+from app.shared.timing import timed
+
+_users = TypeAdapter(List[User])
+
+
+def user_fields(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """shape a raw user document for ``User``, unknown keys such as the password are ignored on validation"""
+
+    return dict(doc, id=str(doc["_id"]))
+
+
+@timed("map")
+def to_user(doc: Dict[str, Any]) -> User:
+    return User.model_validate(user_fields(doc))
+
+
+@timed("map")
+def to_users(docs: List[Dict[str, Any]]) -> List[User]:
+    return _users.validate_python([user_fields(doc) for doc in docs])
@@ -1,13 +1,34 @@
 from builtins import isinstance
-from typing import Union, Optional, List, Dict, Any
+from typing import Union, Optional, List, Dict, Any, Iterator
 
 from bson import ObjectId
-from mongoengine import QuerySet, DoesNotExist
 
+from app.domain.shared.enum import UploadStatus
 from app.domain.user.entity import UserInCreate, UserInUpdate
-from app.infra.database.models.user import UserModel
+from app.infra.database.models.user import UserModel, UserView
+from app.infra.database.monitoring import track_operations
 
 
+def build_find_pipeline(page_size: Optional[int] = None,
+                        page_index: Optional[int] = None,
+                        conditions: Dict[str, Any] = {},
+                        sort: Optional[Dict[str, int]] = None,
+                        ) -> List[Dict[str, Any]]:
+    pipeline = [
+        {"$sort": sort if sort else {"_id": -1}},
+        {"$match": conditions}
+    ]
+
+    if isinstance(page_size, int) and isinstance(page_index, int):
+        pipeline.extend([{"$skip": page_size * (page_index - 1)}, {"$limit": page_size}])
+    return pipeline
+
+
+def build_update(data: Union[UserInUpdate, Dict[str, Any]]) -> Dict[str, Any]:
+    return data.model_dump(exclude_none=True) if isinstance(data, UserInUpdate) else dict(data)
+
+
+@track_operations
 class UserRepository:
     def __init__(self):
         pass
@@ -17,43 +38,57 @@ class UserRepository:
         new_user.save()
         return new_user
 
-    def get_by_id(self, user_id: Union[str, ObjectId]) -> Optional[UserModel]:
-        qs: QuerySet = UserModel.objects(id=user_id)
+    def get_by_id(self, user_id: Union[str, ObjectId]) -> Optional[UserView]:
+        return UserView.from_mongo(UserModel.objects(id=user_id).as_pymongo().first())
 
-        try:
-            user: UserModel = qs.get()
-            return user
-        except DoesNotExist:
-            return None
+    def get_by_email(self, email: str) -> Optional[UserView]:
+        return UserView.from_mongo(UserModel.objects(email=email).as_pymongo().first())
 
-    def get_by_email(self, email: str) -> Optional[UserModel]:
-        qs: QuerySet = UserModel.objects(email=email)
+    def find_by_ids(self, ids: List[Union[str, ObjectId]]) -> List[Dict[str, Any]]:
+        if not ids:
+            return []
         try:
-            user: UserModel = qs.get()
-            return user
-        except DoesNotExist:
-            return None
+            return list(UserModel.objects(id__in=ids).as_pymongo())
+        except Exception:
+            return []
 
     def list(self,
              page_index: int = 1,
              page_size: int = 20
-             ) -> List[UserModel]:
+             ) -> List[Dict[str, Any]]:
         try:
             docs = (UserModel
                     .objects()
                     .order_by("-_id")
                     .skip((page_index - 1) * page_size)
-                    .limit(page_size))
-            return docs
+                    .limit(page_size)
+                    .as_pymongo())
+            return list(docs)
         except Exception:
             return []
 
     def count(self, conditions: Dict[str, Union[str, bool, ObjectId]] = {}) -> int:
         try:
+            if not conditions:
+                # collection metadata, counting every document is a collection scan
+                return UserModel._get_collection().estimated_document_count()
             return UserModel._get_collection().count_documents(conditions)
         except Exception:
             return 0
 
+    def export(self,
+               conditions: Optional[Dict[str, Any]] = None,
+               projection: Optional[Dict[str, int]] = None,
+               batch_size: int = 1000,
+               ) -> Iterator[Dict[str, Any]]:
+        """Stream raw users in ``_id`` order from a server side cursor, ``batch_size`` documents per round trip.
+        """
+        cursor = UserModel._get_collection().find(conditions or {}, projection).sort("_id", 1).batch_size(batch_size)
+        try:
+            yield from cursor
+        finally:
+            cursor.close()
+
     def delete(self, id: ObjectId) -> bool:
         try:
             UserModel.objects(id=id).delete()
@@ -63,28 +98,31 @@ class UserRepository:
 
     def update(self, id: ObjectId, data: Union[UserInUpdate, Dict[str, Any]]) -> bool:
         try:
-            data = data.model_dump(exclude_none=True) if isinstance(data, UserInUpdate) else data
-            UserModel.objects(id=id).update_one(**data, upsert=False)
+            UserModel.objects(id=id).update_one(**build_update(data), upsert=False)
             return True
         except Exception:
             return False
 
+    def set_avatar(self, id: Union[str, ObjectId], url: Optional[str]) -> bool:
+        """Store the result of a background upload, ``None`` when it failed and the previous avatar stays.
+
+        :return: False when the user was deleted meanwhile
+        """
+        fields: Dict[str, Any] = {"avatar_status": UploadStatus.DONE if url else UploadStatus.FAILED}
+        if url:
+            fields["avatar"] = url
+        return UserModel._get_collection().update_one({"_id": ObjectId(id)}, {"$set": fields}).matched_count > 0
+
     def find(self,
              page_size: Optional[int] = None,
              page_index: Optional[int] = None,
              conditions: Dict[str, Any] = {},
              sort: Optional[Dict[str, int]] = None,
-             ) -> List[UserModel]:
-        pipeline = [
-            {"$sort": sort if sort else {"_id": -1}},
-            {"$match": conditions}
-        ]
-
-        if isinstance(page_size, int) and isinstance(page_index, int):
-            pipeline.extend([{"$skip": page_size * (page_index - 1)}, {"$limit": page_size}])
+             ) -> List[UserView]:
+        pipeline = build_find_pipeline(page_size=page_size, page_index=page_index, conditions=conditions, sort=sort)
 
         try:
             docs = UserModel.objects().aggregate(pipeline)
-            return [UserModel.from_mongo(doc) for doc in docs] if docs else []
+            return [UserView.from_mongo(doc) for doc in docs] if docs else []
         except Exception:
             return []
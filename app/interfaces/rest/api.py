@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.interfaces.rest.endpoints import auth, post, user, upload
+from app.interfaces.rest.endpoints import auth, post, user, upload, system
 
 api_router = APIRouter()
 
@@ -8,3 +8,4 @@ api_router.include_router(auth.router, prefix="/auth", tags=["Auth"])
 api_router.include_router(post.router, prefix="/post", tags=["Post"])
 api_router.include_router(user.router, prefix="/user", tags=["User"])
 api_router.include_router(upload.router, prefix="/upload", tags=["Upload"])
+api_router.include_router(system.router, prefix="/system", tags=["System"])
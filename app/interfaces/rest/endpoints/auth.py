@@ -10,15 +10,15 @@ router = APIRouter()
 
 @router.post("/login", response_model=AuthInfoInResponse)
 @response_decorator()
-def login(payload: LoginRequest = Body(...), login_use_case: LoginUseCase = Depends(LoginUseCase)):
+async def login(payload: LoginRequest = Body(...), login_use_case: LoginUseCase = Depends(LoginUseCase)):
     req_object = LoginRequestObject.builder(login_payload=payload)
-    response = login_use_case.execute(req_object)
+    response = await login_use_case.execute(req_object)
     return response
 
 
 @router.post("/signup", response_model=AuthInfoInResponse)
 @response_decorator()
-def signup(payload: SignupRequest = Body(...), signup_use_case: SignupUseCase = Depends(SignupUseCase)):
+async def signup(payload: SignupRequest = Body(...), signup_use_case: SignupUseCase = Depends(SignupUseCase)):
     req_object = SignupRequestObject.builder(payload=payload)
-    response = signup_use_case.execute(req_object)
+    response = await signup_use_case.execute(req_object)
     return response
@@ -0,0 +1,91 @@
+import asyncio
+from typing import Iterable, Sequence, Tuple
+
+from fastapi import APIRouter
+from anyio.to_thread import current_default_thread_limiter
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+
+from app.config import settings
+from app.infra.database.monitoring import pool_stats
+from app.infra.security.password_pool import password_hasher
+from app.infra.upload.upload_queue import upload_queue
+from app.infra.security.security_service import user_cache
+from app.shared.metrics import REGISTRY, merge, read_snapshots, render, write_snapshot
+
+router = APIRouter()
+
+Samples = Iterable[Tuple[Sequence[str], float]]
+
+
+def _threadpool(field: str) -> Samples:
+    limiter = current_default_thread_limiter()
+    values = {
+        "busy": limiter.borrowed_tokens,
+        "max": limiter.total_tokens,
+        "waiting": limiter.statistics().tasks_waiting,
+    }
+    return [((), values[field])]
+
+
+def _pool(field: str) -> Samples:
+    return [((client,), stats[field]) for client, stats in pool_stats().items()]
+
+
+REGISTRY.collector("threadpool_threads_busy", "Threads of the request threadpool in use", "gauge", [],
+                   lambda: _threadpool("busy"))
+REGISTRY.collector("threadpool_threads_max", "Size of the request threadpool", "gauge", [],
+                   lambda: _threadpool("max"))
+REGISTRY.collector("threadpool_tasks_waiting", "Calls waiting for a threadpool thread", "gauge", [],
+                   lambda: _threadpool("waiting"))
+REGISTRY.collector("mongodb_pool_connections_open", "Open MongoDB connections", "gauge", ["client"],
+                   lambda: _pool("open"))
+REGISTRY.collector("mongodb_pool_connections_checked_out", "MongoDB connections in use", "gauge", ["client"],
+                   lambda: _pool("checked_out"))
+REGISTRY.collector("mongodb_pool_wait_queue", "Operations waiting for a MongoDB connection", "gauge", ["client"],
+                   lambda: _pool("wait_queue"))
+REGISTRY.collector("password_hash_pending", "bcrypt jobs running or queued", "gauge", [],
+                   lambda: [((), password_hasher.stats()["pending"])])
+REGISTRY.collector("password_hash_completed_total", "bcrypt jobs completed", "counter", [],
+                   lambda: [((), password_hasher.stats()["completed"])])
+REGISTRY.collector("password_hash_rejected_total", "bcrypt jobs rejected with 503", "counter", [],
+                   lambda: [((), password_hasher.stats()["rejected"])])
+REGISTRY.collector("upload_pending", "Spooled uploads not done yet", "gauge", [],
+                   lambda: [((), upload_queue.stats()["pending"])])
+REGISTRY.collector("upload_completed_total", "Background uploads done", "counter", [],
+                   lambda: [((), upload_queue.stats()["completed"])])
+REGISTRY.collector("upload_failed_total", "Background uploads failed after every attempt", "counter", [],
+                   lambda: [((), upload_queue.stats()["failed"])])
+REGISTRY.collector("upload_retries_total", "Background upload attempts retried", "counter", [],
+                   lambda: [((), upload_queue.stats()["retries"])])
+REGISTRY.collector("upload_rejected_total", "Uploads rejected with 503", "counter", [],
+                   lambda: [((), upload_queue.stats()["rejected"])])
+# hit ratio: rate(cache_hits_total) / (rate(cache_hits_total) + rate(cache_misses_total))
+REGISTRY.collector("cache_hits_total", "Cache hits", "counter", ["cache"],
+                   lambda: [(("user",), user_cache.stats()["hits"])])
+REGISTRY.collector("cache_misses_total", "Cache misses", "counter", ["cache"],
+                   lambda: [(("user",), user_cache.stats()["misses"])])
+REGISTRY.collector("cache_entries", "Cached entries", "gauge", ["cache"],
+                   lambda: [(("user",), user_cache.stats()["size"])])
+
+
+async def flush_periodically() -> None:
+    """write the snapshot of this worker every ``METRICS_FLUSH_SECONDS`` for the worker answering the scrape"""
+
+    while True:
+        await flush()
+        await asyncio.sleep(settings.METRICS_FLUSH_SECONDS)
+
+
+async def flush() -> None:
+    # collectors read the threadpool limiter of the event loop, collect on the loop and write in the threadpool
+    await run_in_threadpool(write_snapshot, settings.METRICS_DIR, REGISTRY.collect())
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    snapshot = REGISTRY.collect()
+    if settings.METRICS_DIR:
+        others = await run_in_threadpool(read_snapshots, settings.METRICS_DIR, 3 * settings.METRICS_FLUSH_SECONDS)
+        snapshot = merge([snapshot, others])
+    return Response(render(snapshot), media_type="text/plain; version=0.0.4; charset=utf-8")
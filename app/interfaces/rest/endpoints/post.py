@@ -1,121 +1,191 @@
+from datetime import datetime
 from typing import Optional
 
 from fastapi import APIRouter, Body, UploadFile, File, Depends, Query, HTTPException
+from starlette.responses import StreamingResponse
 
-from app.domain.post.entity import Post, PostInCreatePayload, PostInCreate, ManyPostResponse, PostInUpdate, SearchByPost
-from app.domain.shared.enum import Sort
+from app.config import settings
+from app.domain.post.entity import Post, PostInCreatePayload, PostInCreate, ManyPostResponse, PostInUpdate, SearchByPost, \
+    ImportPostResponse, ManyPostRevisionResponse, POST_SORT_FIELDS
+from app.domain.shared.enum import Sort, CountMode
 from app.domain.user.entity import UserInDB
-from app.infra.database.models.user import UserModel
-from app.infra.security.security_service import get_current_user
-from app.shared.cloudianry import create_upload_file
+from app.infra.database.models.user import UserModel, UserView
+from app.infra.security.security_service import get_current_user, get_current_admin
+from app.infra.upload.upload_queue import SpooledUpload, upload_queue
 from app.shared.decorator import response_decorator
+from app.shared.response_object import ResponseSuccess
 from app.shared.validate_image import validate_image
+from app.use_cases.post.bulk_import import ImportPostRequestObject, ImportPostUseCase
 from app.use_cases.post.create import CreatePostRequestObject, CreatePostUseCase
 from app.use_cases.post.delete import DeletePostRequestObject, DeletePostUseCase
+from app.use_cases.post.export import ExportPostRequestObject, ExportPostUseCase
 from app.use_cases.post.get import GetPostByIdUseCase, GetPostByIdObjectRequest
+from app.use_cases.post.get_by_slug import GetPostBySlugUseCase, GetPostBySlugObjectRequest
 from app.use_cases.post.get_me import GetPostMeUseCase, GetPostMeObjectRequest
 from app.use_cases.post.list import ListPostUseCase, ListPostRequestObject
+from app.use_cases.post.list_revisions import ListPostRevisionUseCase, ListPostRevisionObjectRequest
 from app.use_cases.post.update import UpdatePostObjectRequest, UpdatePostUseCase
 
 router = APIRouter()
 
 
 @router.get("", response_model=ManyPostResponse)
-@response_decorator()
-def get_all_post(
+@response_decorator(cache_control="public, no-cache")
+async def get_all_post(
         page_index: int = Query(default=1, title="Page index"),
         page_size: int = Query(default=20, title="Page size"),
+        cursor: Optional[str] = Query(default=None, title="Cursor returned as pagination.next_cursor"),
         search: str = Query(Optional[str], title="Search"),
         search_by: Optional[SearchByPost] = SearchByPost.TITLE,
         list_post_use_case: ListPostUseCase = Depends(ListPostUseCase),
         sort: Optional[Sort] = Sort.DESC,
-        sort_by: Optional[str] = 'created_at'
+        sort_by: Optional[str] = 'created_at',
+        count: Optional[CountMode] = CountMode.EXACT,
 ):
-    annotations = {}
-    for base in reversed(Post.__mro__):
-        annotations.update(getattr(base, '__annotations__', {}))
-    if sort_by not in annotations:
+    if sort_by not in POST_SORT_FIELDS:
+        # every other field would sort the whole collection in memory
         raise HTTPException(status_code=400, detail=f"Invalid sort_by: {sort_by}")
 
-    sort_query = {sort_by: 1 if sort is sort.ASCE else -1}
+    sort_query = {"_id" if sort_by == "id" else sort_by: 1 if sort is sort.ASCE else -1}
     req_object = ListPostRequestObject.builder(page_index=page_index, page_size=page_size, search=search,
-                                               search_by=search_by, sort=sort_query)
-    response = list_post_use_case.execute(request_object=req_object)
+                                               search_by=search_by, sort=sort_query, cursor=cursor,
+                                               count_mode=count)
+    response = await list_post_use_case.execute(request_object=req_object)
     return response
 
 
 @router.post("", response_model=Post)
 @response_decorator()
-def create_post(
+async def create_post(
         payload: PostInCreatePayload = Body(...),
         thumbnail: UploadFile = File(None),
-        current_user: UserModel = Depends(get_current_user),
+        current_user: UserView = Depends(get_current_user),
         create_post_use_case: CreatePostUseCase = Depends(CreatePostUseCase)
 ):
-    url: Optional[str] = None
+    new_payload = PostInCreate(**payload.model_dump(), author=UserModel.from_view(current_user))
+    upload: Optional[SpooledUpload] = None
     if thumbnail:
         validate_image(thumbnail)
-        url = create_upload_file(thumbnail)
+        upload = await upload_queue.spool(thumbnail)
+
+    req_object = CreatePostRequestObject.builder(payload=new_payload, thumbnail=upload)
+    response = await upload_queue.discard_on_failure(upload, create_post_use_case.execute(request_object=req_object))
+    return response
 
-    new_payload = PostInCreate(**payload.model_dump(), author=current_user, thumbnail=url)
-    req_object = CreatePostRequestObject.builder(payload=new_payload)
-    response = create_post_use_case.execute(request_object=req_object)
+
+@router.post("/import", response_model=ImportPostResponse)
+@response_decorator()
+async def import_post(
+        file: UploadFile = File(..., description="JSONL, one post per line"),
+        chunk_size: int = Query(default=settings.POST_IMPORT_CHUNK_SIZE, title="Posts written per insert_many"),
+        current_user: UserView = Depends(get_current_admin),
+        import_post_use_case: ImportPostUseCase = Depends(ImportPostUseCase),
+):
+    req_object = ImportPostRequestObject.builder(lines=file.file, default_author_id=current_user.id,
+                                                 chunk_size=chunk_size)
+    response = await import_post_use_case.execute(request_object=req_object)
     return response
 
 
 @router.get("/me", response_model=ManyPostResponse)
 @response_decorator()
-def get_post_me(
+async def get_post_me(
         page_index: int = Query(default=1, title="Page index"),
         page_size: int = Query(default=20, title="Page size"),
+        cursor: Optional[str] = Query(default=None, title="Cursor returned as pagination.next_cursor"),
         get_post_me_use_case: GetPostMeUseCase = Depends(GetPostMeUseCase),
-        current_user: UserModel = Depends(get_current_user),
+        current_user: UserView = Depends(get_current_user),
 ):
-    req_object = GetPostMeObjectRequest.builder(author_id=current_user.id, page_size=page_size, page_index=page_index)
-    response = get_post_me_use_case.execute(request_object=req_object)
+    req_object = GetPostMeObjectRequest.builder(author_id=current_user.id, page_size=page_size, page_index=page_index,
+                                                cursor=cursor)
+    response = await get_post_me_use_case.execute(request_object=req_object)
     return response
 
 
-@router.get("/{post_id}", response_model=Post)
+@router.get("/export", dependencies=[Depends(get_current_admin)])
 @response_decorator()
-def get_post_by_id(
+async def export_post(
+        created_from: Optional[datetime] = Query(default=None, title="Created at or after"),
+        created_to: Optional[datetime] = Query(default=None, title="Created before"),
+        fields: Optional[str] = Query(default=None, title="Comma separated fields to export"),
+        batch_size: int = Query(default=1000, title="Documents fetched per round trip"),
+        export_post_use_case: ExportPostUseCase = Depends(ExportPostUseCase),
+):
+    req_object = ExportPostRequestObject.builder(created_from=created_from, created_to=created_to,
+                                                 fields=fields.split(",") if fields else None,
+                                                 batch_size=batch_size)
+    response = await export_post_use_case.execute(request_object=req_object)
+    if isinstance(response, ResponseSuccess):
+        # newline delimited JSON streamed from a server side cursor
+        return StreamingResponse(response.value, media_type="application/x-ndjson")
+    return response
+
+
+@router.get("/slug/{slug}", response_model=Post)
+@response_decorator(cache_control="public, no-cache")
+async def get_post_by_slug(
+        slug: str,
+        get_post_by_slug_use_case: GetPostBySlugUseCase = Depends(GetPostBySlugUseCase)
+):
+    req_object = GetPostBySlugObjectRequest.builder(slug=slug)
+    response = await get_post_by_slug_use_case.execute(request_object=req_object)
+    return response
+
+
+@router.get("/{post_id}", response_model=Post)
+@response_decorator(cache_control="public, no-cache")
+async def get_post_by_id(
         post_id: str,
         get_post_by_id_use_case: GetPostByIdUseCase = Depends(GetPostByIdUseCase)
 ):
     req_object = GetPostByIdObjectRequest.builder(post_id=post_id)
-    response = get_post_by_id_use_case.execute(request_object=req_object)
+    response = await get_post_by_id_use_case.execute(request_object=req_object)
+    return response
+
+
+@router.get("/{post_id}/revisions", response_model=ManyPostRevisionResponse)
+@response_decorator(cache_control="public, no-cache")
+async def get_post_revisions(
+        post_id: str,
+        page_index: int = Query(default=1, title="Page index"),
+        page_size: int = Query(default=20, title="Page size"),
+        list_post_revision_use_case: ListPostRevisionUseCase = Depends(ListPostRevisionUseCase)
+):
+    req_object = ListPostRevisionObjectRequest.builder(post_id=post_id, page_index=page_index, page_size=page_size)
+    response = await list_post_revision_use_case.execute(request_object=req_object)
     return response
 
 
 @router.put("/{post_id}", response_model=Post)
 @response_decorator()
-def update_post(
+async def update_post(
         post_id: str,
         payload: PostInCreatePayload = Body(...),
         thumbnail: UploadFile = File(None),
-        current_user: UserModel = Depends(get_current_user),
+        current_user: UserView = Depends(get_current_user),
         update_post_use_case: UpdatePostUseCase = Depends(UpdatePostUseCase)
 ):
-    url: Optional[str] = None
+    new_payload = PostInUpdate(**payload.model_dump())
+    is_admin = UserInDB.model_validate(current_user).is_admin()
+    upload: Optional[SpooledUpload] = None
     if thumbnail:
         validate_image(thumbnail)
-        url = create_upload_file(thumbnail)
+        upload = await upload_queue.spool(thumbnail)
 
-    new_payload = PostInUpdate(**payload.model_dump(), thumbnail=url)
     req_object = UpdatePostObjectRequest.builder(payload=new_payload, post_id=post_id, author_id=current_user.id,
-                                                 is_admin=UserInDB.model_validate(current_user).is_admin())
-    response = update_post_use_case.execute(request_object=req_object)
+                                                 is_admin=is_admin, thumbnail=upload)
+    response = await upload_queue.discard_on_failure(upload, update_post_use_case.execute(request_object=req_object))
     return response
 
 
 @router.delete("/{post_id}")
 @response_decorator()
-def delete_post(
+async def delete_post(
         post_id: str,
-        current_user: UserModel = Depends(get_current_user),
+        current_user: UserView = Depends(get_current_user),
         delete_post_use_case: DeletePostUseCase = Depends(DeletePostUseCase)
 ):
     req_object = DeletePostRequestObject.builder(post_id=post_id, author_id=current_user.id,
                                                  is_admin=UserInDB.model_validate(current_user).is_admin())
-    response = delete_post_use_case.execute(request_object=req_object)
+    response = await delete_post_use_case.execute(request_object=req_object)
     return response
@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Depends
+
+from app.domain.system.entity import DatabasePoolStats, CachesStats, PasswordHasherStats, DatabaseCommandStats, \
+    UploadQueueStats
+from app.infra.database.monitoring import pool_stats, command_stats
+from app.infra.security.password_pool import password_hasher
+from app.infra.security.security_service import get_current_admin, user_cache
+from app.infra.upload.upload_queue import upload_queue
+from app.shared.decorator import response_decorator
+
+router = APIRouter()
+
+
+@router.get(
+    "/database/pool",
+    response_model=DatabasePoolStats,
+    dependencies=[Depends(get_current_admin)],
+)
+@response_decorator()
+async def get_database_pool():
+    return pool_stats()
+
+
+@router.get(
+    "/database/commands",
+    response_model=DatabaseCommandStats,
+    dependencies=[Depends(get_current_admin)],
+)
+@response_decorator()
+async def get_database_commands():
+    return command_stats.snapshot()
+
+
+@router.get(
+    "/cache",
+    response_model=CachesStats,
+    dependencies=[Depends(get_current_admin)],
+)
+@response_decorator()
+async def get_cache():
+    return {"user": user_cache.stats()}
+
+
+@router.get(
+    "/password-hasher",
+    response_model=PasswordHasherStats,
+    dependencies=[Depends(get_current_admin)],
+)
+@response_decorator()
+async def get_password_hasher():
+    return password_hasher.stats()
+
+
+@router.get(
+    "/uploads",
+    response_model=UploadQueueStats,
+    dependencies=[Depends(get_current_admin)],
+)
+@response_decorator()
+async def get_uploads():
+    return upload_queue.stats()
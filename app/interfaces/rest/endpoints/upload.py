@@ -1,7 +1,8 @@
-from fastapi import APIRouter, UploadFile, File
+from fastapi import APIRouter, UploadFile, File, HTTPException
+from starlette.concurrency import run_in_threadpool
 
 from app.domain.upload.entity import ImageRes
-from app.shared.cloudianry import create_upload_file
+from app.infra.upload.upload_queue import upload_queue
 from app.shared.decorator import response_decorator
 from app.shared.validate_image import validate_image
 
@@ -13,9 +14,13 @@ router = APIRouter()
     response_model=ImageRes,
 )
 @response_decorator()
-def create_image(
+async def create_image(
         image: UploadFile = File(...),
 ):
     validate_image(image)
-    url = create_upload_file(image)
+    # no document to update afterwards, the client needs the uploaded URL in the response
+    upload = await upload_queue.spool(image)
+    url = await run_in_threadpool(upload_queue.upload, upload)
+    if url is None:
+        raise HTTPException(status_code=502, detail="Error uploading file")
     return {"url": url}
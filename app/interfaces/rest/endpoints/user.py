@@ -1,16 +1,20 @@
+from datetime import datetime
 from typing import Optional
 
 from fastapi import APIRouter, Body, Depends, UploadFile, File, Query, status
+from starlette.responses import StreamingResponse
 
 from app.domain.user.entity import UserInCreate, UserInCreatePayload, User, ManyUserResponse, UserInDB, \
     UserInUpdatePayload, UserInUpdate
-from app.infra.database.models.user import UserModel
+from app.infra.database.models.user import UserView
 from app.infra.security.security_service import get_current_user, get_current_admin
-from app.shared.cloudianry import create_upload_file
+from app.infra.upload.upload_queue import SpooledUpload, upload_queue
 from app.shared.decorator import response_decorator
+from app.shared.response_object import ResponseSuccess
 from app.shared.validate_image import validate_image
 from app.use_cases.user.create import CreateUserUseCase, CreateUserRequestObject
 from app.use_cases.user.delete import DeleteUserRequestObject, DeleteUserUseCase
+from app.use_cases.user.export import ExportUserRequestObject, ExportUserUseCase
 from app.use_cases.user.get import GetUserRequestObject, GetUserUseCase
 from app.use_cases.user.list import ListUserRequestObject, ListUserUseCase
 from app.use_cases.user.update import UpdateUserRequestObject, UpdateUserUseCase
@@ -24,19 +28,19 @@ router = APIRouter()
     dependencies=[Depends(get_current_admin)],
 )
 @response_decorator()
-def create_user(
+async def create_user(
         payload: UserInCreatePayload = Body(..., title="UserInCreate payload"),
         avatar: UploadFile = File(None),
         create_user_use_case: CreateUserUseCase = Depends(CreateUserUseCase),
 ):
-    url: Optional[str] = None
+    new_payload = UserInCreate(**payload.model_dump())
+    upload: Optional[SpooledUpload] = None
     if avatar is not None:
         validate_image(avatar)
-        url = create_upload_file(avatar)
+        upload = await upload_queue.spool(avatar)
 
-    new_payload = UserInCreate(**payload.model_dump(), avatar=url)
-    req_object = CreateUserRequestObject.builder(payload=new_payload)
-    response = create_user_use_case.execute(request_object=req_object)
+    req_object = CreateUserRequestObject.builder(payload=new_payload, avatar=upload)
+    response = await upload_queue.discard_on_failure(upload, create_user_use_case.execute(request_object=req_object))
     return response
 
 
@@ -46,13 +50,13 @@ def create_user(
     dependencies=[Depends(get_current_user)]
 )
 @response_decorator()
-def get_all_user(
+async def get_all_user(
         page_index: int = Query(default=1, title="Page index"),
         page_size: int = Query(default=20, title="Page size"),
         list_user_use_case: ListUserUseCase = Depends(ListUserUseCase),
 ):
     req_object = ListUserRequestObject.builder(page_index=page_index, page_size=page_size)
-    response = list_user_use_case.execute(request_object=req_object)
+    response = await list_user_use_case.execute(request_object=req_object)
     return response
 
 
@@ -61,24 +65,46 @@ def get_all_user(
     response_model=User,
 )
 @response_decorator()
-def get_me(
-        user_me: UserModel = Depends(get_current_user)
+async def get_me(
+        user_me: UserView = Depends(get_current_user)
 ):
     return User(**UserInDB.model_validate(user_me).model_dump())
 
 
+@router.get(
+    "/export",
+    dependencies=[Depends(get_current_admin)],
+)
+@response_decorator()
+async def export_user(
+        created_from: Optional[datetime] = Query(default=None, title="Created at or after"),
+        created_to: Optional[datetime] = Query(default=None, title="Created before"),
+        fields: Optional[str] = Query(default=None, title="Comma separated fields to export"),
+        batch_size: int = Query(default=1000, title="Documents fetched per round trip"),
+        export_user_use_case: ExportUserUseCase = Depends(ExportUserUseCase),
+):
+    req_object = ExportUserRequestObject.builder(created_from=created_from, created_to=created_to,
+                                                 fields=fields.split(",") if fields else None,
+                                                 batch_size=batch_size)
+    response = await export_user_use_case.execute(request_object=req_object)
+    if isinstance(response, ResponseSuccess):
+        # newline delimited JSON streamed from a server side cursor
+        return StreamingResponse(response.value, media_type="application/x-ndjson")
+    return response
+
+
 @router.get(
     "/{user_id}",
     response_model=User,
     dependencies=[Depends(get_current_user)]
 )
 @response_decorator()
-def get_user_by_id(
+async def get_user_by_id(
         user_id: str,
         get_user_use_case: GetUserUseCase = Depends(GetUserUseCase),
 ):
     req_object = GetUserRequestObject.builder(user_id=user_id)
-    response = get_user_use_case.execute(request_object=req_object)
+    response = await get_user_use_case.execute(request_object=req_object)
     return response
 
 
@@ -87,12 +113,12 @@ def get_user_by_id(
     dependencies=[Depends(get_current_admin)]
 )
 @response_decorator()
-def delete_user_by_id(
+async def delete_user_by_id(
         user_id: str,
         delete_user_use_case: DeleteUserUseCase = Depends(DeleteUserUseCase),
 ):
     req_object = DeleteUserRequestObject.builder(user_id=user_id)
-    response = delete_user_use_case.execute(request_object=req_object)
+    response = await delete_user_use_case.execute(request_object=req_object)
     return response
 
 
@@ -101,19 +127,19 @@ def delete_user_by_id(
     response_model=User,
 )
 @response_decorator()
-def update_me(
-        user_me: UserModel = Depends(get_current_user),
+async def update_me(
+        user_me: UserView = Depends(get_current_user),
         payload: UserInUpdatePayload = Body(...),
         avatar: UploadFile = File(None),
         update_user_use_case: UpdateUserUseCase = Depends(UpdateUserUseCase),
 ):
-    url: Optional[str] = None
+    new_payload = UserInUpdate(**payload.model_dump())
+    upload: Optional[SpooledUpload] = None
     if avatar is not None:
         validate_image(avatar)
-        url = create_upload_file(avatar)
-    new_payload = UserInUpdate(**payload.model_dump(), avatar=url)
-    req_object = UpdateUserRequestObject.builder(id=user_me.id, payload=new_payload)
-    response = update_user_use_case.execute(request_object=req_object)
+        upload = await upload_queue.spool(avatar)
+    req_object = UpdateUserRequestObject.builder(id=user_me.id, payload=new_payload, avatar=upload)
+    response = await upload_queue.discard_on_failure(upload, update_user_use_case.execute(request_object=req_object))
     return response
 
 
@@ -123,17 +149,17 @@ def update_me(
     dependencies=[Depends(get_current_admin)]
 )
 @response_decorator()
-def update_user_by_id(
+async def update_user_by_id(
         user_id: str,
         payload: UserInUpdatePayload = Body(..., title="UserInUpdate payload"),
         avatar: UploadFile = File(None),
         update_user_use_case: UpdateUserUseCase = Depends(UpdateUserUseCase),
 ):
-    url: Optional[str] = None
+    new_payload = UserInUpdate(**payload.model_dump())
+    upload: Optional[SpooledUpload] = None
     if avatar is not None:
         validate_image(avatar)
-        url = create_upload_file(avatar)
-    new_payload = UserInUpdate(**payload.model_dump(), avatar=url)
-    req_object = UpdateUserRequestObject.builder(id=user_id, payload=new_payload)
-    response = update_user_use_case.execute(request_object=req_object)
+        upload = await upload_queue.spool(avatar)
+    req_object = UpdateUserRequestObject.builder(id=user_id, payload=new_payload, avatar=upload)
+    response = await upload_queue.discard_on_failure(upload, update_user_use_case.execute(request_object=req_object))
     return response
@@ -0,0 +1,146 @@
+import logging
+import random
+import time
+from typing import Callable, Dict, Optional
+from uuid import uuid4
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Receive, Scope, Send, Message
+
+from app.infra.database.monitoring import RequestStats, request_stats, command_stats
+from app.config import settings
+from app.shared.metrics import REGISTRY
+from app.shared.timing import RequestTimings, request_timings
+
+access_logger = logging.getLogger("app.access")
+
+http_requests = REGISTRY.counter("http_requests_total", "HTTP requests", ["method", "route", "status"])
+http_request_duration = REGISTRY.histogram("http_request_duration_seconds", "HTTP request latency until the last "
+                                           "byte of the response is sent", ["method", "route"])
+http_requests_in_flight = REGISTRY.gauge("http_requests_in_flight", "HTTP requests being served")
+
+_routes: Dict[Callable, str] = {}
+
+
+def route_name(scope: Scope) -> str:
+    """``METHOD /route/{template}`` of a served request, the raw path would make one series per id"""
+
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        # keep the aggregates bounded, unknown paths are not recorded one by one
+        return "{} <unmatched>".format(scope["method"])
+    path = _routes.get(endpoint)
+    if path is None:
+        path = next((route.path for route in scope["app"].routes
+                     if getattr(route, "endpoint", None) is endpoint), scope["path"])
+        _routes[endpoint] = path
+    return "{} {}".format(scope["method"], path)
+
+
+class DatabaseStatsMiddleware:
+    """Count the database commands of every request
+
+    The counters are available as ``request.state.database`` while the request is served and added to the per
+    endpoint aggregates of ``command_stats`` once the response is sent. The request id is the ``X-Request-ID``
+    header of the client or a new one, echoed in the response.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get("x-request-id") or uuid4().hex
+        stats = RequestStats(request_id)
+        scope.setdefault("state", {})["database"] = stats
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Request-ID", request_id)
+            await send(message)
+
+        token = request_stats.set(stats)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_stats.reset(token)
+            command_stats.record_request(route_name(scope), stats)
+
+
+class MetricsMiddleware:
+    """Request counters and latency histograms labelled by route template"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec()
+            method, route = route_name(scope).split(" ", 1)
+            http_request_duration.observe(time.perf_counter() - started, method, route)
+            http_requests.inc(method, route, str(status))
+
+
+def server_timing_sample_rate() -> float:
+    if settings.SERVER_TIMING_SAMPLE_RATE is not None:
+        return settings.SERVER_TIMING_SAMPLE_RATE
+    return 0.01 if settings.ENVIRONMENT == "production" else 1.0
+
+
+class ServerTimingMiddleware:
+    """Time the phases of a sample of the requests
+
+    Sampled responses carry a ``Server-Timing`` header (``auth;dur=0.2, db;dur=3.1, map;dur=0.4, ser;dur=0.3,
+    total;dur=4.6``, in ms, ``total`` until the headers are sent) and are logged to ``app.access`` with the
+    same numbers once the response is complete.
+    """
+
+    def __init__(self, app: ASGIApp, sample_rate: Optional[float] = None):
+        self.app = app
+        self.sample_rate = server_timing_sample_rate() if sample_rate is None else sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or random.random() >= self.sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                total_ms = (time.perf_counter() - started) * 1000
+                MutableHeaders(scope=message).append("Server-Timing", timings.header(total_ms))
+            await send(message)
+
+        token = request_timings.set(timings)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_timings.reset(token)
+            stats = scope.get("state", {}).get("database")
+            access_logger.info("%s %s %s %s request_id=%s", scope["method"], scope["path"], status,
+                               timings.header((time.perf_counter() - started) * 1000),
+                               stats.request_id if stats is not None else "-")
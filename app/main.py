@@ -1,26 +1,49 @@
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import settings
 from app.infra import database
+from app.infra.database import indexes
+from app.infra.security.password_pool import password_hasher
+from app.infra.upload.upload_queue import upload_queue
 from app.interfaces.rest.api import api_router
+from app.interfaces.rest.endpoints import metrics
+from app.interfaces.rest.middleware import DatabaseStatsMiddleware, MetricsMiddleware, ServerTimingMiddleware
 
 app = FastAPI(title=settings.PROJECT_NAME)
 
 app.add_middleware(CORSMiddleware, allow_origins=['*'], allow_credentials=True, allow_methods=['*'],
                    allow_headers=['*'], )
+app.add_middleware(ServerTimingMiddleware)
+app.add_middleware(DatabaseStatsMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 
 # app startup handler
 @app.on_event("startup")
-def startup():
+async def startup():
+    if not settings.MONGODB_AUTO_CREATE_INDEX:
+        # indexes are applied by `python -m app.infra.database.indexes`
+        indexes.disable_auto_create_index()
     database.connect()
+    await database.warm_up()
+    if settings.METRICS_DIR:
+        app.state.metrics_flush = asyncio.create_task(metrics.flush_periodically())
 
 
 # app shutdown handler
 @app.on_event("shutdown")
-def shutdown():
+async def shutdown():
+    if settings.METRICS_DIR:
+        app.state.metrics_flush.cancel()
+        # the counters of a stopped worker are still summed
+        await metrics.flush()
     database.disconnect()
+    password_hasher.shutdown()
+    upload_queue.shutdown()
 
 
 app.include_router(api_router, prefix=settings.API_STR)
+app.include_router(metrics.router)
@@ -1,6 +1,4 @@
 import cloudinary
-import cloudinary.uploader
-from fastapi import File, UploadFile, HTTPException
 
 from app.config import settings
 
@@ -9,12 +7,3 @@ cloudinary.config(
     api_key=settings.CLOUDINARY_API_KEY,
     api_secret=settings.CLOUDINARY_API_SECRET
 )
-
-
-def create_upload_file(file: UploadFile = File(...)):
-    try:
-        upload_result = cloudinary.uploader.upload(file.file)
-        url = upload_result['secure_url']
-        return url
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error uploading file: {str(e)}")
@@ -0,0 +1,96 @@
+"""Opaque keyset pagination cursors"""
+
+import base64
+import binascii
+from typing import Any, Dict, Optional, Tuple, Type
+
+from bson import ObjectId, json_util
+from bson.errors import InvalidId
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(sort_key: str, value: Any, id: ObjectId) -> str:
+    """encode the sort key, its value and the ``_id`` tiebreaker of the last row of a page
+
+    :param sort_key: field the page is sorted on
+    :param value: value of ``sort_key`` on the last row
+    :param id: ``_id`` of the last row
+    :return: str
+    """
+
+    raw = json_util.dumps({"k": sort_key, "v": value, "id": str(id)})
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, value_types: Dict[str, Type]) -> Tuple[str, Any, ObjectId]:
+    """decode a cursor built by ``encode_cursor``
+
+    The value ends up in the query, anything but a scalar of the sort field type (or ``None``) is rejected so a
+    client cannot send operators or regular expressions.
+
+    :param cursor: opaque cursor sent back by the client
+    :param value_types: type of the value of every sort key a cursor may carry
+    :return: (sort_key, value, id)
+    """
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json_util.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+        sort_key, value, id = data["k"], data["v"], ObjectId(data["id"])
+    except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError, InvalidId):
+        raise InvalidCursor("Invalid cursor")
+
+    value_type = value_types.get(sort_key) if isinstance(sort_key, str) else None
+    if value_type is None or (value is not None and (isinstance(value, bool) or not isinstance(value, value_type))):
+        raise InvalidCursor("Invalid cursor")
+    return sort_key, value, id
+
+
+def keyset_condition(sort: Dict[str, int], cursor: Optional[Tuple[str, Any, ObjectId]]) -> Optional[Dict[str, Any]]:
+    """build the match condition selecting the rows after ``cursor`` for the given sort
+
+    :param sort: sort specification, the first key is the keyset field
+    :param cursor: decoded cursor
+    :return: dict
+    """
+
+    if cursor is None:
+        return None
+
+    sort_key, direction = next(iter(sort.items()))
+    _, value, id = cursor
+    op = "$gt" if direction > 0 else "$lt"
+    if sort_key == "_id":
+        return {"_id": {op: id}}
+    return {"$or": [{sort_key: {op: value}}, {sort_key: value, "_id": {op: id}}]}
+
+
+def next_cursor(sort: Dict[str, int], last_doc: Dict[str, Any]) -> str:
+    """build the cursor pointing after the last row of a page
+
+    :param sort: sort specification of the page
+    :param last_doc: raw mongo document of the last row
+    :return: str
+    """
+
+    sort_key = next(iter(sort))
+    return encode_cursor(sort_key, last_doc.get(sort_key), last_doc["_id"])
+
+
+def keyset_sort(sort: Dict[str, int]) -> Dict[str, int]:
+    """append the ``_id`` tiebreaker to a sort specification
+
+    :param sort: sort specification
+    :return: dict
+    """
+
+    sort_key, direction = next(iter(sort.items()))
+    if sort_key == "_id":
+        return {"_id": direction}
+    if not isinstance(direction, int):
+        # {"$meta": ...} sort, not usable as a keyset
+        return {sort_key: direction, "_id": -1}
+    return {sort_key: direction, "_id": direction}
@@ -1,31 +1,57 @@
 import functools
+import inspect
+from typing import Any
 
-from fastapi import HTTPException
-from fastapi.encoders import jsonable_encoder
-from starlette.responses import JSONResponse
+from fastapi import HTTPException, Request
+from starlette.responses import Response
 
 from app.interfaces.rest.error_handler import ApplicationLevelException
+from app.shared.etag import compute_etag, etag_matches
 from app.shared.response_object import ResponseSuccess, ResponseFailure
+from app.shared.serializer import dump_json, JSONBytesResponse
+from app.shared.timing import phase
 
 
-def response_decorator():
+def _render(request: Request, value: Any, cache_control: str, by_alias: bool = False) -> Response:
+    with phase("ser"):
+        if request.method not in ("GET", "HEAD"):
+            return JSONBytesResponse(content=dump_json(value, by_alias=by_alias))
+
+        # the ETag only depends on ids / last updates, a matching client never pays the serialization
+        headers = {"ETag": compute_etag(value), "Cache-Control": cache_control}
+        if etag_matches(headers["ETag"], request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=headers)
+        return JSONBytesResponse(content=dump_json(value, by_alias=by_alias), headers=headers)
+
+
+def response_decorator(cache_control: str = "private, no-cache"):
     """Handle data response for resource
 
+    GET responses carry a strong ETag and answer a matching If-None-Match with 304.
+
     Keyword Arguments:
+        cache_control {str} -- Cache-Control header of GET responses (default: {"private, no-cache"})
 
     Returns:
         [type] -- [description]
     """
 
     def decorator(f):
+        signature = inspect.signature(f)
+        pass_request = "request" in signature.parameters
+
         @functools.wraps(f)
-        def wrapper(*args, **kwargs):
-            response = f(*args, **kwargs)
+        async def wrapper(*args, request: Request, **kwargs):
+            if pass_request:
+                kwargs["request"] = request
+            response = await f(*args, **kwargs)
 
-            if isinstance(response, ResponseSuccess):
+            if isinstance(response, Response):
+                # already rendered, e.g. a streaming export
+                return response
+            elif isinstance(response, ResponseSuccess):
                 # handle response success object
-                val = response.value
-                return JSONResponse(content=jsonable_encoder(val, by_alias=True))
+                return _render(request, response.value, cache_control, by_alias=True)
                 # return response.value
             elif isinstance(response, ResponseFailure):
                 # handle response failure error
@@ -54,8 +80,14 @@ def response_decorator():
                     # System error http status code
                     raise HTTPException(status_code=500, detail=response.message)
             else:
-                return JSONResponse(content=jsonable_encoder(response))
+                return _render(request, response, cache_control)
 
+        if not pass_request:
+            # let FastAPI inject the request the endpoint does not declare
+            wrapper.__signature__ = signature.replace(parameters=[
+                *signature.parameters.values(),
+                inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+            ])
         return wrapper
 
     return decorator
@@ -0,0 +1,63 @@
+"""Strong validators for conditional GET requests"""
+
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+
+def _version(value: Any) -> Any:
+    """reduce a response value to the data its representation depends on
+
+    Entities carrying an ``id`` and ``last_updated_at`` / ``updated_at`` are reduced to the id and their last update,
+    nested entities (e.g. the post author) are kept since they change independently. Anything else is kept as is.
+    """
+
+    if isinstance(value, BaseModel):
+        id = getattr(value, "id", None)
+        updated_at = getattr(value, "last_updated_at", None) or getattr(value, "updated_at", None)
+        if id is not None and updated_at:
+            last = updated_at[-1] if isinstance(updated_at, list) else updated_at
+            nested = [_version(getattr(value, name)) for name in value.model_fields
+                      if isinstance(getattr(value, name), BaseModel)]
+            return [str(id), last, nested]
+        return {name: _version(getattr(value, name)) for name in value.model_fields}
+    if isinstance(value, (list, tuple)):
+        return [_version(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _version(item) for key, item in value.items()}
+    return value
+
+
+def _default(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def compute_etag(value: Any) -> str:
+    """compute a strong ETag for a response value without serializing it
+
+    :param value: pydantic model / list / dict returned by a use case
+    :return: str
+    """
+
+    raw = json.dumps(_version(value), default=_default, sort_keys=True, separators=(",", ":"))
+    return '"{}"'.format(hashlib.sha1(raw.encode("utf-8")).hexdigest())
+
+
+def etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    """check an ``If-None-Match`` header against the current ETag
+
+    :param etag: current ETag
+    :param if_none_match: header value sent by the client
+    :return: bool
+    """
+
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    # If-None-Match uses the weak comparison
+    return "*" in candidates or etag in [candidate.removeprefix("W/") for candidate in candidates]
@@ -0,0 +1,227 @@
+"""In-process metrics rendered in the Prometheus text exposition format
+
+Counters and histograms are updated in place under a lock, collectors are callbacks read at collection time for
+values that already live elsewhere (pool sizes, cache counters). With several worker processes every worker
+periodically writes its snapshot to a shared directory and the worker answering the scrape merges them: counters
+and histograms are summed over every file, gauges only over the files fresh enough to come from a live worker.
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# seconds, close to the defaults of the official client
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[str, ...]
+# {"type": ..., "help": ..., "labels": [...], "samples": [[label values, value]], "buckets": [...]}
+Snapshot = Dict[str, Dict[str, Any]]
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Labels, Any] = {}
+
+    def describe(self) -> Dict[str, Any]:
+        return {"type": self.type, "help": self.help, "labels": list(self.labelnames)}
+
+    def collect(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = [[list(labels), value] for labels, value in self._values.items()]
+        return dict(self.describe(), samples=samples)
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def describe(self) -> Dict[str, Any]:
+        return dict(super().describe(), buckets=list(self.buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            # non cumulative bucket counts, the +Inf bucket last, then sum
+            counts = self._values.get(labels)
+            if counts is None:
+                counts = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    def collect(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = [[list(labels), list(counts)] for labels, counts in self._values.items()]
+        return dict(self.describe(), samples=samples)
+
+
+class Collector:
+    """Metric whose samples are read from ``callback`` (``[(label values, value)]``) at collection time"""
+
+    def __init__(self, name: str, help: str, type: str, labelnames: Sequence[str],
+                 callback: Callable[[], Iterable[Tuple[Sequence[str], float]]]):
+        self.name = name
+        self.help = help
+        self.type = type
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def collect(self) -> Dict[str, Any]:
+        return {"type": self.type, "help": self.help, "labels": list(self.labelnames),
+                "samples": [[list(labels), value] for labels, value in self.callback()]}
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+
+    def register(self, metric: Any) -> Any:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def collector(self, name: str, help: str, type: str, labelnames: Sequence[str],
+                  callback: Callable[[], Iterable[Tuple[Sequence[str], float]]]) -> Collector:
+        return self.register(Collector(name, help, type, labelnames, callback))
+
+    def collect(self) -> Snapshot:
+        return {name: metric.collect() for name, metric in self._metrics.items()}
+
+
+def merge(snapshots: Iterable[Snapshot], gauges: bool = True) -> Snapshot:
+    """sum the samples with the same labels, ``gauges=False`` leaves the gauges out"""
+
+    merged: Snapshot = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            if metric["type"] == "gauge" and not gauges:
+                continue
+            target = merged.setdefault(name, dict(metric, samples={}))
+            for labels, value in metric["samples"]:
+                key = tuple(labels)
+                current = target["samples"].get(key)
+                if current is None:
+                    target["samples"][key] = list(value) if isinstance(value, list) else value
+                elif isinstance(value, list):
+                    target["samples"][key] = [a + b for a, b in zip(current, value)]
+                else:
+                    target["samples"][key] = current + value
+    for metric in merged.values():
+        metric["samples"] = [[list(labels), value] for labels, value in metric["samples"].items()]
+    return merged
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join('{}="{}"'.format(name, _escape(value)) for name, value in pairs) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(snapshot: Snapshot) -> str:
+    """Prometheus text exposition format 0.0.4"""
+
+    lines: List[str] = []
+    for name, metric in sorted(snapshot.items()):
+        lines.append("# HELP {} {}".format(name, metric["help"]))
+        lines.append("# TYPE {} {}".format(name, metric["type"]))
+        names = metric["labels"]
+        for values, value in metric["samples"]:
+            if metric["type"] != "histogram":
+                lines.append("{}{} {}".format(name, _labels(names, values), _number(value)))
+                continue
+            cumulative = 0
+            for bound, count in zip(list(metric["buckets"]) + [float("inf")], value[:-1]):
+                cumulative += count
+                lines.append("{}_bucket{} {}".format(name, _labels(names, values, ("le", _number(float(bound)))),
+                                                     cumulative))
+            lines.append("{}_sum{} {}".format(name, _labels(names, values), _number(value[-1])))
+            lines.append("{}_count{} {}".format(name, _labels(names, values), cumulative))
+    return "\n".join(lines) + "\n"
+
+
+def write_snapshot(directory: str, snapshot: Snapshot) -> None:
+    """atomically replace the snapshot file of this process"""
+
+    path = os.path.join(directory, "{}.json".format(os.getpid()))
+    tmp = path + ".tmp"
+    with open(tmp, "w") as file:
+        json.dump(snapshot, file)
+    os.replace(tmp, path)
+
+
+def read_snapshots(directory: str, max_age: float) -> Snapshot:
+    """Merge the snapshots of every other process
+
+    Files older than ``max_age`` seconds come from a stopped worker, only their counters and histograms count.
+    """
+    own = "{}.json".format(os.getpid())
+    live, stopped = [], []
+    now = time.time()
+    for entry in os.scandir(directory):
+        if not entry.name.endswith(".json") or entry.name == own:
+            continue
+        try:
+            with open(entry.path) as file:
+                snapshot = json.load(file)
+        except (OSError, ValueError):
+            continue
+        (live if now - entry.stat().st_mtime <= max_age else stopped).append(snapshot)
+    return merge([merge(live), merge(stopped, gauges=False)])
+
+
+REGISTRY = Registry()
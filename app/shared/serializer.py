@@ -0,0 +1,71 @@
+"""Response serialization straight to JSON bytes"""
+
+import functools
+from typing import Any, AsyncIterator
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from pydantic_core import to_json
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # orjson is optional
+    orjson = None
+
+
+def _default(value: Any, by_alias: bool = False) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", by_alias=by_alias)
+    return jsonable_encoder(value, by_alias=by_alias)
+
+
+def dump_json(value: Any, by_alias: bool = False) -> bytes:
+    """serialize a use case result to JSON bytes
+
+    Pydantic models go through their compiled serializer, other values through orjson when it is installed,
+    types neither knows (e.g. ObjectId) fall back to ``jsonable_encoder``.
+
+    :param value: pydantic model / list / dict
+    :param by_alias: serialize models by alias
+    :return: bytes
+    """
+
+    if isinstance(value, BaseModel):
+        return value.__pydantic_serializer__.to_json(value, by_alias=by_alias)
+    if orjson is not None:
+        return orjson.dumps(value, default=functools.partial(_default, by_alias=by_alias))
+    return to_json(value, by_alias=by_alias, fallback=functools.partial(_default, by_alias=by_alias))
+
+
+async def stream_ndjson(docs: AsyncIterator[Any], chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    """encode documents as newline delimited JSON, grouped in chunks of about ``chunk_size`` bytes
+
+    :param docs: documents to encode, consumed lazily
+    :param chunk_size: bytes buffered before a chunk is sent
+    :return: AsyncIterator[bytes]
+    """
+
+    buffer = bytearray()
+    async for doc in docs:
+        buffer += dump_json(doc)
+        buffer += b"\n"
+        if len(buffer) >= chunk_size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+class JSONBytesResponse(Response):
+    """JSON response whose body is already serialized"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dump_json(content)
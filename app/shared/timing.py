@@ -0,0 +1,64 @@
+"""Per request phase timers reported in the ``Server-Timing`` header"""
+
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, Optional
+
+# phases of a sampled request: auth (JWT), db (repository methods), map (documents to entities),
+# ser (ETag and JSON rendering)
+PHASES = ("auth", "db", "map", "ser")
+
+
+class RequestTimings:
+    """Milliseconds spent in every phase of one request, phases running more than once are summed"""
+
+    __slots__ = ("phases", "_lock")
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        # repository calls of one request can run on several threadpool threads at once
+        self._lock = threading.Lock()
+
+    def add(self, phase: str, duration_ms: float) -> None:
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + duration_ms
+
+    def header(self, total_ms: Optional[float] = None) -> str:
+        with self._lock:
+            phases = dict(self.phases)
+        if total_ms is not None:
+            phases["total"] = total_ms
+        return ", ".join("{};dur={:.1f}".format(name, duration) for name, duration in phases.items())
+
+
+# set by the ServerTimingMiddleware on sampled requests only, unsampled requests skip the timers
+request_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    timings = request_timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, (time.perf_counter() - started) * 1000)
+
+
+def timed(name: str) -> Callable:
+    """decorator adding the duration of every call of a function to the phase ``name``"""
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
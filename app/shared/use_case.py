@@ -11,7 +11,7 @@ class UseCase:
     Base use case class
     """
 
-    def execute(self, request_object: req.RequestObject) -> res.ResponseObject:
+    async def execute(self, request_object: req.RequestObject) -> res.ResponseObject:
         """execute use case
 
         return check request object valid and process request
@@ -22,7 +22,7 @@ class UseCase:
         if not request_object:
             return res.ResponseFailure.build_from_invalid_request_object(request_object)
         try:
-            result = self.process_request(request_object)
+            result = await self.process_request(request_object)
             # # default return success True
             # if not result:
             #     result = dict(
@@ -40,6 +40,6 @@ class UseCase:
 
             return res.ResponseFailure.build_system_error("{}".format(exc))
 
-    def process_request(self, request_object):
+    async def process_request(self, request_object):
         """abstract process_request method"""
         raise NotImplementedError("process_request() not implemented by UseCase class")
@@ -0,0 +1,49 @@
+"""Bulk import posts from a JSONL file, one post per line.
+
+Each line holds ``title``, ``description`` and optionally ``thumbnail``, ``author`` (user id), ``slug`` and
+``created_at``. Posts without an author are assigned to ``--author-email``.
+
+Usage::
+
+    python -m app.tools.import_posts posts.jsonl --author-email blog@example.com [--chunk-size 1000]
+"""
+import argparse
+import asyncio
+import sys
+
+from app.config import settings
+from app.infra import database
+from app.infra.database.models.user import UserModel
+from app.infra.post.async_post_repository import get_post_repository
+from app.infra.user.async_user_repository import get_user_repository
+from app.shared.response_object import ResponseSuccess
+from app.use_cases.post.bulk_import import ImportPostRequestObject, ImportPostUseCase
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("file", type=argparse.FileType("rb"))
+    parser.add_argument("--author-email", required=True, help="author of the posts without one")
+    parser.add_argument("--chunk-size", type=int, default=settings.POST_IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    database.connect()
+    try:
+        author = UserModel.objects(email=args.author_email).first()
+        if author is None:
+            sys.exit(f"No user with email {args.author_email}")
+
+        req_object = ImportPostRequestObject.builder(lines=args.file, default_author_id=author.id,
+                                                     chunk_size=args.chunk_size)
+        use_case = ImportPostUseCase(post_repository=get_post_repository(), user_repository=get_user_repository())
+        response = asyncio.run(use_case.execute(request_object=req_object))
+        if not isinstance(response, ResponseSuccess):
+            sys.exit(response.message)
+        print(response.value.model_dump_json(indent=2))
+    finally:
+        args.file.close()
+        database.disconnect()
+
+
+if __name__ == "__main__":
+    main()
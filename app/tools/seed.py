@@ -0,0 +1,236 @@
+"""Generate users and posts for benchmarks and staging.
+
+Documents are written as raw dicts in the shape of the models with unordered ``insert_many``, chunks are built and
+inserted by ``--workers`` processes. Every user shares one password hash, authors follow a Zipf distribution
+(``--skew``, the first users write most posts) and ``created_at`` is spread over the last ``--days``. Indexes are
+built once the data is loaded.
+
+Usage::
+
+    python -m app.tools.seed --users 100000 --posts 5000000 [--drop] [--workers 8] [--chunk-size 10000]
+"""
+import argparse
+import itertools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from bson import ObjectId
+
+from app.infra import database
+from app.infra.database import indexes
+from app.infra.database.models.post import PostModel
+from app.infra.database.models.post_revision import PostRevisionModel
+from app.infra.database.models.user import UserModel
+from app.infra.security.password import get_password_hash
+
+FIRST_NAMES = ("James Mary John Patricia Robert Jennifer Michael Linda William Elizabeth David Barbara Richard Susan "
+               "Joseph Jessica Thomas Sarah Charles Karen Minh Lan Hung Mai Tuan Anh Duc Linh").split()
+LAST_NAMES = ("Smith Johnson Williams Brown Jones Garcia Miller Davis Rodriguez Martinez Hernandez Lopez Wilson "
+              "Anderson Taylor Moore Jackson Martin Nguyen Tran Le Pham Hoang Vu Dang Bui Do Ho").split()
+WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore et "
+         "dolore magna aliqua enim ad minim veniam quis nostrud exercitation ullamco laboris nisi aliquip ex ea "
+         "commodo consequat duis aute irure in reprehenderit voluptate velit esse cillum fugiat nulla pariatur "
+         "excepteur sint occaecat cupidatat non proident sunt culpa qui officia deserunt mollit anim id est "
+         "laborum").split()
+# descriptions are slices of this many random words
+CORPUS_WORDS = 200_000
+
+
+class SeedOptions(NamedTuple):
+    users: int
+    posts: int
+    admins: int = 1
+    password_hash: str = ""
+    email_domain: str = "example.com"
+    skew: float = 1.1
+    days: int = 365
+    # characters, log-normal around the median
+    description_median: int = 2000
+    description_max: int = 20000
+    seed: int = 0
+    # 4 byte timestamp + 3 byte run id of the generated user ids
+    id_prefix: bytes = b""
+
+
+def user_id(options: SeedOptions, index: int) -> ObjectId:
+    """ids are derived from the index so the post workers need no list of the users"""
+    return ObjectId(options.id_prefix + index.to_bytes(5, "big"))
+
+
+def user_email(options: SeedOptions, index: int) -> str:
+    if index < options.admins:
+        return f"admin{index}@{options.email_domain}"
+    return f"user{index - options.admins}@{options.email_domain}"
+
+
+def user_fullname(index: int) -> str:
+    first, last = divmod(index, len(LAST_NAMES))
+    return f"{FIRST_NAMES[first % len(FIRST_NAMES)]} {LAST_NAMES[last]}"
+
+
+def build_users(options: SeedOptions, start: int, count: int) -> List[Dict[str, Any]]:
+    return [{
+        "_id": user_id(options, index),
+        "_cls": UserModel._class_name,
+        "email": user_email(options, index),
+        "fullname": user_fullname(index),
+        "password": options.password_hash,
+        "role": "admin" if index < options.admins else "user",
+    } for index in range(start, start + count)]
+
+
+class _PostGenerator:
+    """Per process state shared by the chunks: Zipf cumulative weights and the description corpus"""
+
+    def __init__(self, options: SeedOptions):
+        self.options = options
+        rng = random.Random(options.seed)
+        # authors are the non admin users, the author of rank r writes ~1 / r^skew of the posts
+        self.authors = range(options.admins, options.users)
+        self.cum_weights = list(itertools.accumulate(1 / (rank + 1) ** options.skew
+                                                     for rank in range(len(self.authors))))
+        self.corpus = " ".join(rng.choices(WORDS, k=CORPUS_WORDS))
+        self.now = datetime.utcnow()
+        # slugs stay unique when seeding on top of a previous run
+        self.run = options.id_prefix[4:].hex()
+
+    def build(self, start: int, count: int) -> List[Dict[str, Any]]:
+        options = self.options
+        # one generator per chunk, the output does not depend on how chunks are spread over the workers
+        rng = random.Random(options.seed * 1_000_003 + start)
+        authors = rng.choices(self.authors, cum_weights=self.cum_weights, k=count)
+        title_words = rng.choices(WORDS, k=count * 4)
+        ages = sorted((rng.random() * options.days for _ in range(count)), reverse=True)
+        limit = len(self.corpus) - options.description_max
+        docs = []
+        for i, author in enumerate(authors):
+            index = start + i
+            words = title_words[i * 4:i * 4 + rng.randint(2, 4)]
+            title = " ".join(words).capitalize()
+            length = min(options.description_max, int(rng.lognormvariate(0, 0.5) * options.description_median))
+            offset = rng.randrange(max(1, limit))
+            created_at = self.now - timedelta(days=ages[i])
+            author_id = user_id(options, author)
+            docs.append({
+                "_cls": PostModel._class_name,
+                "title": title,
+                "title_lower": title.lower(),
+                # the words are lower case ascii, no need to slugify, the index makes the slug unique
+                "slug": "-".join(words) + f"-{index}-{self.run}",
+                "description": self.corpus[offset:offset + max(1, length)],
+                "created_at": created_at,
+                "last_updated_at": created_at,
+                "author": author_id,
+                "author_snapshot": {"id": author_id, "fullname": user_fullname(author)},
+            })
+        return docs
+
+
+_generator: Optional[_PostGenerator] = None
+
+
+def _init_worker(options: SeedOptions) -> None:
+    global _generator
+    _generator = _PostGenerator(options) if options.posts else None
+    database.connect()
+
+
+def _insert_users(options: SeedOptions, start: int, count: int) -> int:
+    return len(UserModel._get_collection().insert_many(build_users(options, start, count), ordered=False)
+               .inserted_ids)
+
+
+def _insert_posts(start: int, count: int) -> int:
+    return len(PostModel._get_collection().insert_many(_generator.build(start, count), ordered=False).inserted_ids)
+
+
+def chunks(total: int, size: int) -> List[range]:
+    return [range(start, min(total, start + size)) for start in range(0, total, size)]
+
+
+def drop() -> None:
+    for model in (UserModel, PostModel, PostRevisionModel):
+        model._get_collection().drop()
+
+
+def seed(options: SeedOptions, workers: int = 1, chunk_size: int = 10000) -> Dict[str, int]:
+    """Insert the users then the posts
+
+    ``workers=1`` runs in this process on its connection, otherwise the connection is closed while the worker
+    processes, which open their own, are running.
+
+    :return: inserted documents by collection
+    """
+    options = options._replace(
+        password_hash=options.password_hash or get_password_hash("12345678"),
+        id_prefix=options.id_prefix or ObjectId().binary[:4] + os.urandom(3),
+    )
+    result = {"users": 0, "posts": 0}
+    if workers <= 1:
+        global _generator
+        _generator = _PostGenerator(options) if options.posts else None
+        result["users"] = sum(_insert_users(options, chunk.start, len(chunk))
+                              for chunk in chunks(options.users, chunk_size))
+        result["posts"] = sum(_insert_posts(chunk.start, len(chunk)) for chunk in chunks(options.posts, chunk_size))
+        return result
+
+    # pymongo clients must not cross a fork
+    database.disconnect()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(options,)) as executor:
+        user_chunks = chunks(options.users, chunk_size)
+        result["users"] = sum(executor.map(_insert_users, itertools.repeat(options, len(user_chunks)),
+                                           [chunk.start for chunk in user_chunks], map(len, user_chunks)))
+        post_chunks = chunks(options.posts, chunk_size)
+        result["posts"] = sum(executor.map(_insert_posts, [chunk.start for chunk in post_chunks],
+                                           map(len, post_chunks)))
+    database.connect()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--posts", type=int, default=100000)
+    parser.add_argument("--admins", type=int, default=1, help="the first users are admins, admin<i>@<domain>")
+    parser.add_argument("--password", default="12345678", help="password of every user, hashed once")
+    parser.add_argument("--email-domain", default="example.com", help="emails must not exist yet, see --drop")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of the author distribution")
+    parser.add_argument("--days", type=int, default=365, help="created_at spread over the last days")
+    parser.add_argument("--description-median", type=int, default=2000, help="median description length")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=10000, help="documents per insert_many")
+    parser.add_argument("--drop", action="store_true", help="drop Users, Posts and PostRevisions first")
+    args = parser.parse_args()
+    if args.users <= args.admins and args.posts:
+        parser.error("posts need at least one non admin user")
+
+    options = SeedOptions(users=args.users, posts=args.posts, admins=args.admins,
+                          password_hash=get_password_hash(args.password), email_domain=args.email_domain,
+                          skew=args.skew, days=args.days, description_median=args.description_median,
+                          description_max=args.description_median * 10, seed=args.seed)
+
+    indexes.disable_auto_create_index()
+    database.connect()
+    try:
+        if args.drop:
+            drop()
+        start = time.perf_counter()
+        inserted = seed(options, workers=args.workers, chunk_size=args.chunk_size)
+        loaded = time.perf_counter()
+        print(f"inserted {inserted['users']} users, {inserted['posts']} posts in {loaded - start:.1f}s")
+
+        # one index build over the loaded collections instead of index maintenance on every insert
+        for collection, names in indexes.apply().items():
+            print(f"{collection}: {', '.join(names)}")
+        print(f"indexes built in {time.perf_counter() - loaded:.1f}s")
+    finally:
+        database.disconnect()
+
+
+if __name__ == "__main__":
+    main()
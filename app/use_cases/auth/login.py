@@ -1,10 +1,13 @@
+from typing import Optional
+
 from fastapi import Depends
 
 from app.domain.auth.entity import LoginRequest, TokenData, AuthInfoInResponse
 from app.domain.user.entity import User, UserInDB
-from app.infra.database.models.user import UserModel
-from app.infra.security.security_service import verify_password, create_access_token
-from app.infra.user.user_repository import UserRepository
+from app.infra.database.models.user import UserView
+from app.infra.security.password_pool import password_hasher
+from app.infra.security.security_service import create_access_token
+from app.infra.user.async_user_repository import AsyncUserRepository, get_user_repository
 from app.shared import request_object, use_case, response_object
 
 
@@ -27,15 +30,15 @@ class LoginRequestObject(request_object.ValidRequestObject):
 class LoginUseCase(use_case.UseCase):
     def __init__(
             self,
-            user_repository: UserRepository = Depends(UserRepository),
+            user_repository: AsyncUserRepository = Depends(get_user_repository),
     ):
         self.user_repository = user_repository
 
-    def process_request(self, req_object: LoginRequestObject):
-        user: UserModel = self.user_repository.get_by_email(req_object.login_payload.email)
+    async def process_request(self, req_object: LoginRequestObject):
+        user: Optional[UserView] = await self.user_repository.get_by_email(req_object.login_payload.email)
         checker = False
         if user:
-            checker = verify_password(req_object.login_payload.password, user.password)
+            checker = await password_hasher.verify(req_object.login_payload.password, user.password)
         if not user or not checker:
             return response_object.ResponseFailure.build_parameters_error(message="Incorrect email or password")
         access_token = create_access_token(
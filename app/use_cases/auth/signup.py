@@ -4,8 +4,9 @@ from mongoengine import NotUniqueError
 from app.domain.auth.entity import SignupRequest, TokenData, AuthInfoInResponse
 from app.domain.user.entity import UserInCreate, User, UserInDB
 from app.infra.database.models.user import UserModel
-from app.infra.security.security_service import get_password_hash, create_access_token
-from app.infra.user.user_repository import UserRepository
+from app.infra.security.password_pool import password_hasher
+from app.infra.security.security_service import create_access_token
+from app.infra.user.async_user_repository import AsyncUserRepository, get_user_repository
 from app.shared import request_object, use_case, response_object
 
 
@@ -33,17 +34,17 @@ class SignupRequestObject(request_object.ValidRequestObject):
 class SignupUseCase(use_case.UseCase):
     def __init__(
             self,
-            user_repository: UserRepository = Depends(UserRepository),
+            user_repository: AsyncUserRepository = Depends(get_user_repository),
     ):
         self.user_repository = user_repository
 
-    def process_request(self, req_object: SignupRequestObject):
+    async def process_request(self, req_object: SignupRequestObject):
         user_in: UserInCreate = req_object.payload
         obj_in: UserInCreate = UserInCreate(**user_in.model_dump(exclude=({"password"})),
-                                            password=get_password_hash(user_in.password))
+                                            password=await password_hasher.hash(user_in.password))
 
         try:
-            user: UserModel = self.user_repository.create(user=obj_in)
+            user: UserModel = await self.user_repository.create(user=obj_in)
             access_token = create_access_token(
                 data=TokenData(email=user.email, id=str(user.id))
             )
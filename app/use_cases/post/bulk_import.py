@@ -0,0 +1,136 @@
+from datetime import datetime
+from typing import Iterable, Iterator, List, Tuple, Union, Dict, Any
+
+from bson import ObjectId
+from fastapi import Depends
+from mongoengine import ValidationError as DocumentValidationError
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from app.domain.post.entity import PostInImport, ImportPostResponse, ImportRowError
+from app.infra.database.models.post import PostModel, AuthorSnapshot, make_slug
+from app.infra.post.async_post_repository import AsyncPostRepository, get_post_repository
+from app.infra.user.async_user_repository import AsyncUserRepository, get_user_repository
+from app.shared import request_object, use_case
+
+MAX_CHUNK_SIZE = 10000
+
+
+class ImportPostRequestObject(request_object.ValidRequestObject):
+    def __init__(self, lines: Iterable[Union[str, bytes]], default_author_id: ObjectId, chunk_size: int):
+        self.lines = lines
+        self.default_author_id = default_author_id
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def builder(cls, lines: Iterable[Union[str, bytes]], default_author_id: ObjectId,
+                chunk_size: int = 1000) -> request_object.RequestObject:
+        invalid_req = request_object.InvalidRequestObject()
+        if lines is None:
+            invalid_req.add_error("lines", "Invalid file")
+        if not isinstance(default_author_id, ObjectId):
+            invalid_req.add_error("default_author_id", "Invalid ID")
+        if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+            invalid_req.add_error("chunk_size", "chunk_size must be between 1 and {}".format(MAX_CHUNK_SIZE))
+
+        if invalid_req.has_errors():
+            return invalid_req
+        return ImportPostRequestObject(lines=lines, default_author_id=default_author_id, chunk_size=chunk_size)
+
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join("{}: {}".format(".".join(str(loc) for loc in error["loc"]) or "line", error["msg"])
+                     for error in exc.errors())
+
+
+def parse_chunk(lines: Iterator[Tuple[int, Union[str, bytes]]], chunk_size: int,
+                ) -> Tuple[List[Tuple[int, PostInImport]], List[ImportRowError]]:
+    """Read and validate numbered lines until ``chunk_size`` posts are valid or the file ends, blocking
+
+    :return: (valid rows, rows rejected by validation), fewer than ``chunk_size`` valid rows once the file ends
+    """
+    rows, errors = [], []
+    for line, raw in lines:
+        if not raw.strip():
+            continue
+        try:
+            rows.append((line, PostInImport.model_validate_json(raw)))
+        except ValidationError as exc:
+            errors.append(ImportRowError(line=line, error=_validation_message(exc)))
+        if len(rows) >= chunk_size:
+            break
+    return rows, errors
+
+
+def build_docs(rows: List[Tuple[int, PostInImport]],
+               authors: Dict[ObjectId, Dict[str, Any]],
+               default_author_id: ObjectId,
+               ) -> Tuple[List[Dict[str, Any]], List[int], List[ImportRowError]]:
+    """Build the raw documents of a chunk, every post of the chunk gets the same ``created_at`` unless given
+
+    :return: (documents, line of every document, rows rejected before the write)
+    """
+    now = datetime.utcnow()
+    docs, lines, errors = [], [], []
+    for line, row in rows:
+        author = authors.get(row.author or default_author_id)
+        if author is None:
+            errors.append(ImportRowError(line=line, error="Author does not exist"))
+            continue
+
+        post = PostModel(
+            title=row.title,
+            title_lower=row.title.lower(),
+            description=row.description,
+            thumbnail=row.thumbnail,
+            slug=row.slug or make_slug(row.title),
+            created_at=row.created_at or now,
+            last_updated_at=now,
+            author=author["_id"],
+            author_snapshot=AuthorSnapshot(id=author["_id"], fullname=author.get("fullname"),
+                                           avatar=author.get("avatar")),
+        )
+        try:
+            post.validate()
+        except DocumentValidationError as exc:
+            errors.append(ImportRowError(line=line, error=str(exc)))
+            continue
+        docs.append(post.to_mongo().to_dict())
+        lines.append(line)
+    return docs, lines, errors
+
+
+class ImportPostUseCase(use_case.UseCase):
+    def __init__(self, post_repository: AsyncPostRepository = Depends(get_post_repository),
+                 user_repository: AsyncUserRepository = Depends(get_user_repository)):
+        self.post_repository = post_repository
+        self.user_repository = user_repository
+
+    async def process_request(self, req_object: ImportPostRequestObject):
+        result = ImportPostResponse()
+        lines = enumerate(req_object.lines, start=1)
+
+        while True:
+            # reading the upload and validating the rows would block the event loop for a large file
+            chunk, errors = await run_in_threadpool(parse_chunk, lines, req_object.chunk_size)
+            result.errors.extend(errors)
+            if chunk:
+                await self._import_chunk(chunk, req_object.default_author_id, result)
+            if len(chunk) < req_object.chunk_size:
+                break
+
+        result.errors.sort(key=lambda error: error.line)
+        result.failed = len(result.errors)
+        return result
+
+    async def _import_chunk(self, rows: List[Tuple[int, PostInImport]], default_author_id: ObjectId,
+                            result: ImportPostResponse) -> None:
+        author_ids: List[ObjectId] = list({row.author or default_author_id for _, row in rows})
+        authors = {user["_id"]: user for user in await self.user_repository.find_by_ids(author_ids)}
+
+        docs, lines, errors = await run_in_threadpool(build_docs, rows, authors, default_author_id)
+        result.errors.extend(errors)
+
+        inserted, write_errors = await self.post_repository.insert_many(docs)
+        result.inserted += inserted
+        result.errors.extend(ImportRowError(line=lines[index], error=error) for index, error in write_errors.items())
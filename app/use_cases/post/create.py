@@ -1,18 +1,32 @@
-from fastapi import Depends
+import functools
+from typing import Optional
 
-from app.domain.post.entity import PostInCreate, Post, PostInDB
-from app.domain.user.entity import UserInDB, User
+from bson import ObjectId
+from fastapi import Depends, BackgroundTasks
+
+from app.domain.post.entity import PostInCreate
+from app.domain.shared.enum import UploadStatus
 from app.infra.database.models.post import PostModel
+from app.infra.post.async_post_repository import AsyncPostRepository, get_post_repository
+from app.infra.post.mapper import to_post
 from app.infra.post.post_repository import PostRepository
+from app.infra.upload.upload_queue import SpooledUpload, upload_queue
 from app.shared import request_object, use_case, response_object
 
 
+def thumbnail_uploaded(post_id: ObjectId, url: Optional[str]) -> None:
+    """runs on an upload worker thread"""
+
+    PostRepository().set_thumbnail(post_id, url)
+
+
 class CreatePostRequestObject(request_object.ValidRequestObject):
-    def __init__(self, obj_in: PostInCreate):
+    def __init__(self, obj_in: PostInCreate, thumbnail: Optional[SpooledUpload] = None):
         self.obj_in = obj_in
+        self.thumbnail = thumbnail
 
     @classmethod
-    def builder(cls, payload: PostInCreate) -> request_object.RequestObject:
+    def builder(cls, payload: PostInCreate, thumbnail: Optional[SpooledUpload] = None) -> request_object.RequestObject:
         invalid_req = request_object.InvalidRequestObject()
         if payload is None:
             invalid_req.add_error("payload", "Invalid payload")
@@ -20,19 +34,30 @@ class CreatePostRequestObject(request_object.ValidRequestObject):
         if invalid_req.has_errors():
             return invalid_req
 
-        return CreatePostRequestObject(obj_in=payload)
+        return CreatePostRequestObject(obj_in=payload, thumbnail=thumbnail)
 
 
 class CreatePostUseCase(use_case.UseCase):
-    def __init__(self, post_repository: PostRepository = Depends(PostRepository)):
+    def __init__(self,
+                 background_tasks: BackgroundTasks,
+                 post_repository: AsyncPostRepository = Depends(get_post_repository)):
+        self.background_tasks = background_tasks
         self.post_repository = post_repository
 
-    def process_request(self, req_object: CreatePostRequestObject):
+    async def process_request(self, req_object: CreatePostRequestObject):
         post_in = req_object.obj_in
+        if req_object.thumbnail:
+            post_in = post_in.model_copy(update={"thumbnail_status": UploadStatus.PENDING})
 
         try:
-            post: PostModel = self.post_repository.create(obj_in=post_in)
-            return Post(**PostInDB.model_validate(post).model_dump(exclude=({"author"})),
-                        author=User(**UserInDB.model_validate(post.author).model_dump()))
+            post: PostModel = await self.post_repository.create(obj_in=post_in)
+            doc = post.to_mongo().to_dict()
         except Exception:
+            if req_object.thumbnail:
+                upload_queue.discard(req_object.thumbnail)
             return response_object.ResponseFailure.build_system_error("Something went error.")
+
+        if req_object.thumbnail:
+            self.background_tasks.add_task(upload_queue.submit, req_object.thumbnail,
+                                           functools.partial(thumbnail_uploaded, post.id))
+        return to_post(doc)
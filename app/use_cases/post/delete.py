@@ -2,7 +2,7 @@ from typing import Optional
 
 from fastapi import Depends
 from bson import ObjectId
-from app.infra.post.post_repository import PostRepository
+from app.infra.post.async_post_repository import AsyncPostRepository, get_post_repository
 from app.shared import request_object, response_object, use_case
 
 
@@ -29,21 +29,21 @@ class DeletePostRequestObject(request_object.ValidRequestObject):
 
 
 class DeletePostUseCase(use_case.UseCase):
-    def __init__(self, post_repository: PostRepository = Depends(PostRepository)):
+    def __init__(self, post_repository: AsyncPostRepository = Depends(get_post_repository)):
         self.post_repository = post_repository
 
-    def process_request(self, req_object: DeletePostRequestObject):
+    async def process_request(self, req_object: DeletePostRequestObject):
         if req_object.is_admin:
-            post = self.post_repository.find_one({"_id": ObjectId(req_object.post_id)})
+            post = await self.post_repository.find_one({"_id": ObjectId(req_object.post_id)})
         else:
-            post = self.post_repository.find_one(
+            post = await self.post_repository.find_one(
                 {"_id": ObjectId(req_object.post_id), "author": ObjectId(req_object.author_id)})
 
         if not post:
             return response_object.ResponseFailure.build_not_found_error(message="Post does not exist.")
 
         try:
-            self.post_repository.delete(id=post.id)
+            await self.post_repository.delete(id=post.id)
             return {"success": True}
         except Exception:
             return response_object.ResponseFailure.build_system_error("Something went error.")
@@ -0,0 +1,68 @@
+from datetime import datetime
+from typing import Optional, Dict, Any, AsyncIterator, List
+
+from fastapi import Depends
+
+from app.infra.post.async_post_repository import AsyncPostRepository, get_post_repository
+from app.shared import request_object, use_case
+from app.shared.serializer import stream_ndjson
+
+EXPORT_FIELDS = ["id", "title", "slug", "description", "thumbnail", "created_at", "last_updated_at", "author",
+                 "author_snapshot"]
+MAX_BATCH_SIZE = 10000
+
+
+class ExportPostRequestObject(request_object.ValidRequestObject):
+    def __init__(self, conditions: Dict[str, Any], projection: Dict[str, int], batch_size: int):
+        self.conditions = conditions
+        self.projection = projection
+        self.batch_size = batch_size
+
+    @classmethod
+    def builder(cls,
+                created_from: Optional[datetime] = None,
+                created_to: Optional[datetime] = None,
+                fields: Optional[List[str]] = None,
+                batch_size: int = 1000,
+                ) -> request_object.RequestObject:
+        invalid_req = request_object.InvalidRequestObject()
+
+        conditions: Dict[str, Any] = {}
+        if created_from or created_to:
+            if created_from and created_to and created_from > created_to:
+                invalid_req.add_error("created_from", "created_from must be before created_to")
+            conditions["created_at"] = {}
+            if created_from:
+                conditions["created_at"]["$gte"] = created_from
+            if created_to:
+                conditions["created_at"]["$lt"] = created_to
+
+        fields = fields or EXPORT_FIELDS
+        unknown = [field for field in fields if field not in EXPORT_FIELDS]
+        if unknown:
+            invalid_req.add_error("fields", "Invalid fields: {}".format(", ".join(unknown)))
+        projection = {"_id" if field == "id" else field: 1 for field in fields}
+        projection.setdefault("_id", 0)
+
+        if not 0 < batch_size <= MAX_BATCH_SIZE:
+            invalid_req.add_error("batch_size", "batch_size must be between 1 and {}".format(MAX_BATCH_SIZE))
+
+        if invalid_req.has_errors():
+            return invalid_req
+        return ExportPostRequestObject(conditions=conditions, projection=projection, batch_size=batch_size)
+
+
+class ExportPostUseCase(use_case.UseCase):
+    def __init__(self, post_repository: AsyncPostRepository = Depends(get_post_repository)):
+        self.post_repository = post_repository
+
+    async def process_request(self, req_object: ExportPostRequestObject) -> AsyncIterator[bytes]:
+        async def rows() -> AsyncIterator[Dict[str, Any]]:
+            async for doc in self.post_repository.export(conditions=req_object.conditions,
+                                                         projection=req_object.projection,
+                                                         batch_size=req_object.batch_size):
+                if "_id" in doc:
+                    doc["id"] = doc.pop("_id")
+                yield doc
+
+        return stream_ndjson(rows())
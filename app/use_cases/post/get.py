@@ -1,11 +1,10 @@
-from typing import Optional
+from typing import Optional, Dict, Any
 
 from fastapi import Depends
 
-from app.domain.post.entity import Post, PostInDB
-from app.domain.user.entity import User, UserInDB
-from app.infra.database.models.post import PostModel
-from app.infra.post.post_repository import PostRepository
+from app.infra.post.async_post_repository import AsyncPostRepository, get_post_repository
+from app.infra.post.mapper import to_post
+from app.infra.user.author_loader import AuthorLoader
 from app.shared import request_object, use_case, response_object
 
 
@@ -25,13 +24,15 @@ class GetPostByIdObjectRequest(request_object.ValidRequestObject):
 
 
 class GetPostByIdUseCase(use_case.UseCase):
-    def __init__(self, post_repository: PostRepository = Depends(PostRepository)):
+    def __init__(self, post_repository: AsyncPostRepository = Depends(get_post_repository),
+                 author_loader: AuthorLoader = Depends(AuthorLoader)):
         self.post_repository = post_repository
+        self.author_loader = author_loader
 
-    def process_request(self, req_object: GetPostByIdObjectRequest):
-        post: Optional[PostModel] = self.post_repository.get_by_id(post_id=req_object.post_id)
+    async def process_request(self, req_object: GetPostByIdObjectRequest):
+        post: Optional[Dict[str, Any]] = await self.author_loader.load_one(
+            await self.post_repository.get_by_id(post_id=req_object.post_id))
         if not post:
             return response_object.ResponseFailure.build_not_found_error(message="User does not exist.")
 
-        return Post(**PostInDB.model_validate(post).model_dump(exclude=({"author"})),
-                    author=User(**UserInDB.model_validate(post.author).model_dump()))
+        return to_post(post)
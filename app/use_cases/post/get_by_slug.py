@@ -0,0 +1,38 @@
+from typing import Optional, Dict, Any
+
+from fastapi import Depends
+
+from app.infra.post.async_post_repository import AsyncPostRepository, get_post_repository
+from app.infra.post.mapper import to_post
+from app.infra.user.author_loader import AuthorLoader
+from app.shared import request_object, use_case, response_object
+
+
+class GetPostBySlugObjectRequest(request_object.ValidRequestObject):
+    def __init__(self, slug: str):
+        self.slug = slug
+
+    @classmethod
+    def builder(cls, slug: str) -> request_object.RequestObject:
+        invalid_req = request_object.InvalidRequestObject()
+        if not slug:
+            invalid_req.add_error("slug", "Invalid slug")
+
+        if invalid_req.has_errors():
+            return invalid_req
+        return GetPostBySlugObjectRequest(slug=slug)
+
+
+class GetPostBySlugUseCase(use_case.UseCase):
+    def __init__(self, post_repository: AsyncPostRepository = Depends(get_post_repository),
+                 author_loader: AuthorLoader = Depends(AuthorLoader)):
+        self.post_repository = post_repository
+        self.author_loader = author_loader
+
+    async def process_request(self, req_object: GetPostBySlugObjectRequest):
+        post: Optional[Dict[str, Any]] = await self.author_loader.load_one(
+            await self.post_repository.get_by_slug(slug=req_object.slug))
+        if not post:
+            return response_object.ResponseFailure.build_not_found_error(message="Post does not exist.")
+
+        return to_post(post)
@@ -1,48 +1,70 @@
 import math
-from typing import List
+from datetime import datetime
+from typing import List, Optional, Tuple, Any, Dict
 
 from bson import ObjectId
 from fastapi import Depends
 
-from app.domain.post.entity import Post, PostInDB, ManyPostResponse
+from app.domain.post.entity import ManyPostResponse
 from app.domain.shared.entity import Pagination
-from app.domain.user.entity import User, UserInDB
-from app.infra.database.models.post import PostModel
-from app.infra.post.post_repository import PostRepository
+from app.infra.post.async_post_repository import AsyncPostRepository, get_post_repository
+from app.infra.post.mapper import to_posts
+from app.infra.user.author_loader import AuthorLoader
 from app.shared import request_object, use_case
+from app.shared.cursor import decode_cursor, next_cursor, InvalidCursor
+
+
+SORT = {"created_at": -1}
 
 
 class GetPostMeObjectRequest(request_object.ValidRequestObject):
-    def __init__(self, author_id: ObjectId, page_index, page_size):
+    def __init__(self, author_id: ObjectId, page_index, page_size, cursor: Optional[Tuple[str, Any, ObjectId]] = None):
         self.author_id = author_id
         self.page_index = page_index
         self.page_size = page_size
+        self.cursor = cursor
 
     @classmethod
-    def builder(cls, author_id: ObjectId, page_index: int, page_size: int) -> request_object.RequestObject:
+    def builder(cls, author_id: ObjectId, page_index: int, page_size: int,
+                cursor: Optional[str] = None) -> request_object.RequestObject:
         invalid_req = request_object.InvalidRequestObject()
         if not isinstance(author_id, ObjectId):
             invalid_req.add_error("author_id", "Invalid ID")
 
+        decoded_cursor = None
+        if cursor:
+            try:
+                decoded_cursor = decode_cursor(cursor, {"created_at": datetime})
+                if decoded_cursor[0] not in SORT:
+                    invalid_req.add_error("cursor", "Cursor does not match sort")
+            except InvalidCursor as exc:
+                invalid_req.add_error("cursor", str(exc))
+
         if invalid_req.has_errors():
             return invalid_req
-        return GetPostMeObjectRequest(author_id=author_id, page_index=page_index, page_size=page_size)
+        return GetPostMeObjectRequest(author_id=author_id, page_index=page_index, page_size=page_size,
+                                      cursor=decoded_cursor)
 
 
 class GetPostMeUseCase(use_case.UseCase):
-    def __init__(self, post_repository: PostRepository = Depends(PostRepository)):
+    def __init__(self, post_repository: AsyncPostRepository = Depends(get_post_repository),
+                 author_loader: AuthorLoader = Depends(AuthorLoader)):
         self.post_repository = post_repository
+        self.author_loader = author_loader
 
-    def process_request(self, req_object: GetPostMeObjectRequest):
-        posts: List[PostModel] = self.post_repository.find(conditions={"author": req_object.author_id},
-                                                           skip=(req_object.page_index - 1) * req_object.page_size,
-                                                           limit=req_object.page_size,
-                                                           )
-        total = self.post_repository.count({"author": req_object.author_id})
+    async def process_request(self, req_object: GetPostMeObjectRequest):
+        posts: List[Dict[str, Any]] = await self.post_repository.find(conditions={"author": req_object.author_id},
+                                                                      skip=(req_object.page_index - 1) * req_object.page_size,
+                                                                      limit=req_object.page_size,
+                                                                      sort=SORT,
+                                                                      cursor=req_object.cursor,
+                                                                      )
+        await self.author_loader.load(posts)
+        total = await self.post_repository.count({"author": req_object.author_id})
 
         return ManyPostResponse(pagination=Pagination(total=total,
                                                       page_index=req_object.page_index,
-                                                      total_pages=math.ceil(total / req_object.page_size)),
-                                data=[Post(**PostInDB.model_validate(post).model_dump(exclude=({"author"})),
-                                           author=User(**UserInDB.model_validate(post.author).model_dump())) for post in
-                                      posts])
+                                                      total_pages=math.ceil(total / req_object.page_size),
+                                                      next_cursor=next_cursor(SORT, posts[-1])
+                                                      if len(posts) == req_object.page_size else None),
+                                data=to_posts(posts))
@@ -1,76 +1,127 @@
 import math
-from typing import Optional, List, Dict, Any
+import re
+from datetime import datetime
+from typing import Optional, Dict, Any, Tuple
 
 from bson import ObjectId
 from fastapi import Depends
 
-from app.domain.post.entity import PostInDB, Post, ManyPostResponse, SearchByPost
+from app.config import settings
+from app.domain.post.entity import ManyPostResponse, SearchByPost
 from app.domain.shared.entity import Pagination
-from app.domain.user.entity import User, UserInDB
-from app.infra.database.models.post import PostModel
-from app.infra.database.models.user import UserModel
-from app.infra.post.post_repository import PostRepository
-from app.infra.user.user_repository import UserRepository
+from app.domain.shared.enum import CountMode
+from app.infra.post.async_post_repository import AsyncPostRepository, get_post_repository
+from app.infra.post.mapper import to_posts
+from app.infra.user.author_loader import AuthorLoader
 from app.shared import request_object, use_case
+from app.shared.cursor import decode_cursor, next_cursor, InvalidCursor
+
+
+TEXT_SCORE_SORT = {"score": {"$meta": "textScore"}}
+# type of the cursor value of every ``sort_by``
+CURSOR_VALUE_TYPES = {"_id": ObjectId, "created_at": datetime, "last_updated_at": datetime, "title": str}
 
 
 class ListPostRequestObject(request_object.ValidRequestObject):
     def __init__(self, search: Optional[str], search_by: Optional[str], sort: Optional[Dict[str, int]] = None,
-                 page_index: int = 1, page_size: int = 20):
+                 page_index: int = 1, page_size: int = 20, cursor: Optional[Tuple[str, Any, ObjectId]] = None,
+                 count_mode: CountMode = CountMode.EXACT):
         self.page_index = page_index
         self.page_size = page_size
         self.search = search
         self.search_by = search_by
         self.sort = sort
+        self.cursor = cursor
+        self.count_mode = count_mode
 
     @classmethod
     def builder(cls, search: Optional[str], search_by: Optional[str], sort: Optional[Dict[str, int]] = None,
                 page_index: int = 1,
-                page_size: int = 20):
+                page_size: int = 20,
+                cursor: Optional[str] = None,
+                count_mode: CountMode = CountMode.EXACT):
+        invalid_req = request_object.InvalidRequestObject()
+        sort = sort if sort else {"created_at": -1}
+        if search_by is SearchByPost.TEXT and isinstance(search, str):
+            sort = TEXT_SCORE_SORT
+
+        decoded_cursor = None
+        if cursor and sort is TEXT_SCORE_SORT:
+            invalid_req.add_error("cursor", "Cursor is not supported for text search")
+        elif cursor:
+            try:
+                decoded_cursor = decode_cursor(cursor, CURSOR_VALUE_TYPES)
+                if decoded_cursor[0] != next(iter(sort)):
+                    invalid_req.add_error("cursor", "Cursor does not match sort_by")
+            except InvalidCursor as exc:
+                invalid_req.add_error("cursor", str(exc))
+
+        if invalid_req.has_errors():
+            return invalid_req
+
         return ListPostRequestObject(page_index=page_index, page_size=page_size, search=search, search_by=search_by,
-                                     sort=sort)
+                                     sort=sort, cursor=decoded_cursor, count_mode=count_mode)
 
 
 class ListPostUseCase(use_case.UseCase):
     def __init__(
             self,
-            post_repository: PostRepository = Depends(PostRepository),
-            user_repository: UserRepository = Depends(UserRepository)
+            post_repository: AsyncPostRepository = Depends(get_post_repository),
+            author_loader: AuthorLoader = Depends(AuthorLoader),
     ):
         self.post_repository = post_repository
-        self.user_repository = user_repository
+        self.author_loader = author_loader
 
-    def process_request(self, req_object: ListPostRequestObject):
+    async def process_request(self, req_object: ListPostRequestObject):
         match_pipeline: Optional[Dict[str, Any]] = None
 
         if isinstance(req_object.search, str):
-            if req_object.search_by is SearchByPost.TITLE:
+            if req_object.search_by is SearchByPost.TEXT:
+                match_pipeline = {
+                    "$match": {
+                        "$text": {"$search": req_object.search}
+                    }
+                }
+            elif req_object.search_by is SearchByPost.TITLE_PREFIX:
+                match_pipeline = {
+                    "$match": {
+                        "title_lower": {"$regex": "^" + re.escape(req_object.search.lower())}
+                    }
+                }
+            elif req_object.search_by is SearchByPost.TITLE:
                 match_pipeline = {
                     "$match": {
-                        "title": {"$regex": req_object.search, "$options": "i"}
+                        "title": {"$regex": re.escape(req_object.search), "$options": "i"}
                     }
                 }
             else:
-                authors: Optional[List[UserModel]] = self.user_repository.find(conditions={
-                    "fullname": {"$regex": req_object.search, "$options": "i"}
-                })
                 match_pipeline = {
                     "$match": {
-                        "author": {"$in": [ObjectId(author.id) for author in authors]}
+                        "author_snapshot.fullname": {"$regex": re.escape(req_object.search), "$options": "i"}
                     }
                 }
 
-        posts: Optional[List[PostModel]] = self.post_repository.list(page_size=req_object.page_size,
-                                                                     page_index=req_object.page_index,
-                                                                     sort=req_object.sort,
-                                                                     match_pipeline=match_pipeline
-                                                                     )
+        posts, total = await self.post_repository.list_with_total(page_size=req_object.page_size,
+                                                                  page_index=req_object.page_index,
+                                                                  sort=req_object.sort,
+                                                                  match_pipeline=match_pipeline,
+                                                                  cursor=req_object.cursor,
+                                                                  count_mode=req_object.count_mode,
+                                                                  count_cap=settings.POST_COUNT_CAP,
+                                                                  )
+        await self.author_loader.load(posts)
 
-        total = self.post_repository.count_list(match_pipeline=match_pipeline)
+        total_capped = None
+        if req_object.count_mode is CountMode.CAPPED:
+            total_capped = total > settings.POST_COUNT_CAP
+            total = min(total, settings.POST_COUNT_CAP)
 
         return ManyPostResponse(pagination=Pagination(total=total,
                                                       page_index=req_object.page_index,
-                                                      total_pages=math.ceil(total / req_object.page_size)),
-                                data=[Post(**PostInDB.model_validate(post).model_dump(exclude=({"author"})),
-                                           author=User(**UserInDB.model_validate(post.author).model_dump())) for post in
-                                      posts])
+                                                      total_pages=math.ceil(total / req_object.page_size)
+                                                      if total is not None else None,
+                                                      total_capped=total_capped,
+                                                      next_cursor=next_cursor(req_object.sort, posts[-1])
+                                                      if len(posts) == req_object.page_size
+                                                      and req_object.sort is not TEXT_SCORE_SORT else None),
+                                data=to_posts(posts))
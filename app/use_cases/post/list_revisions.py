@@ -0,0 +1,50 @@
+import math
+
+from bson import ObjectId
+from fastapi import Depends
+
+from app.domain.post.entity import ManyPostRevisionResponse
+from app.domain.shared.entity import Pagination
+from app.infra.post.async_post_repository import AsyncPostRepository, get_post_repository
+from app.infra.post.mapper import to_revisions
+from app.shared import request_object, use_case, response_object
+
+
+class ListPostRevisionObjectRequest(request_object.ValidRequestObject):
+    def __init__(self, post_id: ObjectId, page_index: int, page_size: int):
+        self.post_id = post_id
+        self.page_index = page_index
+        self.page_size = page_size
+
+    @classmethod
+    def builder(cls, post_id: str, page_index: int, page_size: int) -> request_object.RequestObject:
+        invalid_req = request_object.InvalidRequestObject()
+        if not ObjectId.is_valid(post_id):
+            invalid_req.add_error("post_id", "Invalid ID")
+
+        if page_index < 1:
+            invalid_req.add_error("page_index", "Page index must be positive")
+
+        if page_size < 1:
+            invalid_req.add_error("page_size", "Page size must be positive")
+
+        if invalid_req.has_errors():
+            return invalid_req
+        return ListPostRevisionObjectRequest(post_id=ObjectId(post_id), page_index=page_index, page_size=page_size)
+
+
+class ListPostRevisionUseCase(use_case.UseCase):
+    def __init__(self, post_repository: AsyncPostRepository = Depends(get_post_repository)):
+        self.post_repository = post_repository
+
+    async def process_request(self, req_object: ListPostRevisionObjectRequest):
+        if not await self.post_repository.count({"_id": req_object.post_id}):
+            return response_object.ResponseFailure.build_not_found_error(message="Post does not exist.")
+
+        revisions, total = await self.post_repository.list_revisions(post_id=req_object.post_id,
+                                                                     page_index=req_object.page_index,
+                                                                     page_size=req_object.page_size)
+        return ManyPostRevisionResponse(pagination=Pagination(total=total,
+                                                              page_index=req_object.page_index,
+                                                              total_pages=math.ceil(total / req_object.page_size)),
+                                        data=to_revisions(revisions))
@@ -1,26 +1,34 @@
+import functools
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Dict, Any
 
 from bson import ObjectId
-from fastapi import Depends
+from fastapi import Depends, BackgroundTasks
 
-from app.domain.post.entity import Post, PostInDB, PostInUpdate
-from app.domain.user.entity import User, UserInDB
-from app.infra.post.post_repository import PostRepository
+from app.domain.post.entity import PostInUpdate
+from app.domain.shared.enum import UploadStatus
+from app.infra.database.models.post import PostView
+from app.infra.post.async_post_repository import AsyncPostRepository, get_post_repository
+from app.infra.post.mapper import to_post
+from app.infra.upload.upload_queue import SpooledUpload, upload_queue
+from app.infra.user.author_loader import AuthorLoader
 from app.shared import request_object, use_case, response_object
+from app.use_cases.post.create import thumbnail_uploaded
 
 
 class UpdatePostObjectRequest(request_object.ValidRequestObject):
     def __init__(self, post_id: str, payload: PostInUpdate, author_id: Optional[str],
-                 is_admin: Optional[bool] = False):
+                 is_admin: Optional[bool] = False, thumbnail: Optional[SpooledUpload] = None):
         self.post_id = post_id
         self.author_id = author_id
         self.is_admin = is_admin
         self.payload = payload
+        self.thumbnail = thumbnail
 
     @classmethod
     def builder(cls, post_id: str, payload: PostInUpdate, author_id: Optional[str],
-                is_admin: Optional[bool] = False) -> request_object.RequestObject:
+                is_admin: Optional[bool] = False,
+                thumbnail: Optional[SpooledUpload] = None) -> request_object.RequestObject:
         invalid_req = request_object.InvalidRequestObject()
         if not post_id:
             invalid_req.add_error("post_id", "Invalid ID")
@@ -30,29 +38,54 @@ class UpdatePostObjectRequest(request_object.ValidRequestObject):
 
         if invalid_req.has_errors():
             return invalid_req
-        return UpdatePostObjectRequest(post_id=post_id, author_id=author_id, is_admin=is_admin, payload=payload)
+        return UpdatePostObjectRequest(post_id=post_id, author_id=author_id, is_admin=is_admin, payload=payload,
+                                       thumbnail=thumbnail)
+
+
+def build_revision(post: PostView, payload: PostInUpdate, editor_id: Optional[ObjectId],
+                   created_at: datetime) -> Dict[str, Any]:
+    """raw revision document holding the old and new value of every field the update changes"""
+
+    changes = {}
+    for field, new in payload.model_dump(exclude_none=True, exclude={"last_updated_at", "thumbnail_status"}).items():
+        old = getattr(post, field, None)
+        if new != old:
+            changes[field] = {"old": old, "new": new}
+    return {"post": post.id, "editor": editor_id, "created_at": created_at, "changes": changes}
 
 
 class UpdatePostUseCase(use_case.UseCase):
-    def __init__(self, post_repository: PostRepository = Depends(PostRepository)):
+    def __init__(self,
+                 background_tasks: BackgroundTasks,
+                 post_repository: AsyncPostRepository = Depends(get_post_repository),
+                 author_loader: AuthorLoader = Depends(AuthorLoader)):
+        self.background_tasks = background_tasks
         self.post_repository = post_repository
+        self.author_loader = author_loader
 
-    def process_request(self, req_object: UpdatePostObjectRequest):
+    async def process_request(self, req_object: UpdatePostObjectRequest):
         if req_object.is_admin:
-            post = self.post_repository.find_one({"_id": ObjectId(req_object.post_id)})
+            post = await self.post_repository.find_one({"_id": ObjectId(req_object.post_id)})
         else:
-            post = self.post_repository.find_one(
+            post = await self.post_repository.find_one(
                 {"_id": ObjectId(req_object.post_id), "author": ObjectId(req_object.author_id)})
 
         if not post:
+            if req_object.thumbnail:
+                upload_queue.discard(req_object.thumbnail)
             return response_object.ResponseFailure.build_not_found_error(message="Post does not exist.")
 
-        updated_at = post.updated_at.copy()
-        updated_at.append(datetime.now())
-        payload = PostInUpdate(**req_object.payload.model_dump(exclude=({"updated_at"})), updated_at=updated_at)
-        self.post_repository.update(id=post.id,
-                                    data=payload)
-        post.reload()
+        now = datetime.utcnow()
+        payload = PostInUpdate(**req_object.payload.model_dump(exclude={"last_updated_at", "thumbnail_status"}),
+                               last_updated_at=now,
+                               thumbnail_status=UploadStatus.PENDING if req_object.thumbnail else None)
+        await self.post_repository.update(id=post.id,
+                                          data=payload)
+        await self.post_repository.add_revision(build_revision(post, req_object.payload, editor_id=req_object.author_id,
+                                                               created_at=now))
+        if req_object.thumbnail:
+            self.background_tasks.add_task(upload_queue.submit, req_object.thumbnail,
+                                           functools.partial(thumbnail_uploaded, post.id))
+        post = await self.author_loader.load_one(await self.post_repository.get_by_id(post_id=post.id))
 
-        return Post(**PostInDB.model_validate(post).model_dump(exclude=({"author"})),
-                    author=User(**UserInDB.model_validate(post.author).model_dump()))
+        return to_post(post)
@@ -1,21 +1,27 @@
+import functools
 from builtins import Exception
+from typing import Optional
 
-from fastapi import Depends
+from fastapi import Depends, BackgroundTasks
 from mongoengine import NotUniqueError
 
+from app.domain.shared.enum import UploadStatus
 from app.domain.user.entity import User, UserInCreate, UserInDB
 from app.infra.database.models.user import UserModel
-from app.infra.security.security_service import get_password_hash
-from app.infra.user.user_repository import UserRepository
+from app.infra.security.password_pool import password_hasher
+from app.infra.upload.upload_queue import SpooledUpload, upload_queue
+from app.infra.user.async_user_repository import AsyncUserRepository, get_user_repository
 from app.shared import request_object, use_case, response_object
+from app.use_cases.user.update import avatar_uploaded
 
 
 class CreateUserRequestObject(request_object.ValidRequestObject):
-    def __init__(self, user_in: UserInCreate) -> None:
+    def __init__(self, user_in: UserInCreate, avatar: Optional[SpooledUpload] = None) -> None:
         self.user_in = user_in
+        self.avatar = avatar
 
     @classmethod
-    def builder(cls, payload: UserInCreate) -> request_object.RequestObject:
+    def builder(cls, payload: UserInCreate, avatar: Optional[SpooledUpload] = None) -> request_object.RequestObject:
         invalid_req = request_object.InvalidRequestObject()
 
         if payload is None:
@@ -27,23 +33,34 @@ class CreateUserRequestObject(request_object.ValidRequestObject):
         if invalid_req.has_errors():
             return invalid_req
 
-        return CreateUserRequestObject(user_in=payload)
+        return CreateUserRequestObject(user_in=payload, avatar=avatar)
 
 
 class CreateUserUseCase(use_case.UseCase):
-    def __init__(self, user_repository: UserRepository = Depends(UserRepository)):
+    def __init__(self,
+                 background_tasks: BackgroundTasks,
+                 user_repository: AsyncUserRepository = Depends(get_user_repository)):
+        self.background_tasks = background_tasks
         self.user_repository = user_repository
 
-    def process_request(self, req_object: CreateUserRequestObject):
+    async def process_request(self, req_object: CreateUserRequestObject):
         user_in: UserInCreate = req_object.user_in
 
         obj_in: UserInCreate = UserInCreate(
-            **user_in.model_dump(exclude={"password"}), password=get_password_hash(password=user_in.password)
+            **user_in.model_dump(exclude={"password", "avatar_status"}),
+            password=await password_hasher.hash(user_in.password),
+            avatar_status=UploadStatus.PENDING if req_object.avatar else None,
         )
         try:
-            user: UserModel = self.user_repository.create(user=obj_in)
-            return User(**UserInDB.model_validate(user).model_dump())
-        except NotUniqueError:
-            return response_object.ResponseFailure.build_system_error("This email existed already")
-        except Exception:
+            user: UserModel = await self.user_repository.create(user=obj_in)
+        except Exception as e:
+            if req_object.avatar:
+                upload_queue.discard(req_object.avatar)
+            if isinstance(e, NotUniqueError):
+                return response_object.ResponseFailure.build_system_error("This email existed already")
             return response_object.ResponseFailure.build_system_error("Something went error.")
+
+        if req_object.avatar:
+            self.background_tasks.add_task(upload_queue.submit, req_object.avatar,
+                                           functools.partial(avatar_uploaded, user.id))
+        return User(**UserInDB.model_validate(user).model_dump())
@@ -2,8 +2,9 @@ from typing import Optional
 
 from fastapi import Depends
 
-from app.infra.database.models.user import UserModel
-from app.infra.user.user_repository import UserRepository
+from app.infra.database.models.user import UserView
+from app.infra.security.security_service import invalidate_user
+from app.infra.user.async_user_repository import AsyncUserRepository, get_user_repository
 from app.shared import request_object, response_object, use_case
 
 
@@ -24,16 +25,17 @@ class DeleteUserRequestObject(request_object.ValidRequestObject):
 
 
 class DeleteUserUseCase(use_case.UseCase):
-    def __init__(self, user_repository: UserRepository = Depends(UserRepository)):
+    def __init__(self, user_repository: AsyncUserRepository = Depends(get_user_repository)):
         self.user_repository = user_repository
 
-    def process_request(self, req_object: DeleteUserRequestObject):
-        user: Optional[UserModel] = self.user_repository.get_by_id(user_id=req_object.user_id)
+    async def process_request(self, req_object: DeleteUserRequestObject):
+        user: Optional[UserView] = await self.user_repository.get_by_id(user_id=req_object.user_id)
         if not user:
             return response_object.ResponseFailure.build_not_found_error(message="User does not exist.")
 
         try:
-            self.user_repository.delete(user.id)
+            await self.user_repository.delete(user.id)
+            invalidate_user(user)
             return {"success": True}
         except Exception:
             return response_object.ResponseFailure.build_system_error("Something went error.")
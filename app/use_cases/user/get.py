@@ -3,8 +3,8 @@ from typing import Optional
 from fastapi import Depends
 
 from app.domain.user.entity import User, UserInDB
-from app.infra.database.models.user import UserModel
-from app.infra.user.user_repository import UserRepository
+from app.infra.database.models.user import UserView
+from app.infra.user.async_user_repository import AsyncUserRepository, get_user_repository
 from app.shared import request_object, response_object, use_case
 
 
@@ -25,11 +25,11 @@ class GetUserRequestObject(request_object.ValidRequestObject):
 
 
 class GetUserUseCase(use_case.UseCase):
-    def __init__(self, user_repository: UserRepository = Depends(UserRepository)):
+    def __init__(self, user_repository: AsyncUserRepository = Depends(get_user_repository)):
         self.user_repository = user_repository
 
-    def process_request(self, req_object: GetUserRequestObject):
-        user: Optional[UserModel] = self.user_repository.get_by_id(user_id=req_object.user_id)
+    async def process_request(self, req_object: GetUserRequestObject):
+        user: Optional[UserView] = await self.user_repository.get_by_id(user_id=req_object.user_id)
         if not user:
             return response_object.ResponseFailure.build_not_found_error(message="User does not exist.")
 
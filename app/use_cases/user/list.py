@@ -1,10 +1,10 @@
 import math
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 
 from app.domain.shared.entity import Pagination
-from app.domain.user.entity import ManyUserResponse, UserInDB, User
-from app.infra.database.models.user import UserModel
-from app.infra.user.user_repository import UserRepository
+from app.domain.user.entity import ManyUserResponse
+from app.infra.user.async_user_repository import AsyncUserRepository, get_user_repository
+from app.infra.user.mapper import to_users
 from app.shared import request_object, use_case
 from fastapi import Depends
 
@@ -20,16 +20,16 @@ class ListUserRequestObject(request_object.ValidRequestObject):
 
 
 class ListUserUseCase(use_case.UseCase):
-    def __init__(self, user_repository: UserRepository = Depends(UserRepository)):
+    def __init__(self, user_repository: AsyncUserRepository = Depends(get_user_repository)):
         self.user_repository = user_repository
 
-    def process_request(self, req_object: ListUserRequestObject):
-        users: Optional[List[UserModel]] = self.user_repository.list(page_size=req_object.page_size,
-                                                                     page_index=req_object.page_index)
+    async def process_request(self, req_object: ListUserRequestObject):
+        users: Optional[List[Dict[str, Any]]] = await self.user_repository.list(page_size=req_object.page_size,
+                                                                                page_index=req_object.page_index)
 
-        total = self.user_repository.count()
+        total = await self.user_repository.count()
 
         return ManyUserResponse(pagination=Pagination(total=total,
                                                       page_index=req_object.page_index,
                                                       total_pages=math.ceil(total / req_object.page_size)),
-                                data=[User(**UserInDB.model_validate(user).model_dump()) for user in users])
+                                data=to_users(users))
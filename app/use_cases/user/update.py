@@ -1,20 +1,43 @@
+import functools
 from typing import Optional
 
-from fastapi import Depends
+from bson import ObjectId
+from fastapi import Depends, BackgroundTasks
 
+from app.domain.shared.enum import UploadStatus
 from app.domain.user.entity import UserInUpdate, UserInDB, User
-from app.infra.database.models.user import UserModel
+from app.infra.database.models.post import AuthorSnapshot
+from app.infra.database.models.user import UserView
+from app.infra.post.async_post_repository import AsyncPostRepository, get_post_repository
+from app.infra.post.post_repository import PostRepository
+from app.infra.security.security_service import invalidate_user
+from app.infra.upload.upload_queue import SpooledUpload, upload_queue
+from app.infra.user.async_user_repository import AsyncUserRepository, get_user_repository
 from app.infra.user.user_repository import UserRepository
 from app.shared import request_object, use_case, response_object
 
 
+def avatar_uploaded(user_id: ObjectId, url: Optional[str]) -> None:
+    """runs on an upload worker thread, the new avatar is copied into the posts of the user"""
+
+    if not UserRepository().set_avatar(user_id, url):
+        return
+    user = UserRepository().get_by_id(user_id)
+    invalidate_user(user)
+    if url:
+        PostRepository().update_author_snapshot(author_id=user.id,
+                                                snapshot=AuthorSnapshot.from_user(user).to_mongo().to_dict())
+
+
 class UpdateUserRequestObject(request_object.ValidRequestObject):
-    def __init__(self, id: str, obj_in: UserInUpdate) -> None:
+    def __init__(self, id: str, obj_in: UserInUpdate, avatar: Optional[SpooledUpload] = None) -> None:
         self.id = id
         self.obj_in = obj_in
+        self.avatar = avatar
 
     @classmethod
-    def builder(cls, id: str, payload: UserInUpdate) -> request_object.RequestObject:
+    def builder(cls, id: str, payload: UserInUpdate,
+                avatar: Optional[SpooledUpload] = None) -> request_object.RequestObject:
         invalid_req = request_object.InvalidRequestObject()
         if id is None:
             invalid_req.add_error("id", "Invalid user id")
@@ -25,18 +48,41 @@ class UpdateUserRequestObject(request_object.ValidRequestObject):
         if invalid_req.has_errors():
             return invalid_req
 
-        return UpdateUserRequestObject(id=id, obj_in=payload)
+        return UpdateUserRequestObject(id=id, obj_in=payload, avatar=avatar)
 
 
 class UpdateUserUseCase(use_case.UseCase):
-    def __init__(self, user_repository: UserRepository = Depends(UserRepository)):
+    def __init__(self,
+                 background_tasks: BackgroundTasks,
+                 user_repository: AsyncUserRepository = Depends(get_user_repository),
+                 post_repository: AsyncPostRepository = Depends(get_post_repository)):
+        self.background_tasks = background_tasks
         self.user_repository = user_repository
+        self.post_repository = post_repository
 
-    def process_request(self, req_object: UpdateUserRequestObject):
-        user: Optional[UserModel] = self.user_repository.get_by_id(req_object.id)
+    async def process_request(self, req_object: UpdateUserRequestObject):
+        user: Optional[UserView] = await self.user_repository.get_by_id(req_object.id)
         if not user:
+            if req_object.avatar:
+                upload_queue.discard(req_object.avatar)
             return response_object.ResponseFailure.build_not_found_error("User does not exist")
 
-        self.user_repository.update(id=user.id, data=req_object.obj_in)
-        user.reload()
+        obj_in = req_object.obj_in
+        if req_object.avatar:
+            obj_in = obj_in.model_copy(update={"avatar_status": UploadStatus.PENDING})
+        before = AuthorSnapshot.from_user(user)
+        await self.user_repository.update(id=user.id, data=obj_in)
+        updated = await self.user_repository.get_by_id(user.id)
+        invalidate_user(user, updated)
+        user = updated
+
+        after = AuthorSnapshot.from_user(user)
+        if after != before:
+            # posts embed a copy of the author, refresh it after the response is sent
+            self.background_tasks.add_task(self.post_repository.update_author_snapshot,
+                                           author_id=user.id, snapshot=after.to_mongo().to_dict())
+        if req_object.avatar:
+            # queued after the snapshot refresh, which would overwrite the avatar copied into the posts
+            self.background_tasks.add_task(upload_queue.submit, req_object.avatar,
+                                           functools.partial(avatar_uploaded, user.id))
         return User(**UserInDB.model_validate(user).model_dump())
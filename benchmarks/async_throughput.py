@@ -0,0 +1,107 @@
+"""Concurrent throughput of the mongoengine (threadpool) and Motor data layers.
+
+Needs the MongoDB configured in ``.env``. Each driver runs in its own process because the driver is
+read from the settings at import time::
+
+    python -m benchmarks.async_throughput --requests 2000 --concurrency 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+DRIVERS = ["mongoengine", "motor"]
+
+
+def seed(posts: int) -> None:
+    from app.infra.database.models.post import PostModel
+    from app.infra.database.models.user import UserModel
+
+    author = UserModel.objects(email="benchmark@example.com").first()
+    if author is None:
+        author = UserModel(email="benchmark@example.com", fullname="Benchmark", password="x", role="user").save()
+    for i in range(PostModel.objects(author=author).count(), posts):
+        PostModel(title=f"Benchmark post {i}", description="lorem ipsum " * 50, author=author).save()
+
+
+async def run(path: str, requests: int, concurrency: int) -> Dict[str, float]:
+    import httpx
+
+    from app.config import settings
+    from app.main import app
+
+    latencies: List[float] = []
+    queue: asyncio.Queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(None)
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        while not queue.empty():
+            queue.get_nowait()
+            start = time.perf_counter()
+            r = await client.get(settings.API_STR + path)
+            r.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        await client.get(settings.API_STR + path)
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+    }
+
+
+def run_driver(args: argparse.Namespace) -> None:
+    from app.infra import database
+
+    database.connect()
+    try:
+        seed(args.posts)
+        result = asyncio.run(run(args.path, args.requests, args.concurrency))
+    finally:
+        database.disconnect()
+    print(json.dumps(dict(result, driver=args.driver)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--driver", choices=DRIVERS, help="run a single driver in this process")
+    parser.add_argument("--path", default="/post?page_size=20")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=200, help="posts to seed before measuring")
+    args = parser.parse_args()
+
+    if args.driver:
+        os.environ["DATABASE_DRIVER"] = args.driver
+        return run_driver(args)
+
+    results = []
+    for driver in DRIVERS:
+        cmd = [sys.executable, "-m", "benchmarks.async_throughput", "--driver", driver, "--path", args.path,
+               "--requests", str(args.requests), "--concurrency", str(args.concurrency), "--posts", str(args.posts)]
+        output = subprocess.run(cmd, check=True, capture_output=True, text=True, env=dict(os.environ,
+                                                                                         DATABASE_DRIVER=driver))
+        results.append(json.loads(output.stdout.strip().splitlines()[-1]))
+
+    print(f"{'driver':<12}{'rps':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for result in results:
+        print(f"{result['driver']:<12}{result['rps']:>10}{result['p50_ms']:>10}{result['p99_ms']:>10}")
+
+
+if __name__ == "__main__":
+    main()
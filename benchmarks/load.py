@@ -0,0 +1,396 @@
+"""Load test of every route of ``api_router`` against a seeded local MongoDB.
+
+The database (``--database``, dropped and reseeded unless ``--skip-seed``) gets ``--users`` users and ``--posts``
+posts with long descriptions from ``app.tools.seed``, the authors follow a Zipf distribution (``--skew``) so a
+few users own most posts.
+Every route then serves ``--requests`` requests at ``--concurrency`` through an in-process HTTP client, the report
+holds throughput, latency percentiles and database commands per request. ``--output`` saves it as JSON and
+``--compare`` prints two saved runs side by side::
+
+    python -m benchmarks.load --users 1000 --posts 20000 --requests 500 --concurrency 50 --output before.json
+    python -m benchmarks.load --compare before.json after.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Tuple
+
+from bson import ObjectId
+
+PASSWORD = "benchmark"
+WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore et "
+         "dolore magna aliqua enim ad minim veniam quis nostrud exercitation ullamco laboris nisi aliquip ex ea "
+         "commodo consequat duis aute irure in reprehenderit voluptate velit esse cillum fugiat nulla pariatur").split()
+# routes that cannot run without an external service
+SKIPPED = {("POST", "/upload/image"): "uploads to Cloudinary"}
+
+
+class Dataset:
+    """What the scenarios pick from, ``disposable`` holds the ids the DELETE scenarios consume"""
+
+    def __init__(self, users: List[Dict[str, Any]], weights: List[float], posts: List[Dict[str, Any]],
+                 admin: Dict[str, Any], export_from: datetime, seed: int):
+        self.users = users
+        self.weights = weights
+        self.posts = posts
+        self.admin = admin
+        self.export_from = export_from
+        self.random = random.Random(seed)
+        self.disposable: Dict[str, List[str]] = {}
+        self.tokens: Dict[str, str] = {}
+        self.counter = 0
+
+    def token(self, user: Dict[str, Any]) -> Dict[str, str]:
+        from app.domain.auth.entity import TokenData
+        from app.infra.security.security_service import create_access_token
+
+        email = user["email"]
+        if email not in self.tokens:
+            self.tokens[email] = create_access_token(TokenData(email=email, id=str(user["_id"])))
+        return {"Authorization": f"Bearer {self.tokens[email]}"}
+
+    def user(self) -> Dict[str, Any]:
+        """a user picked with the author skew, busy authors also make most requests"""
+        return self.random.choices(self.users, self.weights)[0]
+
+    def post(self) -> Dict[str, Any]:
+        return self.random.choice(self.posts)
+
+    def unique(self, prefix: str) -> str:
+        self.counter += 1
+        return f"{prefix}-{os.getpid()}-{self.counter}"
+
+
+def description(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def seed(users: int, posts: int, skew: float, description_words: int, revisions: int, workers: int,
+         random_seed: int) -> None:
+    """Generate the users and posts with ``app.tools.seed``, then revisions for every tenth post"""
+    from app.infra.database import indexes
+    from app.infra.database.models.post import PostModel
+    from app.infra.database.models.post_revision import PostRevisionModel
+    from app.infra.security.password import get_password_hash
+    from app.tools.seed import SeedOptions, seed as generate
+
+    options = SeedOptions(users=users + 1, posts=posts, admins=1, password_hash=get_password_hash(PASSWORD),
+                          email_domain="benchmark.example.com", skew=skew,
+                          description_median=description_words * 6, description_max=description_words * 60,
+                          seed=random_seed)
+    generate(options, workers=workers)
+    indexes.apply()
+
+    now = datetime.utcnow()
+    sampled = PostModel._get_collection().aggregate([{"$sample": {"size": posts // 10}},
+                                                     {"$project": {"title": 1, "author": 1}}])
+    revision_docs = [
+        PostRevisionModel(post=post["_id"], editor=post["author"], created_at=now - timedelta(seconds=n),
+                          changes={"title": {"old": post["title"] + " draft", "new": post["title"]}}).to_mongo()
+        for post in sampled for n in range(revisions)
+    ]
+    if revision_docs:
+        PostRevisionModel._get_collection().insert_many(revision_docs, ordered=False)
+
+
+def load(skew: float) -> Tuple[List[Dict[str, Any]], List[float], List[Dict[str, Any]], Dict[str, Any]]:
+    """the dataset of a previous run, users in insertion order so the weights follow the same ranks"""
+    from app.infra.database.models.post import PostModel
+    from app.infra.database.models.user import UserModel
+
+    users = list(UserModel._get_collection().find({"email": {"$regex": "^user[0-9]+@"}}, {"email": 1})
+                 .sort("_id", 1))
+    admin = UserModel._get_collection().find_one({"role": "admin"})
+    posts = list(PostModel._get_collection().find({}, {"slug": 1, "created_at": 1}).sort("created_at", 1))
+    if admin is None or not users or not posts:
+        sys.exit("Nothing seeded in this database, run without --skip-seed")
+    return users, [1 / (rank + 1) ** skew for rank in range(len(users))], posts, admin
+
+
+def disposable_posts(data: Dataset, count: int) -> List[str]:
+    from app.infra.database.models.post import PostModel
+
+    author = data.user()
+    docs = [dict(PostModel(title="Disposable", description="lorem", author=ObjectId(author["_id"]),
+                           slug=data.unique("disposable"), created_at=datetime.utcnow()).to_mongo(), _id=ObjectId())
+            for _ in range(count)]
+    PostModel._get_collection().insert_many(docs)
+    return [str(doc["_id"]) for doc in docs]
+
+
+def disposable_users(data: Dataset, count: int) -> List[str]:
+    from app.infra.database.models.user import UserModel
+
+    docs = [dict(UserModel(email=f"{data.unique('disposable')}@benchmark.example.com", fullname="Disposable",
+                           password="x", role="user").to_mongo(), _id=ObjectId()) for _ in range(count)]
+    UserModel._get_collection().insert_many(docs)
+    return [str(doc["_id"]) for doc in docs]
+
+
+def payload(value: Dict[str, Any]) -> Dict[str, str]:
+    # multipart routes take their JSON body in the ``payload`` form field
+    return {"payload": json.dumps(value)}
+
+
+def import_file(data: Dataset) -> Dict[str, Any]:
+    lines = [json.dumps({"title": data.unique("Imported"), "description": description(data.random, 50)})
+             for _ in range(10)]
+    return {"file": ("posts.jsonl", "\n".join(lines).encode("utf-8"))}
+
+
+# (method, path without API_STR): builds the keyword arguments of ``httpx.AsyncClient.request``
+Scenario = Callable[[Dataset], Dict[str, Any]]
+SCENARIOS: Dict[Tuple[str, str], Scenario] = {
+    ("POST", "/auth/login"): lambda d: dict(json={"email": d.user()["email"], "password": PASSWORD}),
+    ("POST", "/auth/signup"): lambda d: dict(json={"email": f"{d.unique('signup')}@benchmark.example.com",
+                                                   "password": PASSWORD + "1", "fullname": "Signup"}),
+
+    ("GET", "/post"): lambda d: dict(params={"page_size": 20}),
+    ("POST", "/post"): lambda d: dict(headers=d.token(d.user()), data=payload(
+        {"title": d.unique("Created"), "description": description(d.random, 200)})),
+    ("POST", "/post/import"): lambda d: dict(headers=d.token(d.admin), files=import_file(d)),
+    ("GET", "/post/me"): lambda d: dict(headers=d.token(d.user()), params={"page_size": 20}),
+    ("GET", "/post/export"): lambda d: dict(headers=d.token(d.admin),
+                                            params={"created_from": d.export_from.isoformat()}),
+    ("GET", "/post/slug/{slug}"): lambda d: dict(path={"slug": d.post()["slug"]}),
+    ("GET", "/post/{post_id}"): lambda d: dict(path={"post_id": str(d.post()["_id"])}),
+    ("GET", "/post/{post_id}/revisions"): lambda d: dict(path={"post_id": str(d.post()["_id"])}),
+    ("PUT", "/post/{post_id}"): lambda d: dict(path={"post_id": str(d.post()["_id"])}, headers=d.token(d.admin),
+                                               data=payload({"title": d.unique("Edited"),
+                                                             "description": description(d.random, 200)})),
+    ("DELETE", "/post/{post_id}"): lambda d: dict(path={"post_id": d.disposable["post"].pop()},
+                                                  headers=d.token(d.admin)),
+
+    ("POST", "/user"): lambda d: dict(headers=d.token(d.admin), data=payload(
+        {"email": f"{d.unique('created')}@benchmark.example.com", "role": "user", "fullname": "Created",
+         "password": PASSWORD + "1"})),
+    ("GET", "/user"): lambda d: dict(headers=d.token(d.user()), params={"page_size": 20}),
+    ("GET", "/user/me"): lambda d: dict(headers=d.token(d.user())),
+    ("PUT", "/user/me"): lambda d: dict(headers=d.token(d.user()), data=payload({"fullname": d.unique("Me")})),
+    ("GET", "/user/export"): lambda d: dict(headers=d.token(d.admin)),
+    ("GET", "/user/{user_id}"): lambda d: dict(headers=d.token(d.user()), path={"user_id": str(d.user()["_id"])}),
+    ("PUT", "/user/{user_id}"): lambda d: dict(headers=d.token(d.admin), path={"user_id": str(d.user()["_id"])},
+                                               data=payload({"fullname": d.unique("Renamed")})),
+    ("DELETE", "/user/{user_id}"): lambda d: dict(headers=d.token(d.admin),
+                                                  path={"user_id": d.disposable["user"].pop()}),
+
+    ("GET", "/system/database/pool"): lambda d: dict(headers=d.token(d.admin)),
+    ("GET", "/system/database/commands"): lambda d: dict(headers=d.token(d.admin)),
+    ("GET", "/system/cache"): lambda d: dict(headers=d.token(d.admin)),
+    ("GET", "/system/password-hasher"): lambda d: dict(headers=d.token(d.admin)),
+}
+# ids consumed by a scenario, created before its run
+DISPOSABLE: Dict[Tuple[str, str], Tuple[str, Callable[[Dataset, int], List[str]]]] = {
+    ("DELETE", "/post/{post_id}"): ("post", disposable_posts),
+    ("DELETE", "/user/{user_id}"): ("user", disposable_users),
+}
+
+
+def routes() -> List[Tuple[str, str]]:
+    from fastapi.routing import APIRoute
+
+    from app.interfaces.rest.api import api_router
+
+    return [(method, route.path) for route in api_router.routes if isinstance(route, APIRoute)
+            for method in sorted(route.methods)]
+
+
+def percentile(values: List[float], q: float) -> float:
+    """nearest rank percentile of sorted ``values``"""
+    return values[max(0, min(len(values) - 1, int(round(q * len(values) + 0.5)) - 1))]
+
+
+def counting_queries(app: Any, queries: List[int]) -> Any:
+    """ASGI wrapper collecting the database commands of every request counted by ``DatabaseStatsMiddleware``"""
+
+    async def asgi(scope, receive, send):
+        await app(scope, receive, send)
+        stats = scope.get("state", {}).get("database")
+        if stats is not None:
+            queries.append(stats.queries)
+
+    return asgi
+
+
+async def run_route(client: Any, queries: List[int], data: Dataset, method: str, path: str, requests: int,
+                    concurrency: int, warmup: int) -> Dict[str, Any]:
+    from app.config import settings
+
+    scenario = SCENARIOS[(method, path)]
+    if (method, path) in DISPOSABLE:
+        name, create = DISPOSABLE[(method, path)]
+        data.disposable[name] = create(data, requests + warmup)
+
+    async def send() -> Tuple[float, int]:
+        kwargs = scenario(data)
+        url = settings.API_STR + path.format(**kwargs.pop("path", {}))
+        start = time.perf_counter()
+        r = await client.request(method, url, **kwargs)
+        return time.perf_counter() - start, r.status_code
+
+    for _ in range(warmup):
+        await send()
+    queries.clear()
+
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    remaining = requests
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            latency, status = await send()
+            latencies.append(latency)
+            statuses[status] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": sum(count for status, count in statuses.items() if status >= 400),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "seconds": round(elapsed, 3),
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "queries_avg": round(sum(queries) / len(queries), 2) if queries else 0,
+        "queries_max": max(queries, default=0),
+    }
+
+
+async def run(data: Dataset, selected: List[Tuple[str, str]], requests: int, concurrency: int,
+              warmup: int) -> Dict[str, Any]:
+    import httpx
+
+    from app.main import app
+
+    results: Dict[str, Any] = {}
+    queries: List[int] = []
+    transport = httpx.ASGITransport(app=counting_queries(app, queries))
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        for method, path in selected:
+            name = f"{method} {path}"
+            if (method, path) in SKIPPED:
+                results[name] = {"skipped": SKIPPED[(method, path)]}
+            elif (method, path) not in SCENARIOS:
+                results[name] = {"skipped": "no scenario in benchmarks.load"}
+            else:
+                results[name] = await run_route(client, queries, data, method, path, requests, concurrency, warmup)
+            print_row(name, results[name], file=sys.stderr)
+    return results
+
+
+def print_row(name: str, result: Dict[str, Any], file=sys.stdout) -> None:
+    if "skipped" in result:
+        print(f"{name:<36}skipped: {result['skipped']}", file=file)
+        return
+    print(f"{name:<36}{result['rps']:>9}{result['p50_ms']:>9}{result['p95_ms']:>9}{result['p99_ms']:>9}"
+          f"{result['queries_avg']:>9}{result['errors']:>8}", file=file)
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"{'route':<36}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}{'errors':>8}")
+    for name, result in report["routes"].items():
+        print_row(name, result)
+
+
+def compare(before: Dict[str, Any], after: Dict[str, Any]) -> None:
+    def delta(old: float, new: float) -> str:
+        return f"{(new - old) / old * 100:+.0f}%" if old else "-"
+
+    print(f"{'route':<36}{'rps':>20}{'p95 ms':>24}{'queries':>14}")
+    for name in list(dict.fromkeys(list(before["routes"]) + list(after["routes"]))):
+        old, new = before["routes"].get(name, {}), after["routes"].get(name, {})
+        if "rps" not in old or "rps" not in new:
+            print(f"{name:<36}{'only in one run' if 'rps' in old or 'rps' in new else 'skipped':>20}")
+            continue
+        print(f"{name:<36}{old['rps']:>8} > {new['rps']:<6}{delta(old['rps'], new['rps']):>5}"
+              f"{old['p95_ms']:>10} > {new['p95_ms']:<7}{delta(old['p95_ms'], new['p95_ms']):>5}"
+              f"{old['queries_avg']:>7} > {new['queries_avg']:<5}")
+    for key in sorted(set(before["config"]) | set(after["config"])):
+        if before["config"].get(key) != after["config"].get(key):
+            print(f"config {key}: {before['config'].get(key)} > {after['config'].get(key)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=27017)
+    parser.add_argument("--database", default="blog_benchmark", help="dropped and reseeded unless --skip-seed")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--posts", type=int, default=20000)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of the author distribution")
+    parser.add_argument("--description-words", type=int, default=800)
+    parser.add_argument("--revisions", type=int, default=5, help="revisions of every tenth post")
+    parser.add_argument("--seed-workers", type=int, default=os.cpu_count(), help="processes inserting the data")
+    parser.add_argument("--skip-seed", action="store_true", help="reuse the dataset of a previous run")
+    parser.add_argument("--requests", type=int, default=500, help="timed requests per route")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=10, help="untimed requests per route")
+    parser.add_argument("--routes", default=None, help="regular expression on 'METHOD /path' of the routes to run")
+    parser.add_argument("--seed", type=int, default=42, help="random seed of the dataset and the requests")
+    parser.add_argument("--output", default=None, help="save the report as JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two saved reports")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as before, open(args.compare[1]) as after:
+            return compare(json.load(before), json.load(after))
+
+    # a local mongod without authentication, read by the settings at import time
+    os.environ.update(MONGODB_HOST=args.host, MONGODB_PORT=str(args.port), MONGODB_DATABASE=args.database,
+                      ENVIRONMENT="testing")
+    from app.config import settings
+    from app.infra import database
+    from app.infra.database import indexes
+    from mongoengine import get_db
+
+    indexes.disable_auto_create_index()
+    database.connect()
+    try:
+        if not args.skip_seed:
+            get_db().client.drop_database(args.database)
+            start = time.perf_counter()
+            seed(args.users, args.posts, args.skew, args.description_words, args.revisions, args.seed_workers,
+                 args.seed)
+            print(f"seeded {args.users} users, {args.posts} posts in {time.perf_counter() - start:.1f}s",
+                  file=sys.stderr)
+        users, weights, posts, admin = load(args.skew)
+
+        # GET /post/export streams the newest 1% of the posts
+        export_from = posts[-max(1, len(posts) // 100)]["created_at"]
+        data = Dataset(users, weights, posts, admin, export_from, args.seed)
+        selected = [route for route in routes() if not args.routes or re.search(args.routes, " ".join(route))]
+        results = asyncio.run(run(data, selected, args.requests, args.concurrency, args.warmup))
+    finally:
+        database.disconnect()
+
+    report = {
+        "config": {
+            "users": len(users), "posts": len(posts), "skew": args.skew,
+            "description_words": args.description_words, "requests": args.requests,
+            "concurrency": args.concurrency, "driver": settings.DATABASE_DRIVER, "seed": args.seed,
+        },
+        "started_at": datetime.utcnow().isoformat(),
+        "routes": results,
+    }
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Per row cost of mongoengine Documents and read only views on a listing, no database needed::
+
+    python -m benchmarks.read_models --rows 10000
+"""
+import argparse
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from bson import ObjectId
+
+
+def build_rows(rows: int) -> List[Dict[str, Any]]:
+    author = ObjectId()
+    now = datetime.utcnow()
+    return [{
+        "_id": ObjectId(),
+        "_cls": "PostModel",
+        "title": f"Benchmark post {i}",
+        "title_lower": f"benchmark post {i}",
+        "slug": f"benchmark-post-{i}-12345",
+        "description": "lorem ipsum " * 50,
+        "thumbnail": None,
+        "created_at": now,
+        "last_updated_at": now,
+        "author": author,
+        "author_snapshot": {"id": author, "fullname": "Benchmark", "avatar": None},
+    } for i in range(rows)]
+
+
+def measure(build: Callable[[Dict[str, Any]], Any], rows: List[Dict[str, Any]]) -> Dict[str, float]:
+    # documents may consume their input, every run gets its own copies
+    copies = [dict(row) for row in rows]
+    start = time.perf_counter()
+    built = [build(row) for row in copies]
+    elapsed = time.perf_counter() - start
+
+    copies = [dict(row) for row in rows]
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    built = [build(row) for row in copies]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del built
+    return {
+        "us_per_row": round(elapsed / len(rows) * 1e6, 2),
+        "bytes_per_row": round(allocated / len(rows)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    args = parser.parse_args()
+
+    from app.infra.database.models.post import PostModel, PostView
+
+    rows = build_rows(args.rows)
+    results = [
+        ("PostModel.from_mongo", measure(PostModel.from_mongo, rows)),
+        ("PostView.from_mongo", measure(PostView.from_mongo, rows)),
+    ]
+
+    print(f"{'read model':<24}{'us/row':>10}{'bytes/row':>12}")
+    for name, result in results:
+        print(f"{name:<24}{result['us_per_row']:>10}{result['bytes_per_row']:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Serialization cost of a ManyPostResponse page, no database needed::
+
+    python -m benchmarks.serialization --posts 100 --number 500
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+from bson import ObjectId
+
+
+def build_page(posts: int):
+    from app.domain.post.entity import ManyPostResponse, Post
+    from app.domain.shared.entity import Pagination
+    from app.domain.user.entity import User
+
+    author = User(id=str(ObjectId()), email="benchmark@example.com", fullname="Benchmark", role="user")
+    now = datetime.utcnow()
+    return ManyPostResponse(
+        pagination=Pagination(total=posts, page_index=1, total_pages=1),
+        data=[Post(id=str(ObjectId()), title=f"Benchmark post {i}", description="lorem ipsum " * 50, author=author,
+                   created_at=now, last_updated_at=now, slug=f"benchmark-post-{i}-12345") for i in range(posts)],
+    )
+
+
+def candidates(page) -> List[Tuple[str, Callable[[], bytes]]]:
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+    from starlette.responses import JSONResponse
+
+    from app.shared.serializer import dump_json, orjson
+
+    adapter = TypeAdapter(type(page))
+    result = [
+        ("jsonable_encoder", lambda: JSONResponse(content=jsonable_encoder(page, by_alias=True)).body),
+        ("model_dump_json", lambda: page.model_dump_json(by_alias=True).encode("utf-8")),
+        ("TypeAdapter.dump_json", lambda: adapter.dump_json(page, by_alias=True)),
+        ("dump_json", lambda: dump_json(page, by_alias=True)),
+    ]
+    if orjson is not None:
+        result.append(("orjson(model_dump)", lambda: orjson.dumps(page.model_dump(by_alias=True))))
+    return result
+
+
+def run(posts: int, number: int) -> List[Dict[str, float]]:
+    page = build_page(posts)
+    runs = candidates(page)
+    expected = json.loads(runs[0][1]())
+    results = []
+    for name, fn in runs:
+        assert json.loads(fn()) == expected, f"{name} output differs"
+        ms = min(timeit.repeat(fn, number=number, repeat=3)) / number * 1000
+        results.append({"serializer": name, "ms": round(ms, 3)})
+    baseline = results[0]["ms"]
+    for result in results:
+        result["speedup"] = round(baseline / result["ms"], 1)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=100)
+    parser.add_argument("--number", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{'serializer':<24}{'ms':>10}{'speedup':>10}")
+    for result in run(args.posts, args.number):
+        print(f"{result['serializer']:<24}{result['ms']:>10}{result['speedup']:>9}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,19 @@
 import unittest
 
-import mongomock
 from fastapi.testclient import TestClient
-from mongoengine import connect, disconnect
+from mongoengine import disconnect
 
 from app.infra.database.models.user import UserModel
-from app.infra.security.security_service import get_password_hash, verify_password
+from app.infra.security.security_service import get_password_hash, user_cache, verify_password
 from app.main import app
+from tests.helpers import assert_max_queries, connect_mongomock
 
 
 class TestUserApi(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
-        disconnect()
-        connect("mongoenginetest", host="mongodb://localhost:1234", mongo_client_class=mongomock.MongoClient)
+        connect_mongomock()
+        user_cache.clear()
         cls.client = TestClient(app)
         cls.user = UserModel(
             email="test@test.com",
@@ -27,10 +27,11 @@ class TestUserApi(unittest.TestCase):
         disconnect()
 
     def test_login(self):
-        r = self.client.post(
-            "/api/auth/login",
-            json={"email": "test@test.com", "password": "12345678"},
-        )
+        with assert_max_queries(1):
+            r = self.client.post(
+                "/api/auth/login",
+                json={"email": "test@test.com", "password": "12345678"},
+            )
         assert r.status_code == 200
 
         resp = r.json()
@@ -42,10 +43,11 @@ class TestUserApi(unittest.TestCase):
 
 
     def test_signup(self):
-        r = self.client.post(
-            "/api/auth/signup",
-            json={"email": "test1@test.com", "password": "12345678", "fullname": "Test Joe"},
-        )
+        with assert_max_queries(1):
+            r = self.client.post(
+                "/api/auth/signup",
+                json={"email": "test1@test.com", "password": "12345678", "fullname": "Test Joe"},
+            )
         assert r.status_code == 200
 
         resp = r.json()
@@ -1,23 +1,45 @@
+import asyncio
+import base64
+import io
 import json
+import os
+import tempfile
+from datetime import datetime
 import unittest
 from unittest.mock import patch
 
-import mongomock
+from bson import Regex, json_util
+from mongoengine import NotUniqueError, disconnect
+from pymongo.errors import DuplicateKeyError
+from fastapi import HTTPException, UploadFile
 from fastapi.testclient import TestClient
-from mongoengine import connect, disconnect
 
 from app.domain.auth.entity import TokenData
-from app.infra.database.models.post import PostModel
+from app.domain.post.entity import PostInCreate
+from app.domain.shared.enum import CountMode
+from app.infra.database.migrations.author_snapshot import backfill
+from app.infra.database.migrations.post_revisions import compact
+from app.infra.database.models.post import PostModel, PostView
+from app.infra.database.models.post_revision import PostRevisionModel
 from app.infra.database.models.user import UserModel
-from app.infra.security.security_service import get_password_hash
+from app.infra.post.async_post_repository import MotorPostRepository, ThreadedPostRepository
+from app.infra.post.mapper import to_post, to_posts
+from app.infra.post.post_repository import PostRepository, build_count_pipeline, build_list_pipeline, \
+    build_list_with_total_pipeline
+from app.infra.security.security_service import get_password_hash, user_cache
+from app.infra.upload.upload_queue import UploadQueue, upload_queue
+from app.infra.upload.uploader import LocalUploader
 from app.main import app
+from app.tools.seed import SeedOptions, seed
+from app.use_cases.post.bulk_import import parse_chunk
+from tests.helpers import assert_max_queries, connect_mongomock
 
 
 class TestUserApi(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
-        disconnect()
-        connect("mongoenginetest", host="mongodb://localhost:1234", mongo_client_class=mongomock.MongoClient)
+        connect_mongomock()
+        user_cache.clear()
         cls.client = TestClient(app)
         cls.user = UserModel(
             email="test@test.com",
@@ -46,25 +68,152 @@ class TestUserApi(unittest.TestCase):
             mock_token.return_value = TokenData(email=self.user.email)
             data = {'payload': json.dumps(
                 {"title": "Test", "description": "lorem"})}
-            r = self.client.post(
-                "/api/post",
-                data=data,
-                headers={
-                    "Authorization": "Bearer {}".format("xxx"),
-                },
-            )
+            with assert_max_queries(2):
+                r = self.client.post(
+                    "/api/post",
+                    data=data,
+                    headers={
+                        "Authorization": "Bearer {}".format("xxx"),
+                    },
+                )
             assert r.status_code == 200
             post = PostModel.objects(id=r.json().get("id")).get()
             assert post.title == "Test"
             assert post.description == "lorem"
             assert post.created_at
-            assert post.updated_at
+            assert post.last_updated_at
             assert post.slug
 
+    def test_create_post_uploads_thumbnail_in_background(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                patch.object(upload_queue, "uploader", LocalUploader(directory)), \
+                patch("app.infra.security.security_service.verify_token") as mock_token:
+            mock_token.return_value = TokenData(email=self.user.email)
+            data = {'payload': json.dumps({"title": "Thumbnail", "description": "lorem"})}
+            # the request, and the thumbnail write of the upload worker when it is done before the response
+            with assert_max_queries(3):
+                r = self.client.post(
+                    "/api/post",
+                    data=data,
+                    files={"thumbnail": ("thumbnail.png", b"\x89PNG", "image/png")},
+                    headers={
+                        "Authorization": "Bearer {}".format("xxx"),
+                    },
+                )
+            assert r.status_code == 200
+            assert r.json()["thumbnail"] is None
+            assert r.json()["thumbnail_status"] == "pending"
+
+            upload_queue.join()
+            post = PostModel.objects(id=r.json()["id"]).get()
+            post.delete()
+            assert post.thumbnail_status == "done"
+            assert post.thumbnail.startswith("file://")
+            assert os.listdir(directory) and not os.listdir(upload_queue.spool_dir)
+            # the ETag of the post follows the upload, dates are stored with millisecond precision
+            created = datetime.fromisoformat(r.json()["last_updated_at"])
+            assert post.last_updated_at >= created.replace(microsecond=created.microsecond // 1000 * 1000)
+
+    def test_update_post_thumbnail_retries_the_upload(self):
+        post = PostModel(title="Retry", description="description", author=self.user).save()
+        with patch.object(upload_queue, "retry_seconds", 0), \
+                patch.object(upload_queue.uploader, "upload") as mock_upload, \
+                patch("app.infra.security.security_service.verify_token") as mock_token:
+            mock_token.return_value = TokenData(email=self.user.email)
+            mock_upload.side_effect = [Exception("timeout"), "https://cdn.example.com/retry.png"]
+            data = {'payload': json.dumps({"title": "Retry", "description": "lorem"})}
+            r = self.client.put(
+                "/api/post/{}".format(post.id),
+                data=data,
+                files={"thumbnail": ("thumbnail.png", b"\x89PNG", "image/png")},
+                headers={"Authorization": "Bearer {}".format("xxx")},
+            )
+            assert r.status_code == 200
+            assert r.json()["thumbnail_status"] == "pending"
+            upload_queue.join()
+            post.reload()
+            assert post.thumbnail == "https://cdn.example.com/retry.png"
+            assert post.thumbnail_status == "done"
+
+            # every attempt failed, the previous thumbnail stays
+            mock_upload.side_effect = Exception("timeout")
+            failed = upload_queue.stats()["failed"]
+            r = self.client.put(
+                "/api/post/{}".format(post.id),
+                data=data,
+                files={"thumbnail": ("thumbnail.png", b"\x89PNG", "image/png")},
+                headers={"Authorization": "Bearer {}".format("xxx")},
+            )
+            assert r.status_code == 200
+            upload_queue.join()
+            post.reload()
+            assert post.thumbnail == "https://cdn.example.com/retry.png"
+            assert post.thumbnail_status == "failed"
+            assert mock_upload.call_count == 2 + upload_queue.max_attempts
+            assert upload_queue.stats()["failed"] == failed + 1
+        post.delete()
+
+    def test_upload_image_returns_the_uploaded_url(self):
+        with patch.object(upload_queue, "retry_seconds", 0), \
+                patch.object(upload_queue.uploader, "upload") as mock_upload:
+            mock_upload.side_effect = [Exception("timeout"), "https://cdn.example.com/image.png"]
+            r = self.client.post(
+                "/api/upload/image",
+                files={"image": ("image.png", b"\x89PNG", "image/png")},
+            )
+            assert r.status_code == 200
+            assert r.json() == {"url": "https://cdn.example.com/image.png"}
+
+            # every attempt failed, nothing was uploaded
+            mock_upload.side_effect = Exception("timeout")
+            r = self.client.post(
+                "/api/upload/image",
+                files={"image": ("image.png", b"\x89PNG", "image/png")},
+            )
+            assert r.status_code == 502
+            assert mock_upload.call_count == 2 + upload_queue.max_attempts
+            assert not os.listdir(upload_queue.spool_dir)
+            assert upload_queue.stats()["pending"] == 0
+
+    def test_upload_queue_rejects_when_full(self):
+        with tempfile.TemporaryDirectory() as directory:
+            queue = UploadQueue(LocalUploader(directory), workers=1, queue_size=1, spool_dir=directory)
+
+            def spool():
+                return asyncio.run(queue.spool(UploadFile(io.BytesIO(b"\x89PNG"), filename="image.png")))
+
+            first, second = spool(), spool()
+            with self.assertRaises(HTTPException) as error:
+                spool()
+            assert error.exception.status_code == 503
+            assert queue.stats()["pending"] == 2 and queue.stats()["rejected"] == 1
+
+            # discarded and uploaded files free their slot, once
+            queue.discard(first)
+            queue.discard(first)
+            assert queue.upload(second).startswith("file://")
+            assert queue.stats()["pending"] == 0
+            queue.discard(spool())
+            assert queue.stats()["pending"] == 0
+
+    def test_update_post_failure_discards_the_thumbnail(self):
+        with patch("app.infra.security.security_service.verify_token") as mock_token:
+            mock_token.return_value = TokenData(email=self.user.email)
+            r = self.client.put(
+                "/api/post/{}".format("5f0000000000000000000000"),
+                data={'payload': json.dumps({"title": "Missing", "description": "lorem"})},
+                files={"thumbnail": ("thumbnail.png", b"\x89PNG", "image/png")},
+                headers={"Authorization": "Bearer {}".format("xxx")},
+            )
+        assert r.status_code == 404
+        assert upload_queue.stats()["pending"] == 0
+        assert not os.listdir(upload_queue.spool_dir)
+
     def test_get_all_posts(self):
-        r = self.client.get(
-            url="/api/post",
-        )
+        with assert_max_queries(2):
+            r = self.client.get(
+                url="/api/post",
+            )
         assert r.status_code == 200
         resp = r.json()
         assert resp["pagination"]["total"] == 2
@@ -80,51 +229,75 @@ class TestUserApi(unittest.TestCase):
 
         with patch("app.infra.security.security_service.verify_token") as mock_token:
             mock_token.return_value = TokenData(email=self.user.email)
-            r = self.client.get(
-                url="/api/post/me",
-                headers={
-                    "Authorization": "Bearer {}".format("xxx"),
-                },
-            )
+            with assert_max_queries(4):
+                r = self.client.get(
+                    url="/api/post/me",
+                    headers={
+                        "Authorization": "Bearer {}".format("xxx"),
+                    },
+                )
             assert r.status_code == 200
             resp = r.json()
             assert resp["pagination"]["total"] == 1
 
     def test_get_post_by_id(self):
-        r = self.client.get(
-            url="/api/post/{}".format(str(self.post.id)),
-            headers={
-                "Authorization": "Bearer {}".format("xxx"),
-            },
-        )
+        with assert_max_queries(2):
+            r = self.client.get(
+                url="/api/post/{}".format(str(self.post.id)),
+                headers={
+                    "Authorization": "Bearer {}".format("xxx"),
+                },
+            )
         assert r.status_code == 200
         resp = r.json()
         post = PostModel.objects(id=str(self.post.id)).get()
         assert post.title == resp["title"]
         assert post.slug == resp["slug"]
 
+    def test_get_post_by_id_server_timing(self):
+        with self.assertLogs("app.access", level="INFO") as logs:
+            with assert_max_queries(2):
+                r = self.client.get(url="/api/post/{}".format(str(self.post.id)), headers={"X-Request-ID": "abc"})
+        phases = dict(metric.split(";dur=") for metric in r.headers["server-timing"].split(", "))
+        assert {"db", "map", "ser", "total"} <= set(phases)
+        assert all(float(duration) >= 0 for duration in phases.values())
+        assert "GET /api/post/{} 200".format(str(self.post.id)) in logs.output[0]
+        assert "request_id=abc" in logs.output[0]
+
     def test_update_post(self):
         with patch("app.infra.security.security_service.verify_token") as mock_token:
             mock_token.return_value = TokenData(email=self.user.email)
             data = {'payload': json.dumps(
                 {"title": "Test updated", "description": "lorem"})}
-            r = self.client.put(
-                url="/api/post/{}".format(str(self.post.id)),
-                data=data,
-                headers={
-                    "Authorization": "Bearer {}".format("xxx"),
-                },
-            )
+            with assert_max_queries(6):
+                r = self.client.put(
+                    url="/api/post/{}".format(str(self.post.id)),
+                    data=data,
+                    headers={
+                        "Authorization": "Bearer {}".format("xxx"),
+                    },
+                )
             assert r.status_code == 200
             post = PostModel.objects(id=r.json().get("id")).get()
             assert post.title == "Test updated"
+            assert r.json()["last_updated_at"]
+
+            with assert_max_queries(3):
+                r = self.client.get(url="/api/post/{}/revisions".format(str(self.post.id)))
+            assert r.status_code == 200
+            revision = r.json()["data"][0]
+            assert revision["editor"] == str(self.user.id)
+            assert revision["changes"]["title"] == {"old": "Post Default", "new": "Test updated"}
+            assert revision["changes"]["description"] == {"old": "description", "new": "lorem"}
+            assert "thumbnail" not in revision["changes"]
 
 
     def test_get_all_posts_by_search_title(self):
         sub_title_test = "default"
-        r = self.client.get(
-            url="/api/post?search={}&search_by=title".format(sub_title_test),
-        )
+        with assert_max_queries(2):
+            r = self.client.get(
+                url="/api/post?search={}&search_by=title".format(sub_title_test),
+            )
         assert r.status_code == 200
         resp = r.json()
         assert resp["pagination"]["total"] == 1
@@ -132,28 +305,422 @@ class TestUserApi(unittest.TestCase):
 
     def test_get_all_posts_by_search_author(self):
         sub_author_test = "2"
-        r = self.client.get(
-            url="/api/post?search={}&search_by=author".format(sub_author_test),
-        )
+        with assert_max_queries(2):
+            r = self.client.get(
+                url="/api/post?search={}&search_by=author".format(sub_author_test),
+            )
         assert r.status_code == 200
         resp = r.json()
         assert resp["pagination"]["total"] == 1
         assert sub_author_test.lower() in resp["data"][0]["author"]["fullname"].lower()
 
     def test_get_all_posts_sort_created_at_asce(self):
-        r = self.client.get(
-            url="/api/post?sort=asce&sort_by=created_at",
-        )
+        with assert_max_queries(2):
+            r = self.client.get(
+                url="/api/post?sort=asce&sort_by=created_at",
+            )
         assert r.status_code == 200
         resp = r.json()
         assert resp["pagination"]["total"] == 2
         assert resp["data"][0]["created_at"] <= resp["data"][1]["created_at"]
 
     def test_get_all_posts_sort_created_at_desc(self):
-        r = self.client.get(
-            url="/api/post?sort_by=created_at",
-        )
+        with assert_max_queries(2):
+            r = self.client.get(
+                url="/api/post?sort_by=created_at",
+            )
         assert r.status_code == 200
         resp = r.json()
         assert resp["pagination"]["total"] == 2
-        assert resp["data"][0]["created_at"] >= resp["data"][1]["created_at"]
\ No newline at end of file
+        assert resp["data"][0]["created_at"] >= resp["data"][1]["created_at"]
+
+    def test_get_all_posts_cursor(self):
+        ids = []
+        cursor = None
+        while True:
+            url = "/api/post?page_size=1" + ("&cursor={}".format(cursor) if cursor else "")
+            # cursor pages are counted apart from the index range read
+            with assert_max_queries(3 if cursor else 2):
+                r = self.client.get(url=url)
+            assert r.status_code == 200
+            resp = r.json()
+            ids.extend(post["id"] for post in resp["data"])
+            cursor = resp["pagination"]["next_cursor"]
+            if not cursor:
+                break
+        assert len(ids) == len(set(ids)) == resp["pagination"]["total"]
+
+    def test_get_all_posts_invalid_cursor(self):
+        with assert_max_queries(0):
+            r = self.client.get(url="/api/post?cursor=not-a-cursor")
+        assert r.status_code == 400
+
+        r = self.client.get(url="/api/post?page_size=1")
+        cursor = r.json()["pagination"]["next_cursor"]
+        r = self.client.get(url="/api/post?sort_by=title&cursor={}".format(cursor))
+        assert r.status_code == 400
+
+    def test_list_pipelines_read_the_keyset_range(self):
+        cursor = ("created_at", datetime.utcnow(), self.post.id)
+        pipeline = build_list_pipeline(sort={"created_at": -1}, cursor=cursor)
+        assert [next(iter(stage)) for stage in pipeline] == ["$match", "$sort", "$limit"]
+
+        pipeline = build_list_with_total_pipeline(count_mode=CountMode.CAPPED, count_cap=100, page_index=10)
+        assert pipeline[1] == {"$limit": 200}
+        assert build_count_pipeline(count_mode=CountMode.CAPPED, count_cap=100) == [
+            {"$limit": 101}, {"$count": "document_count"}]
+
+        extra = PostModel(title="Keyset", description="description", author=self.user).save()
+        self.addCleanup(extra.delete)
+        with patch("app.use_cases.post.list.settings.POST_COUNT_CAP", 1):
+            with assert_max_queries(2):
+                r = self.client.get(url="/api/post?page_size=1&count=capped")
+            assert r.status_code == 200
+            assert r.json()["pagination"]["total"] == 1
+            assert r.json()["pagination"]["total_capped"] is True
+            first = r.json()["data"][0]["id"]
+            with assert_max_queries(3) as queries:
+                r = self.client.get(url="/api/post?page_size=1&count=capped&cursor={}".format(
+                    r.json()["pagination"]["next_cursor"]))
+            assert r.status_code == 200
+            assert queries.queries[:2] == [("aggregate", "Posts"), ("aggregate", "Posts")]
+            assert r.json()["pagination"]["total"] == 1
+            assert r.json()["pagination"]["total_capped"] is True
+            assert [post["id"] for post in r.json()["data"]] != [first]
+
+    def test_motor_and_threaded_repositories_agree(self):
+        async def read(repository):
+            page, total = await repository.list_with_total(page_size=1, count_mode=CountMode.CAPPED)
+            after, _ = await repository.list_with_total(page_size=1, cursor=("created_at", page[0]["created_at"],
+                                                                             page[0]["_id"]))
+            post = await repository.find_one({"_id": self.post.id})
+            return ([doc["_id"] for doc in page + after], total, (await repository.get_by_id(self.post.id))["slug"],
+                    post.title, await repository.count({"author": self.user2.id}))
+
+        motor, threaded = asyncio.run(read(MotorPostRepository())), asyncio.run(read(ThreadedPostRepository()))
+        assert motor == threaded
+        assert motor[1] == PostModel.objects.count()
+
+    def test_get_all_posts_cursor_rejects_operators(self):
+        for value in ({"$ne": None}, {"$regex": "^(a+)+$"}, Regex("^(a+)+$"), ["a"], True, "2024-01-01"):
+            raw = json_util.dumps({"k": "created_at", "v": value, "id": str(self.post.id)})
+            cursor = base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+            with assert_max_queries(0):
+                r = self.client.get(url="/api/post", params={"cursor": cursor})
+            assert r.status_code == 400, value
+
+    def test_get_all_posts_unindexed_sort_by(self):
+        with assert_max_queries(0):
+            r = self.client.get(url="/api/post?sort_by=description")
+        assert r.status_code == 400
+
+        with assert_max_queries(2):
+            r = self.client.get(url="/api/post?sort_by=last_updated_at")
+        assert r.status_code == 200
+
+    def test_get_all_posts_count_mode(self):
+        with assert_max_queries(2):
+            r = self.client.get(url="/api/post?count=none")
+        assert r.status_code == 200
+        resp = r.json()
+        assert resp["pagination"]["total"] is None
+        assert len(resp["data"]) == 2
+
+        with patch("app.use_cases.post.list.settings.POST_COUNT_CAP", 1):
+            with assert_max_queries(2):
+                r = self.client.get(url="/api/post?count=capped")
+            assert r.status_code == 200
+            resp = r.json()
+            assert resp["pagination"]["total"] == 1
+            assert resp["pagination"]["total_capped"] is True
+            assert len(resp["data"]) == 2
+
+    def test_get_all_posts_renders_author_snapshots(self):
+        with assert_max_queries(2) as queries:
+            r = self.client.get(url="/api/post")
+        assert r.status_code == 200
+        assert len({post["author"]["id"] for post in r.json()["data"]}) >= 1
+        assert queries.queries == [("aggregate", "Posts")]
+
+        # posts without snapshot load their authors in one query, a deleted author renders as null
+        ghost = UserModel(email="ghost@test.com", role="user", fullname="Ghost", password="x").save()
+        orphan = PostModel(title="Orphan", description="description", author=ghost).save()
+        self.addCleanup(orphan.delete)
+        ghost.delete()
+        PostModel._get_collection().update_many({"_id": {"$in": [self.post.id, orphan.id]}},
+                                                 {"$unset": {"author_snapshot": ""}})
+        self.addCleanup(backfill)
+        with assert_max_queries(2) as queries:
+            r = self.client.get(url="/api/post")
+        assert r.status_code == 200
+        assert queries.queries == [("aggregate", "Posts"), ("find", "Users")]
+        authors = {post["id"]: post["author"] for post in r.json()["data"]}
+        assert authors[str(self.post.id)]["fullname"] == self.user2.fullname
+        assert authors[str(orphan.id)] is None
+        r = self.client.get(url="/api/post/{}".format(orphan.id))
+        assert r.status_code == 200
+        assert r.json()["author"] is None
+
+    def test_backfill_author_snapshot(self):
+        PostModel._get_collection().update_one({"_id": self.post.id}, {"$unset": {"author_snapshot": ""}})
+        assert backfill() >= 1
+        post = PostModel.objects(id=self.post.id).get()
+        assert post.author_snapshot.id == self.user2.id
+        assert post.author_snapshot.fullname == self.user2.fullname
+
+    def test_get_all_posts_by_search_title_prefix(self):
+        with assert_max_queries(2):
+            r = self.client.get(
+                url="/api/post?search={}&search_by=title_prefix".format("post d"),
+            )
+        assert r.status_code == 200
+        resp = r.json()
+        assert resp["pagination"]["total"] == 1
+        assert resp["data"][0]["title"].lower().startswith("post d")
+
+        r = self.client.get(
+            url="/api/post?search={}&search_by=title_prefix".format("default"),
+        )
+        assert r.status_code == 200
+        assert r.json()["pagination"]["total"] == 0
+
+    def test_get_all_posts_by_search_title_escapes_regex(self):
+        with assert_max_queries(1):
+            r = self.client.get(
+                url="/api/post?search={}&search_by=title".format(".*"),
+            )
+        assert r.status_code == 200
+        assert r.json()["pagination"]["total"] == 0
+
+    def test_get_all_posts_text_search_rejects_cursor(self):
+        r = self.client.get(url="/api/post?page_size=1")
+        cursor = r.json()["pagination"]["next_cursor"]
+        with assert_max_queries(0):
+            r = self.client.get(
+                url="/api/post?search=post&search_by=text&cursor={}".format(cursor),
+            )
+        assert r.status_code == 400
+
+    def test_get_post_by_id_etag(self):
+        url = "/api/post/{}".format(str(self.post.id))
+        r = self.client.get(url=url)
+        assert r.status_code == 200
+        etag = r.headers["etag"]
+        assert r.headers["cache-control"] == "public, no-cache"
+
+        with assert_max_queries(2):
+            r = self.client.get(url=url, headers={"If-None-Match": etag})
+        assert r.status_code == 304
+        assert r.content == b""
+        assert r.headers["etag"] == etag
+
+        PostModel.objects(id=self.post.id).update_one(set__last_updated_at=datetime.utcnow())
+        r = self.client.get(url=url, headers={"If-None-Match": etag})
+        assert r.status_code == 200
+        assert r.headers["etag"] != etag
+
+    def test_get_all_posts_etag(self):
+        r = self.client.get(url="/api/post")
+        etag = r.headers["etag"]
+        with assert_max_queries(2):
+            r = self.client.get(url="/api/post", headers={"If-None-Match": "W/{}".format(etag)})
+        assert r.status_code == 304
+
+        r = self.client.get(url="/api/post?page_size=1", headers={"If-None-Match": etag})
+        assert r.status_code == 200
+
+    def test_export_posts(self):
+        with patch("app.infra.security.security_service.verify_token") as mock_token:
+            mock_token.return_value = TokenData(email=self.user.email)
+            with assert_max_queries(2):
+                r = self.client.get(
+                    url="/api/post/export?batch_size=1",
+                    headers={"Authorization": "Bearer {}".format("xxx")},
+                )
+            assert r.status_code == 200
+            assert r.headers["content-type"] == "application/x-ndjson"
+            rows = [json.loads(line) for line in r.text.splitlines()]
+            assert len(rows) == PostModel.objects.count()
+            assert [row["id"] for row in rows] == sorted(row["id"] for row in rows)
+
+            r = self.client.get(
+                url="/api/post/export?fields=id,title&created_from={}".format(
+                    self.post.created_at.isoformat()),
+                headers={"Authorization": "Bearer {}".format("xxx")},
+            )
+            rows = [json.loads(line) for line in r.text.splitlines()]
+            assert rows and all(set(row) == {"id", "title"} for row in rows)
+
+            r = self.client.get(
+                url="/api/post/export?fields=password",
+                headers={"Authorization": "Bearer {}".format("xxx")},
+            )
+            assert r.status_code == 400
+
+    def test_import_posts(self):
+        lines = [
+            json.dumps({"title": "Imported one", "description": "lorem", "slug": "imported-slug"}),
+            json.dumps({"title": "Imported two", "description": "lorem", "author": str(self.user2.id),
+                        "created_at": "2020-01-01T00:00:00"}),
+            json.dumps({"title": "Duplicate slug", "description": "lorem", "slug": "imported-slug"}),
+            json.dumps({"title": "No description"}),
+            "not json",
+            json.dumps({"title": "Unknown author", "description": "lorem", "author": "5f0000000000000000000000"}),
+        ]
+        with patch("app.infra.security.security_service.verify_token") as mock_token:
+            mock_token.return_value = TokenData(email=self.user.email)
+            with assert_max_queries(5):
+                r = self.client.post(
+                    url="/api/post/import?chunk_size=2",
+                    files={"file": ("posts.jsonl", "\n".join(lines).encode("utf-8"))},
+                    headers={"Authorization": "Bearer {}".format("xxx")},
+                )
+            assert r.status_code == 200
+            resp = r.json()
+            assert resp["inserted"] == 2
+            assert resp["failed"] == 4
+            assert [error["line"] for error in resp["errors"]] == [3, 4, 5, 6]
+
+            imported = PostModel.objects(title="Imported two").get()
+            assert imported.author.id == self.user2.id
+            assert imported.author_snapshot.fullname == self.user2.fullname
+            assert imported.slug.startswith("imported-two-")
+            assert imported.title_lower == "imported two"
+            PostModel.objects(title__startswith="Imported").delete()
+
+    def test_parse_import_chunk(self):
+        post = json.dumps({"title": "Chunk", "description": "lorem"})
+        lines = enumerate([post, "", "not json", post, post], start=1)
+        rows, errors = parse_chunk(lines, 2)
+        assert [line for line, _ in rows] == [1, 4]
+        assert [error.line for error in errors] == [3]
+        # the next chunk resumes after the last line read, a short chunk means the file ended
+        rows, errors = parse_chunk(lines, 2)
+        assert [line for line, _ in rows] == [5] and errors == []
+        assert parse_chunk(lines, 2) == ([], [])
+
+    def test_get_post_by_slug(self):
+        with assert_max_queries(2):
+            r = self.client.get(url="/api/post/slug/{}".format(self.post.slug))
+        assert r.status_code == 200
+        assert r.json()["id"] == str(self.post.id)
+
+        r = self.client.get(url="/api/post/slug/{}".format("missing-slug"))
+        assert r.status_code == 404
+
+    def test_create_post_retries_taken_slug(self):
+        with patch("app.infra.security.security_service.verify_token") as mock_token, \
+                patch("app.infra.database.models.post.make_slug") as mock_slug:
+            mock_token.return_value = TokenData(email=self.user.email)
+            mock_slug.return_value = self.post.slug
+            data = {'payload': json.dumps({"title": "Post Default", "description": "lorem"})}
+            with assert_max_queries(3):
+                r = self.client.post(
+                    "/api/post",
+                    data=data,
+                    headers={"Authorization": "Bearer {}".format("xxx")},
+                )
+            assert r.status_code == 200
+            assert r.json()["slug"] != self.post.slug
+            assert r.json()["slug"].startswith("post-default-")
+            PostModel.objects(id=r.json()["id"]).delete()
+
+    def test_create_post_raises_other_unique_violations(self):
+        # e.g. a unique index added later, the slug is not redrawn
+        error = DuplicateKeyError("E11000", 11000, {"keyPattern": {"_id": 1}, "keyValue": {"_id": self.post.id}})
+        obj_in = PostInCreate(title="Duplicate", description="lorem", author=self.user)
+
+        with patch.object(PostModel, "save", side_effect=NotUniqueError("duplicate")) as mock_save:
+            mock_save.side_effect.__context__ = error
+            with self.assertRaises(NotUniqueError):
+                PostRepository().create(obj_in)
+            assert mock_save.call_count == 1
+
+        repository = MotorPostRepository()
+        with patch.object(type(repository.collection), "insert_one", side_effect=error) as mock_insert:
+            with self.assertRaises(NotUniqueError):
+                asyncio.run(repository.create(obj_in))
+            assert mock_insert.call_count == 1
+
+    def test_get_post_revisions_not_found(self):
+        with assert_max_queries(1):
+            r = self.client.get(url="/api/post/{}/revisions".format("0" * 24))
+        assert r.status_code == 404
+
+    def test_compact_post_revisions(self):
+        post = PostModel(title="History", description="description", author=self.user).save()
+        history = [datetime(2023, 1, 1), datetime(2023, 1, 2), datetime(2023, 1, 3)]
+        PostModel._get_collection().update_one({"_id": post.id}, {"$set": {"updated_at": history},
+                                                                  "$unset": {"last_updated_at": ""}})
+        assert compact() == 1
+        doc = PostModel._get_collection().find_one({"_id": post.id})
+        assert "updated_at" not in doc
+        assert doc["last_updated_at"] == history[-1]
+        assert PostRevisionModel.objects(post=post.id).count() == 2
+
+        r = self.client.get(url="/api/post/{}/revisions?page_size=1".format(str(post.id)))
+        assert r.json()["pagination"]["total"] == 2
+        assert r.json()["pagination"]["total_pages"] == 2
+        assert r.json()["data"][0]["created_at"].startswith("2023-01-03")
+        post.delete()
+        PostRevisionModel.objects(post=post.id).delete()
+
+    def test_seed(self):
+        options = SeedOptions(users=4, posts=200, password_hash="x", email_domain="seed.example.com", skew=3,
+                              description_median=100, description_max=1000)
+        assert seed(options, chunk_size=64) == {"users": 4, "posts": 200}
+        users = {user.id: user for user in UserModel.objects(email__endswith="@seed.example.com")}
+        assert sorted(user.role for user in users.values()) == ["admin", "user", "user", "user"]
+
+        posts = PostModel._get_collection().find({"author": {"$in": list(users)}})
+        authors = [post["author"] for post in posts]
+        assert len(authors) == 200
+        assert all(users[author].role == "user" for author in authors)
+        # Zipf, the first author writes most posts
+        assert authors.count(min(set(authors))) > 100
+
+        post = PostModel._get_collection().find_one({"author": {"$in": list(users)}})
+        r = self.client.get(url="/api/post/{}".format(str(post["_id"])))
+        assert r.status_code == 200
+        assert r.json()["author"]["fullname"] == users[post["author"]].fullname
+        assert len({doc["slug"] for doc in PostModel._get_collection().find({"author": {"$in": list(users)}})}) == 200
+        PostModel.objects(author__in=list(users)).delete()
+        UserModel.objects(id__in=list(users)).delete()
+
+    def test_to_post_maps_raw_documents(self):
+        author = UserModel._get_collection().find_one({"_id": self.user2.id})
+        doc = dict(PostModel._get_collection().find_one({"_id": self.post.id}), author=author)
+
+        post = to_post(doc)
+        assert post.id == str(self.post.id) and post.slug == self.post.slug
+        assert post.author.id == str(self.user2.id)
+        # fields the entity does not declare, e.g. the password of the author, are dropped
+        assert "password" not in post.author.model_dump()
+        assert "title_lower" not in post.model_dump()
+        assert to_posts([doc, doc]) == [post, post]
+        assert to_posts([]) == []
+
+        # the snapshot is rendered first, the loaded author only for posts without one
+        doc["author_snapshot"] = {"id": self.user2.id, "fullname": "Snapshot"}
+        assert to_post(doc).author.fullname == "Snapshot"
+        del doc["author_snapshot"]
+        assert to_post(doc).author.fullname == self.user2.fullname
+        assert to_post(dict(doc, author=self.user2.id)).author is None
+
+    def test_post_view_from_mongo(self):
+        doc = PostModel._get_collection().find_one({"_id": self.post.id})
+        view = PostView.from_mongo(dict(doc, unknown="ignored"))
+        assert view.id == self.post.id
+        assert view.title == "Post Default"
+        assert not hasattr(view, "unknown")
+
+        # fields missing from the document read as None
+        partial = PostView.from_mongo({"_id": self.post.id, "title": "Partial"})
+        assert partial.thumbnail is None and partial.author_snapshot is None
+        assert partial != view
+        assert PostView.from_mongo(doc) == view
+        assert PostView.from_mongo(None) is None
+        assert PostView(id=self.post.id, title="Partial") == partial
+
+        with self.assertRaises(AttributeError):
+            view.title = "changed"
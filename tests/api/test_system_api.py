@@ -0,0 +1,327 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+import unittest
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from unittest.mock import patch
+
+from bson import ObjectId
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from mongoengine import disconnect
+
+from app.domain.auth.entity import TokenData
+from app.domain.shared.entity import Pagination
+from app.infra.database import indexes
+from app.infra.database.models.post import PostModel
+from app.infra.database.models.user import UserModel
+from app.infra.database.monitoring import PoolStatsListener, CommandStatsListener, RequestStats, request_stats, \
+    track_operations
+from app.infra.security.password_pool import PasswordHasherPool
+from app.infra.security.security_service import get_password_hash, user_cache
+from app.main import app
+from app.shared.cache import TTLCache
+from app.shared.metrics import Registry, render
+from app.shared.serializer import JSONBytesResponse, dump_json
+from tests.helpers import assert_max_queries, connect_mongomock
+
+
+class TestSystemApi(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        connect_mongomock()
+        user_cache.clear()
+        cls.client = TestClient(app)
+        cls.admin = UserModel(
+            email="admin@test.com",
+            role="admin",
+            fullname="John Doe",
+            password=get_password_hash("12345678")
+        ).save()
+        cls.user = UserModel(
+            email="user@test.com",
+            role="user",
+            fullname="Jane Doe",
+            password=get_password_hash("12345678")
+        ).save()
+
+    @classmethod
+    def tearDownClass(cls):
+        disconnect()
+
+    def test_get_database_pool(self):
+        with patch("app.infra.security.security_service.verify_token") as mock_token:
+            mock_token.return_value = TokenData(email=self.admin.email)
+            with assert_max_queries(1):
+                r = self.client.get("/api/system/database/pool", headers={"Authorization": "Bearer {}".format("xxx")})
+            assert r.status_code == 200
+            body = r.json()
+            assert set(body) == {"mongoengine", "motor"}
+            assert {"checked_out", "wait_queue", "checkout_ms_avg", "checkout_ms_max"} <= set(body["motor"])
+
+            mock_token.return_value = TokenData(email=self.user.email)
+            r = self.client.get("/api/system/database/pool", headers={"Authorization": "Bearer {}".format("xxx")})
+            assert r.status_code == 403
+
+    def test_get_database_commands(self):
+        with patch("app.infra.security.security_service.verify_token") as mock_token:
+            mock_token.return_value = TokenData(email=self.admin.email)
+            headers = {"Authorization": "Bearer {}".format("xxx"), "X-Request-ID": "abc"}
+            r = self.client.get("/api/system/database/pool", headers=headers)
+            assert r.headers["x-request-id"] == "abc"
+
+            with assert_max_queries(1):
+                r = self.client.get("/api/system/database/commands",
+                                    headers={"Authorization": "Bearer {}".format("xxx")})
+            assert r.status_code == 200
+            assert r.headers["x-request-id"]
+            assert r.json()["endpoints"]["GET /api/system/database/pool"]["requests"] >= 1
+
+    def test_get_metrics(self):
+        self.client.get("/api/post/{}".format("0" * 24))
+        with assert_max_queries(0):
+            r = self.client.get("/metrics")
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert 'http_requests_total{method="GET",route="/api/post/{post_id}",status="404"}' in r.text
+        assert 'http_request_duration_seconds_bucket{method="GET",route="/api/post/{post_id}",le="+Inf"}' in r.text
+        assert "threadpool_threads_max " in r.text
+        assert 'cache_hits_total{cache="user"}' in r.text
+
+    def test_metrics_merge_workers(self):
+        registry = Registry()
+        requests = registry.counter("requests_total", "Requests", ["route"])
+        in_flight = registry.gauge("in_flight", "In flight")
+        latency = registry.histogram("latency_seconds", "Latency", buckets=[0.1, 1])
+        requests.inc("/post")
+        in_flight.inc()
+        latency.observe(0.5)
+
+        with tempfile.TemporaryDirectory() as directory:
+            for pid in ("1", "2"):
+                with open(os.path.join(directory, "{}.json".format(pid)), "w") as file:
+                    json.dump(registry.collect(), file)
+            # a stopped worker: its counters stay, its gauges are dropped
+            stale = time.time() - 60
+            os.utime(os.path.join(directory, "2.json"), (stale, stale))
+
+            with patch("app.interfaces.rest.endpoints.metrics.settings.METRICS_DIR", directory):
+                r = self.client.get("/metrics")
+            assert 'requests_total{route="/post"} 2' in r.text
+            assert "in_flight 1" in r.text
+            assert 'latency_seconds_bucket{le="0.1"} 0' in r.text
+            assert 'latency_seconds_bucket{le="1.0"} 2' in r.text
+            assert "latency_seconds_count 2" in r.text
+
+        assert render(registry.collect()).startswith("# HELP in_flight In flight\n# TYPE in_flight gauge\n")
+
+    def test_command_stats_listener(self):
+        listener = CommandStatsListener(slow_ms=50)
+
+        @track_operations
+        class Repository:
+            def find(self, duration_micros):
+                listener.started(_Event(None, command_name="find", command={"find": "Posts"}))
+                listener.succeeded(_Event(None, command_name="find", duration_micros=duration_micros,
+                                          reply={"cursor": {"firstBatch": [{}, {}]}}))
+
+            def export(self):
+                self.find(1000)
+                yield 1
+
+        stats = RequestStats("abc")
+        token = request_stats.set(stats)
+        try:
+            with self.assertLogs("app.database.slow_query", level="WARNING"):
+                Repository().find(80000)
+            assert list(Repository().export()) == [1]
+        finally:
+            request_stats.reset(token)
+        listener.record_request("GET /api/post", stats)
+
+        assert (stats.queries, stats.documents, stats.duration_ms) == (2, 4, 81.0)
+        snapshot = listener.snapshot()
+        assert snapshot["operations"]["Repository.find"]["commands"] == 2
+        assert snapshot["operations"]["Repository.find"]["duration_ms_max"] == 80.0
+        assert snapshot["endpoints"]["GET /api/post"]["queries_max"] == 2
+        assert snapshot["slow"] == [{"operation": "Repository.find", "command": "find", "collection": "Posts",
+                                     "duration_ms": 80.0, "documents": 2, "request_id": "abc"}]
+
+    def test_pool_stats_listener(self):
+        listener = PoolStatsListener()
+        address = ("localhost", 27017)
+        listener.connection_created(_Event(address, connection_id=1))
+        listener.connection_check_out_started(_Event(address))
+        assert listener.snapshot()["wait_queue"] == 1
+        listener.connection_checked_out(_Event(address, connection_id=1))
+        listener.connection_check_out_started(_Event(address))
+        listener.connection_check_out_failed(_Event(address, reason="timeout"))
+
+        stats = listener.snapshot()
+        assert stats["open"] == 1
+        assert stats["checked_out"] == 1
+        assert stats["wait_queue"] == 0
+        assert stats["checkouts"] == 1
+        assert stats["checkout_failures"] == 1
+        assert stats["checkout_ms_max"] >= stats["checkout_ms_avg"] >= 0
+
+        listener.connection_checked_in(_Event(address, connection_id=1))
+        listener.connection_closed(_Event(address, connection_id=1, reason="idle"))
+        assert listener.snapshot()["checked_out"] == 0
+        assert listener.snapshot()["open"] == 0
+
+    def test_get_cache(self):
+        with patch("app.infra.security.security_service.verify_token") as mock_token:
+            mock_token.return_value = TokenData(email=self.admin.email)
+            self.client.get("/api/system/cache", headers={"Authorization": "Bearer {}".format("xxx")})
+            with assert_max_queries(1):
+                r = self.client.get("/api/system/cache", headers={"Authorization": "Bearer {}".format("xxx")})
+            assert r.status_code == 200
+            stats = r.json()["user"]
+            assert stats["hits"] >= 1
+            assert 0 < stats["hit_rate"] <= 1
+
+    def test_ttl_cache(self):
+        cache = TTLCache(maxsize=2, ttl=30)
+        with patch("app.shared.cache.time.monotonic") as mock_clock:
+            mock_clock.return_value = 0
+            cache.set("a", 1)
+            cache.set("b", 2)
+            assert cache.get("a") == 1
+            cache.set("c", 3)
+            assert cache.get("b") is None
+            assert cache.stats()["evictions"] == 1
+
+            generation = cache.generation
+            cache.invalidate("a")
+            cache.set("a", 1, generation=generation)
+            assert cache.get("a") is None
+
+            mock_clock.return_value = 30
+            assert cache.get("c") is None
+
+    def test_dump_json(self):
+        id, now = ObjectId(), datetime(2024, 1, 2, 3, 4, 5)
+        value = {"id": id, "created_at": now, "pagination": Pagination(total=1, page_index=1), "tags": ["a"]}
+        expected = {"id": str(id), "created_at": "2024-01-02T03:04:05", "tags": ["a"]}
+
+        with patch("app.shared.serializer.orjson", None):
+            fallback = json.loads(dump_json(value))
+        encoded = json.loads(dump_json(value))
+        assert encoded == fallback
+        assert {key: encoded[key] for key in expected} == expected
+        assert encoded["pagination"]["total"] == 1
+
+        # models go through their own serializer
+        assert json.loads(dump_json(Pagination(total=2))) == Pagination(total=2).model_dump(mode="json")
+
+    def test_json_bytes_response(self):
+        response = JSONBytesResponse(b'{"a":1}')
+        assert response.body == b'{"a":1}'
+        assert response.headers["content-type"] == "application/json"
+        assert json.loads(JSONBytesResponse({"id": ObjectId("0" * 24)}).body) == {"id": "0" * 24}
+
+    def test_password_hasher(self):
+        hasher = PasswordHasherPool(workers=1, queue_size=0)
+        try:
+            hashed = asyncio.run(hasher.hash("12345678"))
+            assert asyncio.run(hasher.verify("12345678", hashed))
+            assert hasher.stats()["completed"] == 2
+        finally:
+            hasher.shutdown()
+
+    def test_password_hasher_replaces_a_broken_pool(self):
+        hasher = PasswordHasherPool(workers=1, queue_size=0)
+        try:
+            broken = hasher.executor
+            with self.assertRaises(BrokenProcessPool):
+                asyncio.run(hasher.run(os._exit, 1))
+            assert hasher.stats()["failed"] == 1
+            assert hasher.executor is not broken
+            # the next jobs run on a new pool
+            assert asyncio.run(hasher.verify("12345678", get_password_hash("12345678")))
+        finally:
+            hasher.shutdown()
+
+    def test_password_hasher_rejects_when_full(self):
+        hasher = PasswordHasherPool(workers=0, queue_size=0)
+
+        async def burst():
+            return await asyncio.gather(hasher.hash("12345678"), hasher.hash("12345678"), return_exceptions=True)
+
+        results = asyncio.run(burst())
+        assert isinstance(results[1], HTTPException) and results[1].status_code == 503
+        assert hasher.stats()["rejected"] == 1
+
+        with patch("app.infra.security.security_service.verify_token") as mock_token:
+            mock_token.return_value = TokenData(email=self.admin.email)
+            with assert_max_queries(1):
+                r = self.client.get("/api/system/password-hasher", headers={"Authorization": "Bearer {}".format("xxx")})
+            assert r.status_code == 200
+            assert "latency_ms_avg" in r.json()
+
+    def test_apply_indexes(self):
+        created = indexes.apply()
+        assert "created_at_-1__id_-1" in created["Posts"]
+        assert "author_1_created_at_-1__id_-1" in created["Posts"]
+        # idempotent
+        assert indexes.apply() == created
+        assert PostModel._get_collection().index_information()["slug_1"]["unique"]
+
+    def test_collscans(self):
+        plan = {
+            "queryPlanner": {
+                "namespace": "demo.Posts",
+                "winningPlan": {"stage": "LIMIT", "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}},
+                "rejectedPlans": [{"stage": "COLLSCAN"}],
+            }
+        }
+        assert indexes.collscans(plan) == []
+
+        aggregate = {"stages": [{"$cursor": {"queryPlanner": {
+            "winningPlan": {"stage": "SORT", "inputStage": {"stage": "COLLSCAN", "namespace": "demo.Posts"}},
+        }}}]}
+        assert indexes.collscans(aggregate) == ["demo.Posts"]
+        assert len(list(indexes.query_shapes())) > len(indexes.POST_SORT_FIELDS) * 2
+
+    def test_unbounded_cursor_pages(self):
+        range_scan = {
+            "queryPlanner": {"winningPlan": {"stage": "LIMIT", "inputStage": {"stage": "FETCH", "inputStage": {
+                "stage": "SORT_MERGE", "inputStages": [{"stage": "IXSCAN"}, {"stage": "IXSCAN"}]}}}},
+            "executionStats": {"totalKeysExamined": 21, "totalDocsExamined": 20},
+        }
+        assert indexes.unbounded(range_scan, limit=20) == []
+
+        # the whole match sorted in memory then fed to $facet, no collection scan
+        facet = {"stages": [
+            {"$cursor": {"queryPlanner": {"winningPlan": {"stage": "IXSCAN"}}}},
+            {"$sort": {"sortKey": {"created_at": -1}}},
+            {"$facet": {"data": [], "total": []}},
+        ]}
+        assert indexes.collscans(facet) == []
+        assert indexes.unbounded(facet, limit=20) == ["$sort stage", "$facet stage"]
+
+        blocking = {"queryPlanner": {"winningPlan": {"stage": "SORT", "inputStage": {"stage": "IXSCAN"}}},
+                    "executionStats": {"totalKeysExamined": 5000, "totalDocsExamined": 20}}
+        assert indexes.unbounded(blocking, limit=20) == ["blocking SORT", "totalKeysExamined=5000 for a page of 20"]
+
+        # pipelines that are not pushed down report the execution stats of their $cursor stage
+        pipeline = {"stages": [
+            {"$cursor": {"queryPlanner": {"winningPlan": {"stage": "IXSCAN"}},
+                         "executionStats": {"totalKeysExamined": 900, "totalDocsExamined": 900}}},
+            {"$limit": 20},
+        ]}
+        assert indexes.unbounded(pipeline, limit=20) == ["totalKeysExamined=900 for a page of 20",
+                                                         "totalDocsExamined=900 for a page of 20"]
+
+        cursor_shapes = [shape for shape in indexes.query_shapes() if "cursor" in shape.name]
+        assert cursor_shapes and all(shape.limit for shape in cursor_shapes)
+
+
+class _Event:
+    def __init__(self, address, **kwargs):
+        self.address = address
+        self.__dict__.update(kwargs)
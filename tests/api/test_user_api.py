@@ -1,22 +1,27 @@
+import asyncio
 import json
 import unittest
 from unittest.mock import patch
 
-import mongomock
 from fastapi.testclient import TestClient
-from mongoengine import connect, disconnect
+from mongoengine import disconnect
 
 from app.domain.auth.entity import TokenData
-from app.infra.database.models.user import UserModel
-from app.infra.security.security_service import get_password_hash
+from app.infra.database.models.post import PostModel
+from app.infra.database.models.user import UserModel, UserView
+from app.infra.security.security_service import get_password_hash, user_cache
+from app.infra.upload.upload_queue import upload_queue
+from app.infra.user.async_user_repository import MotorUserRepository, ThreadedUserRepository
+from app.infra.user.mapper import to_user, to_users
 from app.main import app
+from tests.helpers import assert_max_queries, connect_mongomock
 
 
 class TestUserApi(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
-        disconnect()
-        connect("mongoenginetest", host="mongodb://localhost:1234", mongo_client_class=mongomock.MongoClient)
+        connect_mongomock()
+        user_cache.clear()
         cls.client = TestClient(app)
         cls.user = UserModel(
             email="test@test.com",
@@ -34,13 +39,14 @@ class TestUserApi(unittest.TestCase):
             mock_token.return_value = TokenData(email=self.user.email)
             data = {'payload': json.dumps(
                 {"email": "test1@test.com", "role": "user", "fullname": "John Doe", "password": "12345678"})}
-            r = self.client.post(
-                "/api/user",
-                data=data,
-                headers={
-                    "Authorization": "Bearer {}".format("xxx"),
-                },
-            )
+            with assert_max_queries(2):
+                r = self.client.post(
+                    "/api/user",
+                    data=data,
+                    headers={
+                        "Authorization": "Bearer {}".format("xxx"),
+                    },
+                )
             assert r.status_code == 200
             user = UserModel.objects(id=r.json().get("id")).get()
             assert user.email == "test1@test.com"
@@ -62,12 +68,13 @@ class TestUserApi(unittest.TestCase):
     def test_get_all_users(self):
         with patch("app.infra.security.security_service.verify_token") as mock_token:
             mock_token.return_value = TokenData(email=self.user.email)
-            r = self.client.get(
-                url="/api/user",
-                headers={
-                    "Authorization": "Bearer {}".format("xxx"),
-                },
-            )
+            with assert_max_queries(3):
+                r = self.client.get(
+                    url="/api/user",
+                    headers={
+                        "Authorization": "Bearer {}".format("xxx"),
+                    },
+                )
             assert r.status_code == 200
             resp = r.json()
             assert len(resp["data"]) == 2
@@ -75,15 +82,50 @@ class TestUserApi(unittest.TestCase):
     def test_get_me(self):
         with patch("app.infra.security.security_service.verify_token") as mock_token:
             mock_token.return_value = TokenData(email=self.user.email)
+            with assert_max_queries(1):
+                r = self.client.get(
+                    url="/api/user/me",
+                    headers={
+                        "Authorization": "Bearer {}".format("xxx"),
+                    },
+                )
+            assert r.status_code == 200
+            resp = r.json()
+            assert resp.get("email") == "test@test.com"
+            assert r.headers["cache-control"] == "private, no-cache"
+            assert "auth;dur=" in r.headers["server-timing"]
+
             r = self.client.get(
                 url="/api/user/me",
                 headers={
                     "Authorization": "Bearer {}".format("xxx"),
+                    "If-None-Match": r.headers["etag"],
                 },
             )
+            assert r.status_code == 304
+
+    def test_export_users(self):
+        with patch("app.infra.security.security_service.verify_token") as mock_token:
+            mock_token.return_value = TokenData(email=self.user.email)
+            with assert_max_queries(2):
+                r = self.client.get(
+                    url="/api/user/export",
+                    headers={
+                        "Authorization": "Bearer {}".format("xxx"),
+                    },
+                )
             assert r.status_code == 200
-            resp = r.json()
-            assert resp.get("email") == "test@test.com"
+            rows = [json.loads(line) for line in r.text.splitlines()]
+            assert len(rows) == UserModel.objects.count()
+            assert all("password" not in row for row in rows)
+
+            r = self.client.get(
+                url="/api/user/export?created_to=2000-01-01T00:00:00",
+                headers={
+                    "Authorization": "Bearer {}".format("xxx"),
+                },
+            )
+            assert r.text == ""
 
     def test_get_user_by_id(self):
         with patch("app.infra.security.security_service.verify_token") as mock_token:
@@ -100,12 +142,13 @@ class TestUserApi(unittest.TestCase):
             assert r.status_code == 200
             user = UserModel.objects(id=r.json().get("id")).get()
 
-            r = self.client.get(
-                url="/api/user/{}".format(str(user.id)),
-                headers={
-                    "Authorization": "Bearer {}".format("xxx"),
-                },
-            )
+            with assert_max_queries(2):
+                r = self.client.get(
+                    url="/api/user/{}".format(str(user.id)),
+                    headers={
+                        "Authorization": "Bearer {}".format("xxx"),
+                    },
+                )
             assert r.status_code == 200
             resp = r.json()
             assert resp.get("email") == "test2@test.com"
@@ -125,12 +168,13 @@ class TestUserApi(unittest.TestCase):
             assert r.status_code == 200
             user = UserModel.objects(id=r.json().get("id")).get()
 
-            r = self.client.delete(
-                url="/api/user/{}".format(str(user.id)),
-                headers={
-                    "Authorization": "Bearer {}".format("xxx"),
-                },
-            )
+            with assert_max_queries(3):
+                r = self.client.delete(
+                    url="/api/user/{}".format(str(user.id)),
+                    headers={
+                        "Authorization": "Bearer {}".format("xxx"),
+                    },
+                )
             assert r.status_code == 200
 
     def test_update_me(self):
@@ -138,13 +182,85 @@ class TestUserApi(unittest.TestCase):
             mock_token.return_value = TokenData(email=self.user.email)
             data = {'payload': json.dumps(
                 {"fullname": "Updated"})}
+            with assert_max_queries(6):
+                r = self.client.put(
+                    "/api/user/me",
+                    data=data,
+                    headers={
+                        "Authorization": "Bearer {}".format("xxx"),
+                    },
+                )
+            assert r.status_code == 200
+            user = UserModel.objects(id=r.json().get("id")).get()
+            assert user.fullname == "Updated"
+
+            # the cached current user is dropped on update
+            r = self.client.get("/api/user/me", headers={"Authorization": "Bearer {}".format("xxx")})
+            assert r.json().get("fullname") == "Updated"
+
+            # requests share a read only view of the cached user
+            cached = user_cache.get(self.user.email)
+            assert isinstance(cached, UserView) and cached.fullname == "Updated"
+            with self.assertRaises(AttributeError):
+                cached.fullname = "Changed"
+
+    def test_update_me_refreshes_post_author_snapshot(self):
+        post = PostModel(title="Snapshot", description="description", author=self.user).save()
+        with patch("app.infra.security.security_service.verify_token") as mock_token:
+            mock_token.return_value = TokenData(email=self.user.email)
+            data = {'payload': json.dumps(
+                {"fullname": "Snapshot Updated"})}
+            with assert_max_queries(6):
+                r = self.client.put(
+                    "/api/user/me",
+                    data=data,
+                    headers={
+                        "Authorization": "Bearer {}".format("xxx"),
+                    },
+                )
+            assert r.status_code == 200
+            post.reload()
+            assert post.author_snapshot.fullname == "Snapshot Updated"
+
+    def test_update_me_uploads_avatar_in_background(self):
+        post = PostModel(title="Avatar", description="description", author=self.user).save()
+        with patch.object(upload_queue.uploader, "upload") as mock_upload, \
+                patch("app.infra.security.security_service.verify_token") as mock_token:
+            mock_token.return_value = TokenData(email=self.user.email)
+            mock_upload.return_value = "https://cdn.example.com/avatar.png"
             r = self.client.put(
                 "/api/user/me",
-                data=data,
-                headers={
-                    "Authorization": "Bearer {}".format("xxx"),
-                },
+                data={'payload': json.dumps({"fullname": "John Doe"})},
+                files={"avatar": ("avatar.png", b"\x89PNG", "image/png")},
+                headers={"Authorization": "Bearer {}".format("xxx")},
             )
             assert r.status_code == 200
-            user = UserModel.objects(id=r.json().get("id")).get()
-            assert user.fullname == "Updated"
+            assert r.json()["avatar_status"] == "pending"
+
+            upload_queue.join()
+            # the cached current user and the posts of the user follow the upload
+            r = self.client.get("/api/user/me", headers={"Authorization": "Bearer {}".format("xxx")})
+            assert r.json()["avatar"] == "https://cdn.example.com/avatar.png"
+            assert r.json()["avatar_status"] == "done"
+            post.reload()
+            assert post.author_snapshot.avatar == "https://cdn.example.com/avatar.png"
+        post.delete()
+
+    def test_motor_and_threaded_repositories_agree(self):
+        async def read(repository):
+            user = await repository.get_by_id(self.user.id)
+            by_email = await repository.get_by_email(self.user.email)
+            return (user.email, by_email.id, [doc["_id"] for doc in await repository.find_by_ids([self.user.id])],
+                    [doc["_id"] for doc in await repository.list(page_size=5)], await repository.count())
+
+        motor, threaded = asyncio.run(read(MotorUserRepository())), asyncio.run(read(ThreadedUserRepository()))
+        assert motor == threaded
+        assert motor[0] == self.user.email
+
+    def test_to_user_maps_raw_documents(self):
+        doc = UserModel._get_collection().find_one({"_id": self.user.id})
+        user = to_user(doc)
+        assert user.id == str(self.user.id)
+        assert user.email == self.user.email
+        assert "password" not in user.model_dump()
+        assert to_users([doc]) == [user]
@@ -0,0 +1,130 @@
+import functools
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+import mongomock
+from mongoengine import connect, disconnect, get_connection
+from mongomock.collection import Collection
+from mongomock_motor import AsyncMongoMockClient
+from pymongo import monitoring
+
+from app.config import settings
+from app.infra import database
+
+# mongomock collection method: the command pymongo sends for it
+MONGOMOCK_COMMANDS = {
+    "find": "find",
+    "find_one": "find",
+    "find_one_and_delete": "findAndModify",
+    "find_one_and_replace": "findAndModify",
+    "find_one_and_update": "findAndModify",
+    "aggregate": "aggregate",
+    "count_documents": "aggregate",
+    "estimated_document_count": "count",
+    "distinct": "distinct",
+    "insert_one": "insert",
+    "insert_many": "insert",
+    "update_one": "update",
+    "update_many": "update",
+    "replace_one": "update",
+    "delete_one": "delete",
+    "delete_many": "delete",
+    "bulk_write": "bulkWrite",
+    "create_index": "createIndexes",
+    "create_indexes": "createIndexes",
+    "drop_index": "dropIndexes",
+    "drop_indexes": "dropIndexes",
+    "index_information": "listIndexes",
+    "list_indexes": "listIndexes",
+    "drop": "drop",
+}
+# sent by the driver on its own, or by mongoengine creating the model indexes on the first use of a collection
+# which the API turns off (``MONGODB_AUTO_CREATE_INDEX``)
+IGNORED_COMMANDS = {"endSessions", "ping", "hello", "isMaster", "createIndexes", "listIndexes"}
+
+
+class QueryCounter:
+    """Database commands ``(command, collection)`` sent while the counter is active"""
+
+    def __init__(self):
+        self.queries: List[Tuple[str, Optional[str]]] = []
+
+    def __len__(self) -> int:
+        return len(self.queries)
+
+
+_lock = threading.Lock()
+_counters: List[QueryCounter] = []
+# mongomock methods call each other, only the outermost call is a command
+_local = threading.local()
+
+
+def _record(command: str, collection: Optional[str]) -> None:
+    if command in IGNORED_COMMANDS:
+        return
+    with _lock:
+        for counter in _counters:
+            counter.queries.append((command, collection))
+
+
+class _CommandListener(monitoring.CommandListener):
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        collection = event.command.get(event.command_name)
+        _record(event.command_name, collection if isinstance(collection, str) else None)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        pass
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        pass
+
+
+def _counted(method, command: str):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        depth = getattr(_local, "depth", 0)
+        if depth == 0:
+            _record(command, self.name)
+        _local.depth = depth + 1
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            _local.depth = depth
+
+    return wrapper
+
+
+# pymongo clients created from now on report their commands, mongomock collections are patched once
+monitoring.register(_CommandListener())
+for _name, _command in MONGOMOCK_COMMANDS.items():
+    setattr(Collection, _name, _counted(getattr(Collection, _name), _command))
+
+
+@contextmanager
+def assert_max_queries(n: int) -> Iterator[QueryCounter]:
+    """Fail when the block sends more than ``n`` database commands
+
+    Counts the commands of every thread, so requests served by ``TestClient`` are included. Works with pymongo
+    clients created after this module is imported and with mongomock.
+    """
+    counter = QueryCounter()
+    with _lock:
+        _counters.append(counter)
+    try:
+        yield counter
+    finally:
+        with _lock:
+            _counters.remove(counter)
+    assert len(counter) <= n, "{} database commands, expected at most {}:\n{}".format(
+        len(counter), n, "\n".join("{} {}".format(command, collection) for command, collection in counter.queries))
+
+
+def connect_mongomock() -> None:
+    """Connect mongoengine and the Motor repositories to one in-memory mongomock client
+
+    Both ``DATABASE_DRIVER`` values then read and write the same data.
+    """
+    disconnect()
+    connect(settings.MONGODB_DATABASE, host="mongodb://localhost:1234", mongo_client_class=mongomock.MongoClient)
+    database._motor_client = AsyncMongoMockClient(mock_mongo_client=get_connection())